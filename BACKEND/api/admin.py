@@ -1,77 +1,180 @@
 from django.contrib import admin
-from .models import Pet, PetImage, Like, Match, Message, Pass
+from django.db.models import Count, Exists, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from tinderpet_backend.admin_performance import DeferredDeleteMixin, PerformanceModelAdmin
+from . import search
+from .deletion import schedule_pet_deletion
+from .models import BlockedTerm, Breed, BreedAlias, DeletionJob, ImageFingerprint, Pet, PetImage, Like, Match, MatchParticipant, Message, MessageChunk, Pass, Task
 
 
 @admin.register(Pet)
-class PetAdmin(admin.ModelAdmin):
+class PetAdmin(DeferredDeleteMixin, PerformanceModelAdmin):
     list_display = ['name', 'pet_type', 'breed', 'owner', 'is_active', 'created_at']
     list_filter = ['pet_type', 'is_active', 'gender', 'created_at']
-    search_fields = ['name', 'breed', 'owner__email', 'owner__username']
+    # name, breed and bio go through the full-text index (see get_search_results)
+    search_fields = ['owner__email', '=owner__username']
     ordering = ['-created_at']
-    readonly_fields = ['created_at', 'updated_at']
+    readonly_fields = ['canonical_breed', 'created_at', 'updated_at', 'deleted_at']
+    autocomplete_fields = ['owner']
+    
+    def schedule_delete(self, obj):
+        schedule_pet_deletion(obj)
+    
+    def get_search_results(self, request, queryset, search_term):
+        owner_matches, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+        if not search_term:
+            return owner_matches, may_have_duplicates
+        return owner_matches | search.filter_queryset(queryset, search_term), may_have_duplicates
     
     fieldsets = (
         ('Información Básica', {
-            'fields': ('owner', 'name', 'pet_type', 'breed', 'age', 'gender')
+            'fields': ('owner', 'name', 'pet_type', 'breed', 'canonical_breed', 'age', 'gender')
         }),
         ('Detalles', {
             'fields': ('bio', 'main_image', 'is_active')
         }),
         ('Fechas', {
-            'fields': ('created_at', 'updated_at'),
+            'fields': ('created_at', 'updated_at', 'deleted_at'),
             'classes': ('collapse',)
         }),
     )
 
+class BreedAliasInline(admin.TabularInline):
+    model = BreedAlias
+    extra = 0
+
+@admin.register(Breed)
+class BreedAdmin(admin.ModelAdmin):
+    list_display = ['name', 'pet_type', 'key', 'created_at']
+    list_filter = ['pet_type']
+    search_fields = ['key', 'aliases__key']
+    ordering = ['pet_type', 'name']
+    readonly_fields = ['trigram_count', 'created_at']
+    inlines = [BreedAliasInline]
+
 @admin.register(PetImage)
-class PetImageAdmin(admin.ModelAdmin):
+class PetImageAdmin(PerformanceModelAdmin):
     list_display = ['pet', 'uploaded_at']
     list_filter = ['uploaded_at']
     search_fields = ['pet__name']
     ordering = ['-uploaded_at']
     readonly_fields = ['uploaded_at']
+    autocomplete_fields = ['pet']
+
+@admin.register(ImageFingerprint)
+class ImageFingerprintAdmin(PerformanceModelAdmin):
+    list_display = ['url', 'owner', 'created_at']
+    search_fields = ['url', 'owner__email']
+    ordering = ['-created_at']
+    raw_id_fields = ['owner']
+    readonly_fields = ['dhash', 'band0', 'band1', 'band2', 'band3', 'created_at']
 
 @admin.register(Like)
-class LikeAdmin(admin.ModelAdmin):
+class LikeAdmin(PerformanceModelAdmin):
     list_display = ['from_pet', 'to_pet', 'created_at', 'is_match']
     list_filter = ['created_at']
     search_fields = ['from_pet__name', 'to_pet__name']
     ordering = ['-created_at']
     readonly_fields = ['created_at']
+    raw_id_fields = ['from_pet', 'to_pet']
+    
+    def get_queryset(self, request):
+        mutual = Like.objects.filter(from_pet=OuterRef('to_pet'), to_pet=OuterRef('from_pet'))
+        return super().get_queryset(request).annotate(is_mutual=Exists(mutual))
     
     def is_match(self, obj):
-        return obj.is_match()
+        return obj.is_mutual
     is_match.boolean = True
+    is_match.admin_order_field = 'is_mutual'
     is_match.short_description = 'Es Match'
 
 @admin.register(Match)
-class MatchAdmin(admin.ModelAdmin):
+class MatchAdmin(PerformanceModelAdmin):
     list_display = ['pet1', 'pet2', 'created_at', 'message_count']
     list_filter = ['created_at']
     search_fields = ['pet1__name', 'pet2__name']
     ordering = ['-created_at']
     readonly_fields = ['created_at']
+    raw_id_fields = ['pet1', 'pet2']
+    
+    def get_queryset(self, request):
+        # Correlated subquery instead of JOIN + GROUP BY over the whole messages table
+        messages = (
+            Message.objects.filter(match=OuterRef('pk'))
+            .order_by().values('match').annotate(total=Count('id')).values('total')
+        )
+        return super().get_queryset(request).annotate(
+            num_messages=Coalesce(Subquery(messages, output_field=IntegerField()), 0)
+        )
     
     def message_count(self, obj):
-        return obj.messages.count()
+        return obj.num_messages
     message_count.short_description = 'Mensajes'
+    message_count.admin_order_field = 'num_messages'
+    
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        # New matches get their participants from the post_save signal
+        if change and {'pet1', 'pet2'} & set(form.changed_data):
+            MatchParticipant.objects.filter(match=obj).delete()
+            MatchParticipant.objects.add_for([obj])
 
 @admin.register(Message)
-class MessageAdmin(admin.ModelAdmin):
-    list_display = ['sender_pet', 'match', 'content_preview', 'is_read', 'created_at']
-    list_filter = ['is_read', 'created_at']
+class MessageAdmin(PerformanceModelAdmin):
+    list_display = ['sender_pet', 'match', 'content_preview', 'is_read', 'flagged', 'created_at']
+    list_filter = ['flagged', 'created_at']
     search_fields = ['sender_pet__name', 'content']
     ordering = ['-created_at']
     readonly_fields = ['created_at']
+    raw_id_fields = ['match', 'sender_pet']
+    # Match.__str__ shows both pet names
+    list_select_related_extra = ('match__pet1', 'match__pet2')
     
     def content_preview(self, obj):
         return obj.content[:50] + '...' if len(obj.content) > 50 else obj.content
     content_preview.short_description = 'Contenido'
+    
+    def is_read(self, obj):
+        return obj.is_read
+    is_read.boolean = True
+    is_read.short_description = 'Leído'
+
+@admin.register(BlockedTerm)
+class BlockedTermAdmin(admin.ModelAdmin):
+    list_display = ['term', 'action', 'updated_at']
+    list_filter = ['action']
+    search_fields = ['term']
+    ordering = ['term']
+
+@admin.register(MessageChunk)
+class MessageChunkAdmin(PerformanceModelAdmin):
+    list_display = ['match', 'first_message_id', 'last_message_id', 'message_count', 'raw_size', 'created_at']
+    ordering = ['-created_at']
+    raw_id_fields = ['match']
+    exclude = ['data', 'offsets']
+    readonly_fields = ['match', 'first_message_id', 'last_message_id', 'message_count', 'raw_size', 'created_at']
+    list_select_related_extra = ('match__pet1', 'match__pet2')
 
 @admin.register(Pass)
-class PassAdmin(admin.ModelAdmin):
+class PassAdmin(PerformanceModelAdmin):
     list_display = ['from_pet', 'to_pet', 'created_at']
     list_filter = ['created_at']
     search_fields = ['from_pet__name', 'to_pet__name']
     ordering = ['-created_at']
     readonly_fields = ['created_at']
+    raw_id_fields = ['from_pet', 'to_pet']
+
+@admin.register(Task)
+class TaskAdmin(PerformanceModelAdmin):
+    list_display = ['name', 'status', 'priority', 'attempts', 'run_at', 'created_at']
+    list_filter = ['status', 'name']
+    search_fields = ['name']
+    ordering = ['-created_at']
+    readonly_fields = ['created_at', 'updated_at', 'locked_by', 'locked_at', 'last_error']
+
+@admin.register(DeletionJob)
+class DeletionJobAdmin(PerformanceModelAdmin):
+    list_display = ['kind', 'target_id', 'status', 'step', 'rows_deleted', 'batches', 'created_at', 'finished_at']
+    list_filter = ['status', 'kind']
+    ordering = ['-created_at']
+    readonly_fields = ['kind', 'target_id', 'status', 'pet_id', 'step', 'rows_deleted', 'batches', 'created_at', 'updated_at', 'finished_at']
@@ -0,0 +1,92 @@
+"""
+Async versions of the read-heavy endpoints in api/views.py, used instead of
+them when ASYNC_VIEWS is on (the ASGI entry point turns it on). Responses are
+the same as the sync views.
+"""
+from asgiref.sync import sync_to_async
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from tinderpet_backend.async_api import AsyncAPIView
+from . import message_store
+from .discover import discover
+from .models import Match, Pet
+from .pagination import MatchCursorPagination
+from .serializers import MessageSerializer, PetSerializer
+from .views import message_page_params, serialize_matches, user_matches
+
+
+class DiscoverView(AsyncAPIView):
+    permission_classes = [IsAuthenticated]
+    ratelimit = {'group': 'api.views.discover_pets', 'key': 'user', 'rate': '200/h', 'method': 'GET'}
+
+    async def get(self, request):
+        pet_id = request.query_params.get('pet_id')
+
+        if not pet_id:
+            return Response(
+                {'error': 'pet_id is required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            current_pet = await Pet.objects.alive().aget(id=pet_id, owner=request.user)
+        except Pet.DoesNotExist:
+            return Response(
+                {'error': 'Pet not found or you do not own this pet'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        # The seen filter and the NumPy ranking are synchronous: one thread hop for all of it
+        data = await sync_to_async(discover_data)(current_pet, request.user)
+        return Response(data)
+
+class MatchListView(AsyncAPIView):
+    permission_classes = [IsAuthenticated]
+
+    async def get(self, request):
+        paginator = MatchCursorPagination()
+        page = await sync_to_async(paginator.paginate_queryset)(user_matches(request.user), request)
+        data = await sync_to_async(serialize_matches)(page, request)
+        return paginator.get_paginated_response(data)
+
+class MessageListView(AsyncAPIView):
+    permission_classes = [IsAuthenticated]
+
+    async def get(self, request, match_id):
+        try:
+            match = await Match.objects.alive().select_related('pet1', 'pet2').aget(id=match_id)
+        except Match.DoesNotExist:
+            return Response(
+                {'error': 'Match not found'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        # Verify user owns one of the pets in the match
+        if request.user.id not in (match.pet1.owner_id, match.pet2.owner_id):
+            return Response(
+                {'error': 'You do not have permission to view these messages'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        try:
+            before, after, limit = message_page_params(request)
+        except ValueError:
+            return Response(
+                {'error': 'before, after and limit must be positive integers'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # Cold chunks are decompressed in the worker thread, not on the event loop
+        messages = await sync_to_async(message_store.page)(match, before=before, limit=limit, after=after)
+        return Response(MessageSerializer(messages, many=True).data)
+
+
+def discover_data(current_pet, user):
+    return PetSerializer(discover(current_pet, user), many=True).data
+
+
+discover_pets = DiscoverView.as_view()
+list_matches = MatchListView.as_view()
+list_messages = MessageListView.as_view()
@@ -0,0 +1,85 @@
+"""
+Helpers shared by the benchmark_* management commands.
+
+Benchmarks seed synthetic data inside rolled_back(), so they can run against
+any database without leaving rows behind.
+"""
+import random
+import statistics
+import time
+from contextlib import contextmanager
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+
+from .models import Pet
+
+User = get_user_model()
+
+BENCH_BREEDS = ['Golden Retriever', 'Labrador', 'Beagle', 'Poodle', 'Bulldog']
+BENCH_WORDS = (
+    'juguetón tranquilo cariñoso energético playa parque pelota correr dormir '
+    'sofá paseos amigos gatos niños agua nadar montaña ciudad premios'
+).split()
+
+
+@contextmanager
+def rolled_back():
+    """Run the block in a transaction that is always rolled back"""
+    with transaction.atomic():
+        yield
+        transaction.set_rollback(True)
+
+
+def create_users(count):
+    User.objects.bulk_create(
+        User(email=f'bench{i}@bench.tinderpet', username=f'bench{i}')
+        for i in range(count)
+    )
+    # bulk_create only returns primary keys on some backends
+    return list(User.objects.filter(email__endswith='@bench.tinderpet').order_by('id'))
+
+
+def random_bio(rng, words=12):
+    return ' '.join(rng.choice(BENCH_WORDS) for _ in range(words))
+
+
+def create_pets(owners, count, rng=None, breeds=None, **overrides):
+    """Bulk create `count` random pets spread over `owners`"""
+    rng = rng or random.Random(0)
+    breeds = breeds or BENCH_BREEDS[:1]
+    pets = [
+        Pet(
+            owner=owners[i % len(owners)],
+            name=f'Bench {i}',
+            pet_type='dog',
+            breed=rng.choice(breeds),
+            age=rng.randint(1, 14),
+            gender=rng.choice(['male', 'female']),
+            bio=random_bio(rng, rng.randint(0, 20)),
+            main_image=f'https://example.com/{i}.jpg' if rng.random() < 0.8 else None,
+            **overrides,
+        )
+        for i in range(count)
+    ]
+    Pet.objects.bulk_create(pets, batch_size=500)
+    return list(Pet.objects.filter(name__startswith='Bench ').order_by('id'))
+
+
+def measure(func, repeat=20):
+    """Call func `repeat` times and return latency stats in milliseconds"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        'mean': statistics.fmean(samples),
+        'p50': samples[len(samples) // 2],
+        'p95': samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+    }
+
+
+def format_stats(stats):
+    return f"mean={stats['mean']:.2f} ms  p50={stats['p50']:.2f} ms  p95={stats['p95']:.2f} ms"
@@ -0,0 +1,144 @@
+"""
+Breed catalog resolution.
+
+Free-text Pet.breed values are mapped to a canonical Breed row: first by
+canonical key ("golden retriever"), then by an alias added in the admin, then
+by fuzzy matching against the catalog of the same pet type. Trigram
+similarity finds the candidates, and only a spelling a couple of edits away
+is accepted, so typos ("golden retriver") resolve while related breeds
+("labradoodle" / "labrador", "toy poodle" / "poodle") stay apart. Fuzzy hits
+are not saved as aliases: a wrong one would pin every later spelling.
+"""
+from django.conf import settings
+from django.db.models import Count
+
+from .search import normalize
+
+
+def breed_key(text):
+    return normalize(text)
+
+
+def edit_distance(a, b):
+    """Levenshtein distance where swapping two adjacent letters counts as one edit"""
+    previous2, previous = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+def max_edits(key):
+    """Edits allowed for a fuzzy match: 1 for short names, up to BREED_MATCH_MAX_EDITS"""
+    return min(settings.BREED_MATCH_MAX_EDITS, max(1, len(key) // 5))
+
+
+def trigrams(key):
+    """pg_trgm style trigrams: every word padded with two leading and one trailing space"""
+    grams = set()
+    for word in key.split():
+        padded = f'  {word} '
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def similarity(key, other_key):
+    """Trigram Jaccard similarity of two breed keys, as fuzzy_match scores them"""
+    grams, other = trigrams(key), trigrams(other_key)
+    union = len(grams | other)
+    return len(grams & other) / union if union else 0.0
+
+
+class BreedResolver:
+    """
+    Takes the model classes explicitly so data migrations can use it with
+    their historical models.
+    """
+    def __init__(self, breed_model=None, alias_model=None, trigram_model=None):
+        if breed_model is None:
+            from .models import Breed, BreedAlias, BreedTrigram
+            breed_model, alias_model, trigram_model = Breed, BreedAlias, BreedTrigram
+        self.Breed = breed_model
+        self.BreedAlias = alias_model
+        self.BreedTrigram = trigram_model
+
+    def resolve(self, pet_type, text, create=True):
+        key = breed_key(text)
+        if not key:
+            return None
+
+        breed = self.Breed.objects.filter(pet_type=pet_type, key=key).first()
+        if breed:
+            return breed
+
+        alias = self.BreedAlias.objects.filter(pet_type=pet_type, key=key).select_related('breed').first()
+        if alias:
+            return alias.breed
+
+        breed = self.fuzzy_match(pet_type, key)
+        if breed:
+            return breed
+
+        return self.create(pet_type, text, key) if create else None
+
+    def fuzzy_match(self, pet_type, key):
+        """
+        Closest breed by trigram Jaccard similarity among those scoring at least
+        BREED_MATCH_THRESHOLD and within max_edits(key) edits of the key
+        """
+        grams = trigrams(key)
+        if not grams:
+            return None
+
+        candidates = (
+            self.BreedTrigram.objects
+            .filter(trigram__in=grams, breed__pet_type=pet_type)
+            .values('breed_id', 'breed__key', 'breed__trigram_count')
+            .annotate(shared=Count('id'))
+            .order_by('-shared', 'breed_id')[:10]
+        )
+
+        best_id, best_score = None, 0.0
+        for row in candidates:
+            union = len(grams) + row['breed__trigram_count'] - row['shared']
+            score = row['shared'] / union if union else 0.0
+            if (
+                score > best_score
+                and score >= settings.BREED_MATCH_THRESHOLD
+                and self.close_spelling(key, row['breed__key'])
+            ):
+                best_id, best_score = row['breed_id'], score
+
+        if best_id is None:
+            return None
+        return self.Breed.objects.get(id=best_id)
+
+    @staticmethod
+    def close_spelling(key, breed_key):
+        """Whether key reads as a misspelling of breed_key rather than another breed"""
+        if abs(len(key) - len(breed_key)) > max_edits(key):
+            return False
+        return edit_distance(key, breed_key) <= max_edits(key)
+
+    def create(self, pet_type, name, key=None):
+        key = key or breed_key(name)
+        grams = trigrams(key)
+        breed, created = self.Breed.objects.get_or_create(
+            pet_type=pet_type,
+            key=key,
+            defaults={'name': ' '.join(name.split()).title(), 'trigram_count': len(grams)},
+        )
+        if created:
+            self.BreedTrigram.objects.bulk_create(
+                self.BreedTrigram(breed=breed, trigram=gram) for gram in sorted(grams)
+            )
+        return breed
+
+
+def resolve_breed(pet_type, text):
+    return BreedResolver().resolve(pet_type, text)
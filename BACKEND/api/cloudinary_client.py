@@ -0,0 +1,36 @@
+"""
+Cloudinary SDK, imported and configured on first use.
+
+The SDK pulls in urllib3, certifi and friends; only image uploads and the
+cleanup task need it, so nothing imports it at startup.
+"""
+from functools import lru_cache
+
+from django.conf import settings
+
+
+@lru_cache(maxsize=None)
+def _configure():
+    import cloudinary
+
+    credentials = settings.CLOUDINARY_STORAGE
+    if credentials.get('CLOUD_NAME'):
+        cloudinary.config(
+            cloud_name=credentials['CLOUD_NAME'],
+            api_key=credentials['API_KEY'],
+            api_secret=credentials['API_SECRET'],
+        )
+    # Otherwise the SDK falls back to the CLOUDINARY_URL environment variable
+    cloudinary.config(secure=True)
+
+
+def uploader():
+    _configure()
+    import cloudinary.uploader
+    return cloudinary.uploader
+
+
+def admin_api():
+    _configure()
+    import cloudinary.api
+    return cloudinary.api
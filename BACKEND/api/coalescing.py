@@ -0,0 +1,152 @@
+"""
+Single-flight coalescing of identical concurrent reads.
+
+When the same user fires the same GET several times at once (several devices,
+duplicated frontend requests), only the first request runs the view. The
+others wait for it and get a copy of its response bytes, marked with an
+"X-Coalesced: hit" header. Requests are identical when they share the
+Authorization header, the full path with its query string and the headers
+that change the response (Accept, Accept-Language and the conditional
+request validators).
+
+Only paths matching COALESCE_PATHS are coalesced, and only while a request is
+in flight: nothing is cached once the first response has been returned.
+"""
+import asyncio
+import logging
+import re
+import threading
+from collections import Counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import HttpResponse
+
+logger = logging.getLogger(__name__)
+
+KEY_HEADERS = ['HTTP_AUTHORIZATION', 'HTTP_ACCEPT', 'HTTP_ACCEPT_LANGUAGE', 'HTTP_IF_NONE_MATCH', 'HTTP_IF_MODIFIED_SINCE']
+
+# (outcome, path pattern) -> requests. Outcomes: "leader" ran the view, "hit"
+# shared a leader's response, "fallback" waited in vain and ran the view itself
+counters = Counter()
+_counters_lock = threading.Lock()
+
+
+def count(outcome, pattern):
+    with _counters_lock:
+        counters[outcome, pattern] += 1
+
+
+def snapshot():
+    """Copy of the counters, e.g. for a benchmark or a debugging shell"""
+    with _counters_lock:
+        return dict(counters)
+
+
+def shareable(response):
+    """What followers need to rebuild the response, None if it cannot be shared"""
+    if response.streaming or response.cookies:
+        return None
+    return response.status_code, list(response.items()), response.content
+
+
+def rebuild(shared):
+    status, headers, content = shared
+    response = HttpResponse(content, status=status)
+    for name, value in headers:
+        response[name] = value
+    response['X-Coalesced'] = 'hit'
+    return response
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.shared = None
+
+
+class RequestCoalescingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = settings.COALESCE_REQUESTS
+        self.patterns = [re.compile(pattern) for pattern in settings.COALESCE_PATHS]
+        self.wait_seconds = settings.COALESCE_WAIT_SECONDS
+        self.flights = {}
+        self.lock = threading.Lock()
+        self.async_flights = {}
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def key(self, request):
+        """(pattern, key) for a coalescable request, (None, None) otherwise"""
+        if not self.enabled or request.method not in ('GET', 'HEAD'):
+            return None, None
+        for pattern in self.patterns:
+            if pattern.match(request.path_info):
+                key = (request.method, request.get_full_path(), *(request.META.get(h) for h in KEY_HEADERS))
+                return pattern.pattern, key
+        return None, None
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        pattern, key = self.key(request)
+        if key is None:
+            return self.get_response(request)
+
+        with self.lock:
+            flight = self.flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self.flights[key] = _Flight()
+
+        if not leader:
+            flight.done.wait(self.wait_seconds)
+            if flight.shared is not None:
+                count('hit', pattern)
+                return rebuild(flight.shared)
+            count('fallback', pattern)
+            return self.get_response(request)
+
+        count('leader', pattern)
+        try:
+            response = self.get_response(request)
+            flight.shared = shareable(response)
+            return response
+        finally:
+            with self.lock:
+                del self.flights[key]
+            flight.done.set()
+
+    async def __acall__(self, request):
+        pattern, key = self.key(request)
+        if key is None:
+            return await self.get_response(request)
+
+        # Async requests all run on the process' event loop: no lock needed
+        future = self.async_flights.get(key)
+        if future is not None:
+            try:
+                shared = await asyncio.wait_for(asyncio.shield(future), self.wait_seconds)
+            except asyncio.TimeoutError:
+                shared = None
+            if shared is not None:
+                count('hit', pattern)
+                return rebuild(shared)
+            count('fallback', pattern)
+            return await self.get_response(request)
+
+        count('leader', pattern)
+        future = self.async_flights[key] = asyncio.get_running_loop().create_future()
+        shared = None
+        try:
+            response = await self.get_response(request)
+            shared = shareable(response)
+            return response
+        finally:
+            del self.async_flights[key]
+            future.set_result(shared)
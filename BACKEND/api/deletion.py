@@ -0,0 +1,176 @@
+"""
+Deferred cascade deletion of pets and accounts.
+
+Deleting soft-deletes at once (Pet.deleted_at, User.is_active) so the pet
+disappears from discover, search and matches, and queues a DeletionJob. The
+api.purge_deleted task then removes the related rows step by step in batches
+of DELETION_BATCH_SIZE, each batch in its own short transaction together with
+the job's progress, so a crash resumes exactly where it stopped and swipes
+never wait behind one huge CASCADE.
+"""
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import DeletionJob, ImageFingerprint, Like, Match, Message, MessageChunk, Pass, Pet, PetImage
+from .sync import record_tombstones
+from .taskqueue import enqueue
+from .tasks import cloudinary_public_id
+
+User = get_user_model()
+
+
+def _pet_matches(pet_id):
+    return Match.objects.filter(Q(pet1_id=pet_id) | Q(pet2_id=pet_id))
+
+
+# Children first, so the final Pet delete has nothing left to cascade
+PET_STEPS = [
+    ('messages', lambda pet_id: Message.objects.filter(match__in=_pet_matches(pet_id))),
+    ('message_chunks', lambda pet_id: MessageChunk.objects.filter(match__in=_pet_matches(pet_id))),
+    ('matches', _pet_matches),
+    ('likes', lambda pet_id: Like.objects.filter(Q(from_pet_id=pet_id) | Q(to_pet_id=pet_id))),
+    ('passes', lambda pet_id: Pass.objects.filter(Q(from_pet_id=pet_id) | Q(to_pet_id=pet_id))),
+    ('images', lambda pet_id: PetImage.objects.filter(pet_id=pet_id)),
+    ('pet', lambda pet_id: Pet.objects.filter(id=pet_id)),
+]
+STEP_NAMES = [name for name, _ in PET_STEPS]
+STEP_QUERYSETS = dict(PET_STEPS)
+
+
+def queue_job(job_id):
+    enqueue('api.purge_deleted', {'job_id': job_id}, priority=-10)
+
+
+def _pending_job(kind, target_id):
+    return DeletionJob.objects.filter(kind=kind, target_id=target_id).exclude(status=DeletionJob.STATUS_DONE).first()
+
+
+def schedule_pet_deletion(pet):
+    with transaction.atomic():
+        job = _pending_job(DeletionJob.KIND_PET, pet.id)
+        if job:
+            return job
+        pet.soft_delete()
+        record_tombstones([pet.id])
+        job = DeletionJob.objects.create(kind=DeletionJob.KIND_PET, target_id=pet.id, pet_id=pet.id)
+        queue_job(job.id)
+    return job
+
+
+def schedule_user_deletion(user):
+    """Deactivate the account (no more logins or tokens) and hide all its pets"""
+    with transaction.atomic():
+        job = _pending_job(DeletionJob.KIND_USER, user.id)
+        if job:
+            return job
+        user.is_active = False
+        user.save(update_fields=['is_active'])
+        pet_ids = list(Pet.objects.filter(owner=user).alive().values_list('id', flat=True))
+        now = timezone.now()
+        Pet.objects.filter(id__in=pet_ids).update(deleted_at=now, is_active=False, updated_at=now)
+        record_tombstones(pet_ids)
+        job = DeletionJob.objects.create(kind=DeletionJob.KIND_USER, target_id=user.id)
+        queue_job(job.id)
+    return job
+
+
+def _enqueue_image_cleanup(urls, image_ids=(), pet_ids=()):
+    """
+    Queue the Cloudinary deletion of the images of rows about to be deleted.
+    Deduplicated uploads (api/image_dedup.py) share one asset, so images
+    still used by other pets or photos are kept.
+    """
+    urls = {url for url in urls if url}
+    in_use = set(PetImage.objects.filter(image__in=urls).exclude(id__in=image_ids).values_list('image', flat=True))
+    in_use |= set(Pet.objects.filter(main_image__in=urls).exclude(id__in=pet_ids).values_list('main_image', flat=True))
+    unused = urls - in_use
+    ImageFingerprint.objects.filter(url__in=unused).delete()
+    for url in sorted(unused):
+        public_id = cloudinary_public_id(url)
+        if public_id:
+            enqueue('api.delete_cloudinary_images', {'public_id': public_id}, priority=-10)
+
+
+def _delete_batch(step, pet_id, batch_size):
+    queryset = STEP_QUERYSETS[step](pet_id)
+    ids = list(queryset.order_by().values_list('id', flat=True)[:batch_size])
+    if not ids:
+        return 0
+
+    if step == 'images':
+        _enqueue_image_cleanup(PetImage.objects.filter(id__in=ids).values_list('image', flat=True), image_ids=ids)
+    elif step == 'pet':
+        _enqueue_image_cleanup(Pet.objects.filter(id__in=ids).values_list('main_image', flat=True), pet_ids=ids)
+
+    queryset.model.objects.filter(id__in=ids).delete()
+    return len(ids)
+
+
+def run_batch(job_id, batch_size=None):
+    """
+    Delete one batch for the job and save its progress in the same
+    transaction. Returns False once the job is done.
+    """
+    batch_size = batch_size or settings.DELETION_BATCH_SIZE
+
+    with transaction.atomic():
+        job = DeletionJob.objects.select_for_update().get(id=job_id)
+        if job.status == DeletionJob.STATUS_DONE:
+            return False
+
+        job.status = DeletionJob.STATUS_RUNNING
+        if job.pet_id is None:
+            # User job between pets: take the next one, or finish with the account
+            job.pet_id = Pet.objects.filter(owner_id=job.target_id).order_by('id').values_list('id', flat=True).first()
+            job.step = ''
+            if job.pet_id is None:
+                deleted, _ = User.objects.filter(id=job.target_id).delete()
+                return _finish(job, deleted)
+
+        step = job.step or STEP_NAMES[0]
+        deleted = _delete_batch(step, job.pet_id, batch_size)
+        job.rows_deleted += deleted
+        job.batches += 1
+
+        if deleted < batch_size:
+            # Step exhausted: move on, or to the next pet once the pet row is gone
+            if step == STEP_NAMES[-1]:
+                if job.kind == DeletionJob.KIND_PET:
+                    return _finish(job, 0)
+                job.pet_id = None
+                job.step = ''
+            else:
+                job.step = STEP_NAMES[STEP_NAMES.index(step) + 1]
+        else:
+            job.step = step
+
+        job.save()
+        return True
+
+
+def _finish(job, deleted):
+    job.rows_deleted += deleted
+    job.status = DeletionJob.STATUS_DONE
+    job.step = ''
+    job.finished_at = timezone.now()
+    job.save()
+    return False
+
+
+def run_job(job_id, max_batches=None, batch_size=None, pause=None):
+    """Run up to max_batches batches. Returns True when the job is complete."""
+    max_batches = max_batches or settings.DELETION_BATCHES_PER_TASK
+    pause = settings.DELETION_BATCH_PAUSE_SECONDS if pause is None else pause
+
+    for _ in range(max_batches):
+        if not run_batch(job_id, batch_size):
+            return True
+        # Give other writers a chance at the SQLite write lock
+        if pause:
+            time.sleep(pause)
+    return False
@@ -0,0 +1,151 @@
+"""
+Discover pipeline: stream candidate ids (nearest grid cells first when the pet
+has a location), drop the ones the pet has already seen, rank the surviving
+pool (see api/ranking.py) and load the winners. similar() applies the same
+exclusions to the pets most like a given profile (see api/similarity.py).
+"""
+from django.conf import settings
+
+from . import geo, pass_buffer, seen_filter
+from .models import Pet
+
+
+def candidate_queryset(current_pet, user):
+    """Pets eligible for discover, before removing the ones already seen"""
+    if current_pet.canonical_breed_id:
+        same_breed = {'canonical_breed_id': current_pet.canonical_breed_id}
+    else:
+        same_breed = {'breed': current_pet.breed}
+
+    return Pet.objects.alive().filter(
+        **same_breed,  # Same breed only
+        pet_type=current_pet.pet_type,  # Same pet type
+        is_active=True
+    ).exclude(
+        owner=user  # Exclude own pets
+    )
+
+
+def search_areas(current_pet, user):
+    """
+    Candidate querysets in the order discover should read them: the pet's own
+    grid cell, then each surrounding ring of cells, then everything else
+    (farther pets and pets without a location). Pets without a location
+    search the whole catalog.
+    """
+    candidates = candidate_queryset(current_pet, user)
+    if not current_pet.geo_cell:
+        yield candidates
+        return
+
+    searched = set()
+    for k in range(settings.DISCOVER_MAX_RINGS + 1):
+        cells = geo.ring(current_pet.geo_cell, k)
+        searched.update(cells)
+        yield candidates.filter(geo_cell__in=cells)
+    yield candidates.exclude(geo_cell__in=searched)
+
+
+def unseen_candidate_ids(current_pet, user, limit, bloom=None):
+    """Up to `limit` random candidate ids the pet has not seen yet, nearest areas first"""
+    chunk_size = settings.DISCOVER_CHUNK_SIZE
+    if bloom is None:
+        bloom = seen_filter.load(current_pet.id)
+
+    selected = []
+    for area in search_areas(current_pet, user):
+        candidate_ids = area.order_by('?').values_list('id', flat=True).iterator(chunk_size=chunk_size)
+
+        chunk = []
+        for candidate_id in candidate_ids:
+            chunk.append(candidate_id)
+            if len(chunk) == chunk_size:
+                selected += seen_filter.filter_unseen(current_pet.id, chunk, bloom)
+                chunk = []
+                if len(selected) >= limit:
+                    return selected[:limit]
+        if chunk:
+            selected += seen_filter.filter_unseen(current_pet.id, chunk, bloom)
+        if len(selected) >= limit:
+            break
+
+    return selected[:limit]
+
+
+def admirer_ids(current_pet, user, limit, bloom=None):
+    """Unseen candidates that already liked current_pet: every one is a match on a like"""
+    liked_me = list(
+        candidate_queryset(current_pet, user)
+        .filter(likes_given__to_pet=current_pet)
+        .order_by('-likes_given__created_at')
+        .values_list('id', flat=True)[:settings.DISCOVER_CHUNK_SIZE]
+    )
+    return seen_filter.filter_unseen(current_pet.id, liked_me, bloom)[:limit]
+
+
+def candidate_pool(current_pet, user, size):
+    """Random unseen candidates, topped up with every unseen admirer"""
+    bloom = seen_filter.load(current_pet.id)
+    admirers = admirer_ids(current_pet, user, size, bloom)
+    candidates = unseen_candidate_ids(current_pet, user, size, bloom)
+    # Passes acknowledged but not written yet count as seen too
+    pending = pass_buffer.buffer.pending_for(current_pet.id, admirers + candidates)
+    pool = [pet_id for pet_id in admirers if pet_id not in pending]
+    pool_set = set(pool) | pending
+    for candidate_id in candidates:
+        if candidate_id not in pool_set:
+            pool.append(candidate_id)
+            pool_set.add(candidate_id)
+    return pool
+
+
+def load_pets(pet_ids):
+    """Pets for pet_ids, in the same order, ready for PetSerializer"""
+    pets = Pet.objects.filter(id__in=pet_ids).select_related('owner').prefetch_related('images')
+    pets_by_id = {pet.id: pet for pet in pets}
+    return [pets_by_id[pet_id] for pet_id in pet_ids if pet_id in pets_by_id]
+
+
+def discover(current_pet, user, limit=None, ranker=None):
+    """Return the `limit` best ranked unseen pets for current_pet"""
+    # NumPy is only imported once a discover request needs it
+    from .ranking import build_features, ranker_for_user
+
+    limit = limit or settings.DISCOVER_PAGE_SIZE
+    ranker = ranker or ranker_for_user(user)
+
+    pool = candidate_pool(current_pet, user, settings.DISCOVER_CANDIDATE_POOL)
+    features = build_features(current_pet, pool)
+    return load_pets(ranker.rank(features, limit))
+
+
+def similar(current_pet, user, pet, limit=None):
+    """
+    The `limit` pets most like `pet` that discover could still show
+    current_pet: same type, active, not the user's own, not seen yet
+    """
+    from .similarity import index, rebuild_index
+
+    limit = limit or settings.SIMILAR_PETS_PAGE_SIZE
+    if not index.exists():
+        rebuild_index()
+
+    bloom = seen_filter.load(current_pet.id)
+    count = limit * settings.SIMILAR_PETS_OVERFETCH
+    while True:
+        ranked = index.nearest(pet.bio, pet.breed, pet.pet_type, count, exclude_id=pet.id)
+        eligible = set(
+            Pet.objects.alive()
+            .filter(id__in=ranked, pet_type=current_pet.pet_type, is_active=True)
+            .exclude(owner=user)
+            .values_list('id', flat=True)
+        )
+        candidates = [pet_id for pet_id in ranked if pet_id in eligible]
+        # Passes acknowledged but not written yet count as seen too
+        pending = pass_buffer.buffer.pending_for(current_pet.id, candidates)
+        candidates = [pet_id for pet_id in candidates if pet_id not in pending]
+        selected = seen_filter.filter_unseen(current_pet.id, candidates, bloom)[:limit]
+        # Fewer ranked ids than asked for means the whole index was read
+        if len(selected) >= limit or len(ranked) < count or count >= settings.SIMILAR_PETS_MAX_SCAN:
+            return load_pets(selected)
+        count *= 4
@@ -0,0 +1,98 @@
+"""
+"Download all my data": a user's account, pets, images, likes and passes
+given, matches and every message of those matches (hot and archived), as one
+JSON object per line.
+
+Everything is read with QuerySet.iterator(chunk_size=EXPORT_CHUNK_SIZE) and
+written as it is produced, so memory stays flat however long the history is.
+"""
+import zlib
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .message_store import unpack
+from .models import Like, Match, Message, MessageChunk, Pass, Pet, PetImage
+
+USER_FIELDS = ['id', 'email', 'username', 'first_name', 'last_name', 'date_joined', 'last_login', 'created_at']
+MESSAGE_FIELDS = ['id', 'match_id', 'sender_pet_id', 'content', 'created_at']
+
+
+def export_records(user):
+    """(type, data) pairs for everything stored about `user`"""
+    chunk_size = settings.EXPORT_CHUNK_SIZE
+    yield 'user', {field: getattr(user, field) for field in USER_FIELDS}
+
+    pets = Pet.objects.filter(owner=user)
+    for pet in pets.order_by('id').values().iterator(chunk_size=chunk_size):
+        yield 'pet', pet
+
+    images = PetImage.objects.filter(pet__owner=user).order_by('id')
+    for image in images.values('id', 'pet_id', 'image', 'uploaded_at').iterator(chunk_size=chunk_size):
+        yield 'pet_image', image
+
+    likes = Like.objects.filter(from_pet__owner=user).order_by('id')
+    for like in likes.values('id', 'from_pet_id', 'to_pet_id', 'created_at').iterator(chunk_size=chunk_size):
+        yield 'like', like
+
+    passes = Pass.objects.filter(from_pet__owner=user).order_by('id')
+    for pass_obj in passes.values('id', 'from_pet_id', 'to_pet_id', 'created_at').iterator(chunk_size=chunk_size):
+        yield 'pass', pass_obj
+
+    matches = Match.objects.for_owner(user).order_by('id')
+    for match in matches.values('id', 'pet1_id', 'pet2_id', 'created_at').iterator(chunk_size=chunk_size):
+        yield 'match', match
+
+    # Archived messages first: they are older than anything still in the hot table
+    chunks = MessageChunk.objects.filter(match__in=matches).order_by('match_id', 'first_message_id')
+    for chunk in chunks.only('match_id', 'data', 'offsets').iterator(chunk_size=1):
+        for record in unpack(chunk):
+            yield 'message', {'match_id': chunk.match_id, **record}
+
+    messages = Message.objects.filter(match__in=matches).order_by('match_id', 'id')
+    for message in messages.values(*MESSAGE_FIELDS).iterator(chunk_size=chunk_size):
+        yield 'message', message
+
+
+def ndjson_lines(user):
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    for record_type, data in export_records(user):
+        yield (encoder.encode({'type': record_type, 'data': data}) + '\n').encode('utf-8')
+
+
+def gzipped(parts, min_size=64 * 1024):
+    """gzip a byte stream on the fly, emitting pieces of at least min_size"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    buffer = bytearray()
+    for part in parts:
+        buffer += compressor.compress(part)
+        if len(buffer) >= min_size:
+            yield bytes(buffer)
+            buffer.clear()
+    buffer += compressor.flush()
+    yield bytes(buffer)
+
+
+def batched(parts, size=256):
+    batch = []
+    for part in parts:
+        batch.append(part)
+        if len(batch) == size:
+            yield b''.join(batch)
+            batch = []
+    if batch:
+        yield b''.join(batch)
+
+
+async def aiterate(parts):
+    """
+    Serve a sync byte stream from an async server without buffering it all:
+    each part is produced by one sync_to_async call on the request's thread.
+    """
+    iterator = iter(parts)
+    while True:
+        part = await sync_to_async(next)(iterator, None)
+        if part is None:
+            return
+        yield part
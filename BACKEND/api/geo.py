@@ -0,0 +1,84 @@
+"""
+Geohash grid used by location-aware discover.
+
+Pets with a location store the geohash of their grid cell in Pet.geo_cell
+(GEO_CELL_PRECISION characters, indexed). Discover starts at the viewer's
+cell and walks outward one square ring of neighbouring cells at a time.
+"""
+from django.conf import settings
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+DECODE_MAP = {c: i for i, c in enumerate(BASE32)}
+
+
+def encode(latitude, longitude, precision=None):
+    precision = precision or settings.GEO_CELL_PRECISION
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = value = 0
+    even = True
+
+    while len(chars) < precision:
+        rng, coord = (lon_range, longitude) if even else (lat_range, latitude)
+        mid = (rng[0] + rng[1]) / 2
+        if coord >= mid:
+            value = (value << 1) | 1
+            rng[0] = mid
+        else:
+            value <<= 1
+            rng[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(BASE32[value])
+            bits = value = 0
+
+    return ''.join(chars)
+
+
+def bounds(cell):
+    """(lat_min, lat_max, lon_min, lon_max) of a geohash cell"""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    even = True
+
+    for char in cell:
+        value = DECODE_MAP[char]
+        for shift in range(4, -1, -1):
+            rng = lon_range if even else lat_range
+            mid = (rng[0] + rng[1]) / 2
+            if value >> shift & 1:
+                rng[0] = mid
+            else:
+                rng[1] = mid
+            even = not even
+
+    return lat_range[0], lat_range[1], lon_range[0], lon_range[1]
+
+
+def ring(cell, k):
+    """Cells at Chebyshev distance k from `cell` (the cell itself for k=0)"""
+    lat_min, lat_max, lon_min, lon_max = bounds(cell)
+    if k == 0:
+        return [cell]
+
+    lat_step = lat_max - lat_min
+    lon_step = lon_max - lon_min
+    center_lat = (lat_min + lat_max) / 2
+    center_lon = (lon_min + lon_max) / 2
+
+    offsets = [(i, j) for i in range(-k, k + 1) for j in range(-k, k + 1) if max(abs(i), abs(j)) == k]
+    cells = []
+    seen = set()
+    for i, j in offsets:
+        lat = center_lat + i * lat_step
+        if not -90 < lat < 90:
+            continue
+        lon = (center_lon + j * lon_step + 180) % 360 - 180
+        neighbour = encode(lat, lon, len(cell))
+        if neighbour not in seen:
+            seen.add(neighbour)
+            cells.append(neighbour)
+    return cells
+
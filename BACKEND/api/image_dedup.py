@@ -0,0 +1,116 @@
+"""
+Duplicate and near-duplicate detection of uploaded pet photos.
+
+upload_image computes a 64-bit difference hash (dHash) of every upload with
+Pillow. It survives resizing, recompression and small edits, so the same
+photo uploaded again lands within a few bits of the first upload's hash.
+If the user already stored an image within IMAGE_DEDUP_MAX_DISTANCE bits,
+its URL is returned instead of uploading a new copy to Cloudinary.
+
+Lookups use multi-index hashing: the hash is split into four 16-bit bands,
+each indexed with the owner in ImageFingerprint. Two hashes at most 3 bits
+apart agree exactly on at least one band, so the candidates are the rows
+sharing a band (four index lookups), checked in Python by Hamming distance.
+The number of rows read depends on the bands, not on the number of images.
+"""
+from django.conf import settings
+from django.db.models import Q
+
+from .models import ImageFingerprint
+
+HASH_SIZE = 8  # 8x8 comparisons: 64 bits
+BANDS = 4
+BAND_BITS = 16
+MASK = (1 << 64) - 1
+
+
+def dhash(file):
+    """Difference hash of an image file (0..2**64-1), None if Pillow cannot read it"""
+    from PIL import Image, UnidentifiedImageError
+
+    try:
+        with Image.open(file) as image:
+            # JPEG: let the decoder scale down while decoding
+            image.draft('L', (HASH_SIZE * 8, HASH_SIZE * 8))
+            pixels = image.convert('L').resize((HASH_SIZE + 1, HASH_SIZE), Image.LANCZOS).tobytes()
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError):
+        return None
+    finally:
+        file.seek(0)
+
+    value = 0
+    for row in range(HASH_SIZE):
+        for col in range(HASH_SIZE):
+            left = pixels[row * (HASH_SIZE + 1) + col]
+            value = value << 1 | (left > pixels[row * (HASH_SIZE + 1) + col + 1])
+    return value
+
+
+def bands(value):
+    return [(value >> (BAND_BITS * i)) & ((1 << BAND_BITS) - 1) for i in range(BANDS)]
+
+
+def to_signed(value):
+    """A 64-bit hash as the signed value BigIntegerField stores"""
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def distance(a, b):
+    return ((a ^ b) & MASK).bit_count()
+
+
+def fingerprint(owner_id, value, url, public_id=''):
+    """Unsaved ImageFingerprint row for a hash"""
+    return ImageFingerprint(
+        owner_id=owner_id,
+        url=url,
+        public_id=public_id or '',
+        dhash=to_signed(value),
+        **{f'band{i}': band for i, band in enumerate(bands(value))},
+    )
+
+
+def near(owner, value, max_distance=None):
+    """The owner's stored images within max_distance bits of the hash, closest first"""
+    max_distance = settings.IMAGE_DEDUP_MAX_DISTANCE if max_distance is None else max_distance
+    shares_a_band = Q()
+    for i, band in enumerate(bands(value)):
+        shares_a_band |= Q(**{f'band{i}': band})
+
+    found = [
+        (distance(value, candidate.dhash), candidate.id, candidate)
+        for candidate in ImageFingerprint.objects.filter(shares_a_band, owner=owner)
+    ]
+    return [candidate for candidate_distance, _, candidate in sorted(found) if candidate_distance <= max_distance]
+
+
+def find_duplicate(owner, value):
+    """The owner's stored image closest to the hash, None if none is near enough"""
+    matches = near(owner, value)
+    return matches[0] if matches else None
+
+
+def remember(owner, value, url, public_id=''):
+    """Record a newly stored image so later uploads can reuse it"""
+    row = fingerprint(owner.id, value, url, public_id)
+    ImageFingerprint.objects.update_or_create(
+        owner=owner, url=url,
+        defaults={field: getattr(row, field) for field in ('public_id', 'dhash', 'band0', 'band1', 'band2', 'band3')},
+    )
+
+
+def unique_urls(owner, urls):
+    """urls without repeats or near-identical images, keeping the first of each"""
+    max_distance = settings.IMAGE_DEDUP_MAX_DISTANCE
+    hashes = dict(ImageFingerprint.objects.filter(owner=owner, url__in=urls).values_list('url', 'dhash'))
+    kept, kept_hashes = [], []
+    for url in urls:
+        if url in kept:
+            continue
+        value = hashes.get(url)
+        if value is not None:
+            if any(distance(value, other) <= max_distance for other in kept_hashes):
+                continue
+            kept_hashes.append(value)
+        kept.append(url)
+    return kept
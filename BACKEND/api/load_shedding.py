@@ -0,0 +1,155 @@
+"""
+Adaptive concurrency limits and load shedding per endpoint class.
+
+Every request matching LOAD_SHEDDING_CLASSES is counted in flight for its
+class while it runs. Each class has a concurrency limit that adapts with
+AIMD: it grows by about one for every limit's worth of requests answered
+within the class' target latency, and shrinks by LOAD_SHEDDING_DECREASE when
+one is slower (at most once per target latency, so one burst does not
+collapse it).
+
+Classes marked critical (login, swipes, sending messages) are never rejected: when
+they get slow, the limits of every other class shrink instead, so the
+database time goes to them. A request of a non-critical class that finds its
+class at the limit gets an immediate 503 with Retry-After instead of queueing
+for locks and timing out after doing its work anyway.
+"""
+import math
+import re
+import threading
+import time
+from collections import Counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import JsonResponse
+
+
+class Limiter:
+    def __init__(self, name, target_ms, critical=False):
+        self.name = name
+        self.target = target_ms / 1000
+        self.critical = critical
+        self.limit = float(settings.LOAD_SHEDDING_INITIAL_LIMIT)
+        self.in_flight = 0
+        self.latency = self.target / 2  # Moving average, used for Retry-After
+        self.last_decrease = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Take a slot; False means shed the request (never for critical classes)"""
+        with self.lock:
+            if not self.critical and self.in_flight >= int(self.limit):
+                return False
+            self.in_flight += 1
+            return True
+
+    def release(self, elapsed, failed=False):
+        """Free the slot; True when the request was over its target latency"""
+        with self.lock:
+            self.in_flight -= 1
+            self.latency += (elapsed - self.latency) * 0.2
+            slow = failed or elapsed > self.target
+            if slow:
+                self._decrease()
+            elif self.in_flight + 1 >= int(self.limit):
+                # Only grow while the limit is actually what holds requests back
+                self.limit = min(self.limit + 1 / self.limit, settings.LOAD_SHEDDING_MAX_LIMIT)
+            return slow
+
+    def decrease(self):
+        with self.lock:
+            self._decrease()
+
+    def _decrease(self):
+        now = time.monotonic()
+        if now - self.last_decrease >= self.target:
+            self.limit = max(self.limit * settings.LOAD_SHEDDING_DECREASE, settings.LOAD_SHEDDING_MIN_LIMIT)
+            self.last_decrease = now
+
+    def retry_after(self):
+        return max(1, math.ceil(self.latency * 2))
+
+
+class AdaptiveConcurrencyMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = settings.LOAD_SHEDDING_ENABLED
+        self.classes = [
+            (re.compile(spec['path']), Limiter(spec['name'], spec['target_ms'], spec.get('critical', False)))
+            for spec in settings.LOAD_SHEDDING_CLASSES
+        ]
+        self.shed = Counter()
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def limiter_for(self, request):
+        if not self.enabled:
+            return None
+        for pattern, limiter in self.classes:
+            if pattern.match(request.path_info):
+                return limiter
+        return None
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        limiter = self.limiter_for(request)
+        if limiter is None:
+            return self.get_response(request)
+        if not limiter.acquire():
+            return self.reject(limiter)
+
+        start = time.monotonic()
+        failed = True
+        try:
+            response = self.get_response(request)
+            failed = response.status_code >= 500
+            return response
+        finally:
+            self.finish(limiter, time.monotonic() - start, failed)
+
+    async def __acall__(self, request):
+        limiter = self.limiter_for(request)
+        if limiter is None:
+            return await self.get_response(request)
+        if not limiter.acquire():
+            return self.reject(limiter)
+
+        start = time.monotonic()
+        failed = True
+        try:
+            response = await self.get_response(request)
+            failed = response.status_code >= 500
+            return response
+        finally:
+            self.finish(limiter, time.monotonic() - start, failed)
+
+    def finish(self, limiter, elapsed, failed):
+        if limiter.release(elapsed, failed) and limiter.critical:
+            # A critical path is suffering: make room for it
+            for _, other in self.classes:
+                if not other.critical:
+                    other.decrease()
+
+    def reject(self, limiter):
+        self.shed[limiter.name] += 1
+        response = JsonResponse({'error': 'Server busy, please retry later'}, status=503)
+        response['Retry-After'] = str(limiter.retry_after())
+        return response
+
+    def snapshot(self):
+        """Current limit, in-flight requests and shed count per class"""
+        return {
+            limiter.name: {
+                'limit': int(limiter.limit),
+                'in_flight': limiter.in_flight,
+                'latency_ms': round(limiter.latency * 1000, 1),
+                'shed': self.shed[limiter.name],
+            }
+            for _, limiter in self.classes
+        }
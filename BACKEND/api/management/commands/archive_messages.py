@@ -0,0 +1,56 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api.message_store import compact_match
+from api.models import Match, Message
+
+
+class Command(BaseCommand):
+    help = 'Move old, already read messages into compressed per-match chunks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than-days', type=int, default=settings.MESSAGE_ARCHIVE_AFTER_DAYS)
+        parser.add_argument('--chunk-size', type=int, default=settings.MESSAGE_CHUNK_SIZE)
+        parser.add_argument('--after-match', type=int, default=0, help='Resume after this match id')
+        parser.add_argument('--max-matches', type=int, help='Stop after this many matches')
+        parser.add_argument(
+            '--sleep', type=float, default=0.01,
+            help='Seconds to pause between matches so writers can take the lock',
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['older_than_days'])
+        last_match_id = options['after_match']
+        matches = archived = chunks = 0
+
+        # Chunks are committed one by one and matches visited in id order, so
+        # an interrupted run can be restarted as is or with --after-match.
+        while options['max_matches'] is None or matches < options['max_matches']:
+            match_ids = list(
+                Message.objects.filter(created_at__lt=cutoff, match_id__gt=last_match_id)
+                .order_by('match_id').values_list('match_id', flat=True).distinct()[:500]
+            )
+            if not match_ids:
+                break
+
+            for match in Match.objects.filter(id__in=match_ids).order_by('id'):
+                match_archived, match_chunks = compact_match(match, cutoff, options['chunk_size'])
+                archived += match_archived
+                chunks += match_chunks
+                matches += 1
+                last_match_id = match.id
+                if match_archived:
+                    self.stdout.write(f'Match {match.id}: {match_archived} messages in {match_chunks} chunks')
+                if options['max_matches'] is not None and matches >= options['max_matches']:
+                    break
+                time.sleep(options['sleep'])
+            else:
+                last_match_id = max(last_match_id, match_ids[-1])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Archived {archived} messages into {chunks} chunks ({matches} matches, last match id {last_match_id})'
+        ))
@@ -0,0 +1,55 @@
+import random
+
+from django.core.management.base import BaseCommand
+
+from api.benchmarks import create_pets, create_users, format_stats, measure, rolled_back
+from api.discover import discover, search_areas
+from api.models import Pet
+
+
+class Command(BaseCommand):
+    help = 'Compare candidate-scan size and latency of geo and catalog-wide discover as the catalog grows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 5000, 20000])
+        parser.add_argument('--center', type=float, nargs=2, default=[-12.05, -77.04], metavar=('LAT', 'LON'))
+        parser.add_argument('--spread-km', type=float, default=300, help='Side of the square pets are spread over')
+        parser.add_argument('--repeat', type=int, default=10)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def scanned(self, pet, limit):
+        """Rows the candidate queries read before enough candidates are found"""
+        total = 0
+        for area in search_areas(pet, pet.owner):
+            total += area.count()
+            if total >= limit:
+                break
+        return total
+
+    def handle(self, *args, **options):
+        lat0, lon0 = options['center']
+        spread_deg = options['spread_km'] / 111.0
+
+        self.stdout.write(f"{'pets':>8} {'mode':>8} {'scanned':>9}  latency")
+        for size in options['sizes']:
+            rng = random.Random(options['seed'])
+            with rolled_back():
+                owners = create_users(max(size // 2, 1))
+                pets = create_pets(owners, size, rng)
+
+                # bulk_create skips save(), which is what fills geo_cell
+                for pet in pets:
+                    pet.latitude = lat0 + (rng.random() - 0.5) * spread_deg
+                    pet.longitude = lon0 + (rng.random() - 0.5) * spread_deg
+                    pet.save(update_fields=['latitude', 'longitude'])
+
+                viewer = pets[0]
+                located = Pet.objects.select_related('owner').get(id=viewer.id)
+                unlocated = Pet.objects.select_related('owner').get(id=viewer.id)
+                unlocated.latitude = unlocated.longitude = None
+                unlocated.geo_cell = ''
+
+                for mode, pet in (('geo', located), ('catalog', unlocated)):
+                    stats = measure(lambda: discover(pet, pet.owner), options['repeat'])
+                    scanned = self.scanned(pet, 20)
+                    self.stdout.write(f'{size:>8} {mode:>8} {scanned:>9}  {format_stats(stats)}')
@@ -0,0 +1,105 @@
+import random
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Max
+from django.utils import timezone
+
+from api.benchmarks import create_pets, create_users, format_stats, measure, random_bio, rolled_back
+from api.message_store import compact_match, page
+from api.models import Match, Message, MessageChunk
+
+
+def table_bytes(model):
+    """On-disk size of a table with its indexes, None if the database cannot tell"""
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SELECT pg_total_relation_size(%s::regclass)', [table])
+        elif connection.vendor == 'sqlite':
+            cursor.execute(
+                "SELECT SUM(pgsize) FROM dbstat WHERE name = %s "
+                "OR name IN (SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = %s)",
+                [table, table],
+            )
+        else:
+            return None
+        return cursor.fetchone()[0] or 0
+
+
+class Command(BaseCommand):
+    help = 'Compare message table size and list_messages latency before and after cold-storage compaction'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--matches', type=int, default=50)
+        parser.add_argument('--messages', type=int, default=2000, help='Messages per match')
+        parser.add_argument('--hot-fraction', type=float, default=0.1, help='Share of each thread that stays recent')
+        parser.add_argument('--page-size', type=int, default=50)
+        parser.add_argument('--chunk-size', type=int, default=500)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        old = timezone.now() - timedelta(days=365)
+        cutoff = timezone.now() - timedelta(days=30)
+
+        with rolled_back():
+            owners = create_users(options['matches'] * 2)
+            pets = create_pets(owners, options['matches'] * 2, rng)
+            Match.objects.bulk_create(Match(pet1=pets[i], pet2=pets[i + 1]) for i in range(0, len(pets), 2))
+            matches = list(Match.objects.filter(pet1__in=pets).select_related('pet1', 'pet2').order_by('id'))
+
+            old_count = int(options['messages'] * (1 - options['hot_fraction']))
+            for match in matches:
+                Message.objects.bulk_create(
+                    (
+                        Message(
+                            match=match,
+                            sender_pet=match.pet1 if i % 2 else match.pet2,
+                            content=random_bio(rng, rng.randint(1, 15)),
+                        )
+                        for i in range(options['messages'])
+                    ),
+                    batch_size=1000,
+                )
+                ids = list(match.messages.order_by('id').values_list('id', flat=True))
+                # auto_now_add ignores the value given to bulk_create
+                Message.objects.filter(match=match, id__lte=ids[old_count - 1]).update(created_at=old)
+                newest = ids[-1]
+                Match.objects.filter(id=match.id).update(pet1_last_read_id=newest, pet2_last_read_id=newest)
+                match.pet1_last_read_id = match.pet2_last_read_id = newest
+
+            probe = matches[len(matches) // 2]
+            deep_before = probe.messages.order_by('id').values_list('id', flat=True)[old_count // 2]
+
+            def run(label):
+                size = table_bytes(Message)
+                chunk_size = table_bytes(MessageChunk)
+                self.stdout.write(
+                    f"{label}: {Message.objects.count()} hot rows, messages table {size / 1024:.0f} KiB, "
+                    f"chunks table {chunk_size / 1024:.0f} KiB" if size is not None else f'{label}: size unknown'
+                )
+                latest = measure(lambda: page(probe, limit=options['page_size']), options['repeat'])
+                deep = measure(lambda: page(probe, before=deep_before, limit=options['page_size']), options['repeat'])
+                full = measure(lambda: page(probe), max(options['repeat'] // 4, 1))
+                self.stdout.write(f'  latest page   {format_stats(latest)}')
+                self.stdout.write(f'  deep page     {format_stats(deep)}')
+                self.stdout.write(f'  full history  {format_stats(full)}')
+
+            run('before')
+            before_page = [message.id for message in page(probe, before=deep_before, limit=options['page_size'])]
+
+            for match in matches:
+                compact_match(match, cutoff, options['chunk_size'])
+
+            run('after')
+            after_page = [message.id for message in page(probe, before=deep_before, limit=options['page_size'])]
+            if before_page != after_page:
+                self.stderr.write('Pages differ before and after compaction')
+
+            newest = MessageChunk.objects.aggregate(Max('last_message_id'))['last_message_id__max']
+            self.stdout.write(self.style.SUCCESS(
+                f'{MessageChunk.objects.count()} chunks, newest archived message id {newest}'
+            ))
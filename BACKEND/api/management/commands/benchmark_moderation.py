@@ -0,0 +1,97 @@
+import random
+import re
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from api.benchmarks import BENCH_WORDS, create_pets, create_users, random_bio, rolled_back
+from api.models import BlockedTerm, Match, Message
+from api.moderation import Automaton, blocklist, check
+from api.search import normalize
+from api.views import create_message
+
+
+def micro_stats(samples):
+    samples = sorted(samples)
+    mean = sum(samples) / len(samples)
+    return (
+        f'mean={mean:.1f} us  p50={samples[len(samples) // 2]:.1f} us  '
+        f'p95={samples[min(len(samples) - 1, int(len(samples) * 0.95))]:.1f} us'
+    )
+
+
+def timed(func, inputs):
+    samples = []
+    for value in inputs:
+        start = time.perf_counter()
+        func(value)
+        samples.append((time.perf_counter() - start) * 1e6)
+    return samples
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure what blocklist moderation adds to create_message: the automaton scan against one '
+        'regex per term, moderation.check with the blocklist in the database, and the whole view '
+        'with moderation on and off'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--terms', type=int, nargs='+', default=[100, 1000, 10000])
+        parser.add_argument('--messages', type=int, default=2000, help='Messages scanned per measurement')
+        parser.add_argument('--words', type=int, default=30, help='Words per message')
+        parser.add_argument('--requests', type=int, default=200, help='create_message calls per mode')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        messages = [random_bio(rng, options['words']) for _ in range(options['messages'])]
+
+        self.stdout.write(f"{options['words']}-word messages\n{'terms':>7} {'states':>8}  scan")
+        for count in options['terms']:
+            # Made-up words, so every message is scanned to the end without a match
+            terms = {f'{rng.choice(BENCH_WORDS)}x{i}': BlockedTerm.ACTION_FLAG for i in range(count)}
+            started = time.perf_counter()
+            automaton = Automaton(terms)
+            build_ms = (time.perf_counter() - started) * 1000
+
+            samples = timed(lambda text: automaton.scan(normalize(text).split()), messages)
+            self.stdout.write(f'{count:>7} {len(automaton):>8}  automaton {micro_stats(samples)}  (built in {build_ms:.0f} ms)')
+
+            # The naive alternative: one word-boundary regex per term
+            patterns = [re.compile(rf'\b{re.escape(term)}\b', re.IGNORECASE) for term in terms]
+            naive = messages[:max(1, len(messages) * 100 // count)]
+            samples = timed(lambda text: [pattern.search(text) for pattern in patterns], naive)
+            self.stdout.write(f"{'':>17}  per-term regex {micro_stats(samples)}")
+
+        self.stdout.write('\ncreate_message with the largest blocklist')
+        factory = APIRequestFactory()
+        with rolled_back():
+            owners = create_users(2)
+            pet1, pet2 = create_pets(owners, 2, rng)
+            match = Match.objects.create(pet1=pet1, pet2=pet2)
+            BlockedTerm.objects.bulk_create(BlockedTerm(term=term, action=action) for term, action in terms.items())
+            blocklist.invalidate()
+
+            def send(text):
+                request = factory.post(
+                    f'/api/matches/{match.id}/messages/create/',
+                    {'sender_pet': pet1.id, 'content': text}, format='json',
+                )
+                force_authenticate(request, pet1.owner)
+                response = create_message(request, match_id=match.id)
+                assert response.status_code == 201, response.data
+
+            check(messages[0])
+            self.stdout.write(f"{'moderation.check':>17}  {micro_stats(timed(check, messages))}")
+
+            inputs = messages[:options['requests']]
+            for label, enabled in (('moderation off', False), ('moderation on', True)):
+                with override_settings(MODERATION_ENABLED=enabled, RATELIMIT_ENABLE=False):
+                    send(inputs[0])  # Compile outside the measurement
+                    samples = timed(send, inputs)
+                self.stdout.write(f'{label:>17}  {micro_stats(samples)}')
+            Message.objects.filter(match=match).delete()
+        blocklist.invalidate()
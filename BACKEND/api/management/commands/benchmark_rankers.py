@@ -0,0 +1,57 @@
+import random
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.benchmarks import create_pets, create_users, format_stats, measure, rolled_back
+from api.discover import discover
+from api.models import Like
+from api.ranking import get_ranker
+
+
+class Command(BaseCommand):
+    help = 'Compare discover rankers on synthetic data (latency and instant-match yield)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pets', type=int, default=2000)
+        parser.add_argument('--viewers', type=int, default=10)
+        parser.add_argument(
+            '--admirer-rate', type=float, default=0.05,
+            help='Probability that a candidate already liked a given viewer',
+        )
+        parser.add_argument('--repeat', type=int, default=10)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+
+        with rolled_back():
+            owners = create_users(max(options['pets'] // 2, 1))
+            pets = create_pets(owners, options['pets'], rng)
+            viewers = pets[:options['viewers']]
+
+            likes = [
+                Like(from_pet=candidate, to_pet=viewer)
+                for viewer in viewers
+                for candidate in pets[options['viewers']:]
+                if rng.random() < options['admirer_rate'] and candidate.owner_id != viewer.owner_id
+            ]
+            Like.objects.bulk_create(likes, batch_size=500, ignore_conflicts=True)
+            admirers = {(like.to_pet_id, like.from_pet_id) for like in likes}
+
+            self.stdout.write(
+                f"{options['pets']} pets, {len(viewers)} viewers, {len(likes)} pending admirer likes\n"
+            )
+
+            for name in settings.DISCOVER_RANKERS:
+                ranker = get_ranker(name)
+                shown = matches = 0
+                for viewer in viewers:
+                    results = discover(viewer, viewer.owner, ranker=ranker)
+                    shown += len(results)
+                    matches += sum((viewer.id, pet.id) in admirers for pet in results)
+
+                viewer = viewers[0]
+                stats = measure(lambda: discover(viewer, viewer.owner, ranker=ranker), options['repeat'])
+                match_rate = matches / shown if shown else 0
+                self.stdout.write(f'{name:>10}: {format_stats(stats)}  instant-match rate={match_rate:.1%}')
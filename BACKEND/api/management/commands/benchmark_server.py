@@ -0,0 +1,178 @@
+import asyncio
+import time
+from urllib.parse import urlsplit
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api.models import Match, Pet
+
+User = get_user_model()
+
+ENDPOINTS = ['messages', 'matches', 'pets', 'discover', 'me']
+
+
+class Command(BaseCommand):
+    help = (
+        'Load test running servers with many open keep-alive connections, e.g. '
+        '"gunicorn tinderpet_backend.wsgi -b :8000" against '
+        '"uvicorn tinderpet_backend.asgi:application --port 8001". '
+        'Start them with RATELIMIT_ENABLE=False so throttling does not skew the numbers. '
+        'Every connection sends the same request as the same user, so comparing servers started with '
+        'COALESCE_REQUESTS=True and False shows what request coalescing saves under bursts.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--target', action='append', metavar='NAME=URL',
+            help='Server to test (repeatable). Default: wsgi=http://127.0.0.1:8000 asgi=http://127.0.0.1:8001',
+        )
+        parser.add_argument('--endpoint', choices=ENDPOINTS, default='messages')
+        parser.add_argument('--email', help='User to authenticate as (default: owner of the newest match)')
+        parser.add_argument('--concurrency', type=int, nargs='+', default=[10, 50, 200, 500])
+        parser.add_argument('--duration', type=float, default=10, help='Seconds per concurrency level')
+        parser.add_argument('--timeout', type=float, default=10)
+        parser.add_argument('--slo-ms', type=float, default=500, help='p95 latency a level must stay under to count as served')
+
+    def handle(self, *args, **options):
+        targets = dict(t.split('=', 1) for t in options['target'] or [
+            'wsgi=http://127.0.0.1:8000', 'asgi=http://127.0.0.1:8001',
+        ])
+        path = self.endpoint_path(options['endpoint'], options['email'])
+        token = str(AccessToken.for_user(self.user))
+
+        self.stdout.write(f'GET {path} as {self.user.email}, {options["duration"]:.0f}s per level')
+        self.stdout.write(
+            f"{'target':>8} {'conns':>6} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7} {'shared':>7}"
+        )
+
+        for name, url in targets.items():
+            capacity = 0
+            for concurrency in options['concurrency']:
+                result = asyncio.run(load_test(url, path, token, concurrency, options['duration'], options['timeout']))
+                self.stdout.write(
+                    f"{name:>8} {concurrency:>6} {result['rps']:>9.1f} {result['p50']:>8.1f} "
+                    f"{result['p95']:>8.1f} {result['p99']:>8.1f} {result['errors']:>7} {result['shared']:>6.0%}"
+                )
+                error_rate = result['errors'] / max(result['requests'] + result['errors'], 1)
+                if result['requests'] and result['p95'] <= options['slo_ms'] and error_rate < 0.01:
+                    capacity = concurrency
+            self.stdout.write(self.style.SUCCESS(
+                f'{name}: {capacity} concurrent connections served within p95 <= {options["slo_ms"]:.0f} ms'
+            ))
+
+    def endpoint_path(self, endpoint, email):
+        if email:
+            self.user = User.objects.filter(email=email).first()
+            if self.user is None:
+                raise CommandError(f'No user with email {email}')
+            match = Match.objects.for_owner(self.user).order_by('-created_at').first()
+        else:
+            match = Match.objects.select_related('pet1__owner').order_by('-created_at').first()
+            if match is None:
+                raise CommandError('No matches in the database, pass --email')
+            self.user = match.pet1.owner
+
+        if endpoint == 'me':
+            return '/api/auth/me/'
+        if endpoint == 'matches':
+            return '/api/matches/'
+        if endpoint == 'pets':
+            return '/api/pets/'
+        if endpoint == 'discover':
+            pet = Pet.objects.filter(owner=self.user, is_active=True).first() or Pet.objects.filter(owner=self.user).first()
+            if pet is None:
+                raise CommandError(f'{self.user.email} has no pets')
+            return f'/api/discover/?pet_id={pet.id}'
+        if match is None:
+            raise CommandError(f'{self.user.email} has no matches')
+        return f'/api/matches/{match.id}/messages/'
+
+
+async def load_test(url, path, token, concurrency, duration, timeout):
+    parts = urlsplit(url)
+    host, port = parts.hostname, parts.port or 80
+    request = (
+        f'GET {path} HTTP/1.1\r\n'
+        f'Host: {parts.netloc}\r\n'
+        f'Authorization: Bearer {token}\r\n'
+        f'Accept: application/json\r\n'
+        f'Connection: keep-alive\r\n\r\n'
+    ).encode()
+
+    latencies = []
+    errors = coalesced = 0
+    deadline = time.perf_counter() + duration
+
+    async def client():
+        nonlocal errors, coalesced
+        reader = writer = None
+        while time.perf_counter() < deadline:
+            try:
+                if writer is None:
+                    reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+                start = time.perf_counter()
+                writer.write(request)
+                status, keep_alive, shared = await asyncio.wait_for(read_response(reader), timeout)
+                if status == 200:
+                    latencies.append((time.perf_counter() - start) * 1000)
+                    coalesced += shared
+                else:
+                    errors += 1
+                if not keep_alive:
+                    writer.close()
+                    writer = None
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError):
+                errors += 1
+                if writer is not None:
+                    writer.close()
+                writer = None
+                await asyncio.sleep(0.05)
+        if writer is not None:
+            writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] if latencies else 0.0
+
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'rps': len(latencies) / elapsed,
+        'p50': percentile(0.50),
+        'p95': percentile(0.95),
+        'p99': percentile(0.99),
+        # Responses served from another request's in-flight computation
+        'shared': coalesced / len(latencies) if latencies else 0.0,
+    }
+
+
+async def read_response(reader):
+    """Read one HTTP/1.1 response, returning (status, keep_alive, coalesced)"""
+    status_line = await reader.readuntil(b'\r\n')
+    status = int(status_line.split()[1])
+
+    headers = {}
+    while True:
+        line = await reader.readuntil(b'\r\n')
+        if line == b'\r\n':
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip().lower()
+
+    if headers.get('transfer-encoding') == 'chunked':
+        while True:
+            size = int((await reader.readuntil(b'\r\n')).split(b';')[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    else:
+        await reader.readexactly(int(headers.get('content-length', 0)))
+
+    return status, headers.get('connection') != 'close', headers.get('x-coalesced') == 'hit'
@@ -0,0 +1,52 @@
+import os
+import random
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.benchmarks import BENCH_BREEDS, create_pets, create_users, format_stats, measure, rolled_back
+from api.models import Pet
+from api.similarity import VECTORS, SimilarityIndex
+
+
+class Command(BaseCommand):
+    help = 'Measure build time, size, top-k query and single-pet update latency of the similar-pets index'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 50000])
+        parser.add_argument('--top', type=int, default=100, help='Nearest ids read per query')
+        parser.add_argument('--repeat', type=int, default=50)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{'pets':>8} {'build':>8} {'size':>9}  query / update latency")
+        for size in options['sizes']:
+            rng = random.Random(options['seed'])
+            with rolled_back(), tempfile.TemporaryDirectory() as path:
+                owners = create_users(max(size // 10, 1))
+                pets = create_pets(owners, size, rng, breeds=BENCH_BREEDS)
+
+                index = SimilarityIndex(path)
+                started = time.perf_counter()
+                index.rebuild(Pet.objects.values_list('id', 'bio', 'breed', 'pet_type').iterator(chunk_size=2000))
+                build = time.perf_counter() - started
+                megabytes = os.path.getsize(os.path.join(path, VECTORS)) / 1e6
+
+                probes = rng.sample(pets, min(len(pets), 20))
+                queries = iter(probes * options['repeat'])
+
+                def query():
+                    pet = next(queries)
+                    index.nearest(pet.bio, pet.breed, pet.pet_type, options['top'], exclude_id=pet.id)
+
+                updates = iter(probes * options['repeat'])
+
+                def update():
+                    index.update([next(updates)])
+
+                self.stdout.write(
+                    f'{size:>8} {build:>7.2f}s {megabytes:>7.1f}MB  '
+                    f"query {format_stats(measure(query, options['repeat']))}"
+                )
+                self.stdout.write(f"{'':>28}  update {format_stats(measure(update, options['repeat']))}")
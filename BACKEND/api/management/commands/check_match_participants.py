@@ -0,0 +1,70 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from api.models import Match, MatchParticipant
+
+
+def expected_rows(matches):
+    """(match, pet, other pet, owner) tuples the participant table should hold"""
+    rows = set()
+    for match_id, pet1_id, owner1_id, pet2_id, owner2_id in matches:
+        rows.add((match_id, pet1_id, pet2_id, owner1_id))
+        rows.add((match_id, pet2_id, pet1_id, owner2_id))
+    return rows
+
+
+class Command(BaseCommand):
+    help = 'Compare MatchParticipant with Match and report (or --fix) missing and stale rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true', help='Insert missing rows and delete stale ones')
+        parser.add_argument('--batch-size', type=int, default=2000, help='Matches compared per query')
+
+    def handle(self, *args, **options):
+        matches = Match.objects.order_by('id').values_list(
+            'id', 'pet1_id', 'pet1__owner_id', 'pet2_id', 'pet2__owner_id'
+        )
+        missing_total = stale_total = checked = 0
+        last_id = 0
+
+        while True:
+            batch = list(matches.filter(id__gt=last_id)[:options['batch_size']])
+            if not batch:
+                break
+            first_id, last_id = batch[0][0], batch[-1][0]
+
+            expected = expected_rows(batch)
+            actual = {
+                (row[1], row[2], row[3], row[4]): row[0]
+                for row in MatchParticipant.objects.filter(match_id__gte=first_id, match_id__lte=last_id)
+                .values_list('id', 'match_id', 'pet_id', 'other_pet_id', 'owner_id')
+            }
+            missing = expected - actual.keys()
+            stale = [participant_id for row, participant_id in actual.items() if row not in expected]
+            missing_total += len(missing)
+            stale_total += len(stale)
+            checked += len(batch)
+
+            for match_id, pet_id, other_pet_id, owner_id in sorted(missing)[:20]:
+                self.stdout.write(f'missing: match {match_id} pet {pet_id} (owner {owner_id})')
+            if stale:
+                self.stdout.write(f'stale: participant ids {stale[:20]}')
+
+            if options['fix'] and (missing or stale):
+                with transaction.atomic():
+                    MatchParticipant.objects.filter(id__in=stale).delete()
+                    MatchParticipant.objects.bulk_create(
+                        [
+                            MatchParticipant(match_id=match_id, pet_id=pet_id, other_pet_id=other_pet_id, owner_id=owner_id)
+                            for match_id, pet_id, other_pet_id, owner_id in missing
+                        ],
+                        ignore_conflicts=True,
+                    )
+
+        summary = f'{checked} matches checked: {missing_total} missing and {stale_total} stale participant rows'
+        if options['fix']:
+            self.stdout.write(self.style.SUCCESS(f'{summary}, fixed'))
+        elif missing_total or stale_total:
+            raise CommandError(summary)
+        else:
+            self.stdout.write(self.style.SUCCESS(summary))
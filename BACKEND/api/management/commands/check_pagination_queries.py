@@ -0,0 +1,93 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from api.benchmarks import create_pets, create_users, random_bio, rolled_back
+from api.models import Match, MatchParticipant, Message, Pet
+from api.views import PetViewSet, list_matches
+
+pet_list = PetViewSet.as_view({'get': 'list'})
+
+
+class Command(BaseCommand):
+    help = (
+        'Walk every cursor page of /api/pets/ and /api/matches/ on seeded data and fail unless each '
+        'full page runs the same number of queries as page 1 and the pages add up to the full list'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pets', type=int, default=120, help='Pets owned by the probe user')
+        parser.add_argument('--matches', type=int, default=300, help='Matches of the probe user')
+        parser.add_argument('--page-size', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        factory = APIRequestFactory()
+
+        with rolled_back():
+            owners = create_users(options['matches'] + 1)
+            user = owners[0]
+            pets = create_pets(owners[:1], options['pets'], rng)
+            others = create_pets(owners[1:], options['matches'], rng)
+            others = [pet for pet in others if pet.owner_id != user.id]
+
+            Match.objects.bulk_create(
+                Match(pet1=pets[i % len(pets)], pet2=other) if i % 2 else Match(pet1=other, pet2=pets[i % len(pets)])
+                for i, other in enumerate(others)
+            )
+            # bulk_create skips the post_save signal that adds participants
+            MatchParticipant.objects.add_for(Match.objects.filter(pet1__name__startswith='Bench '))
+            matches = list(Match.objects.for_owner(user))
+            Message.objects.bulk_create(
+                Message(match=match, sender_pet_id=match.pet1_id, content=random_bio(rng, 5))
+                for match in matches if rng.random() < 0.7
+            )
+
+            def fetch(view, path, **params):
+                request = factory.get(path, params)
+                force_authenticate(request, user)
+                with CaptureQueriesContext(connection) as queries:
+                    started = time.perf_counter()
+                    response = view(request)
+                    response.render()
+                    elapsed = (time.perf_counter() - started) * 1000
+                if response.status_code != 200:
+                    raise CommandError(f'{path} {params}: HTTP {response.status_code} {response.data}')
+                return response.data, len(queries), elapsed
+
+            lists = (
+                ('pets', pet_list, '/api/pets/', Pet.objects.alive().filter(owner=user)),
+                ('matches', list_matches, '/api/matches/', Match.objects.alive().for_owner(user)),
+            )
+            for label, view, path, expected in lists:
+                expected = set(expected.values_list('id', flat=True))
+                self.stdout.write(f'{label}: {len(expected)} rows')
+
+                ids, counts = [], []
+                params = {'page_size': options['page_size']}
+                while True:
+                    data, queries, elapsed = fetch(view, path, **params)
+                    ids += [row['id'] for row in data['results']]
+                    counts.append((len(data['results']), queries))
+                    self.stdout.write(f"  page {len(counts):>3}: {len(data['results']):>3} rows, {queries} queries, {elapsed:.1f} ms")
+                    if not data['has_next']:
+                        break
+                    params['cursor'] = data['next_cursor']
+
+                if len(ids) != len(set(ids)) or set(ids) != expected:
+                    raise CommandError(f'{label}: pages do not add up to the full list')
+                first_rows, first_queries = counts[0]
+                uneven = [
+                    number for number, (rows, queries) in enumerate(counts, 1)
+                    if queries > first_queries or (rows == first_rows and queries != first_queries)
+                ]
+                if uneven:
+                    raise CommandError(f'{label}: pages {uneven} run more queries than page 1 ({first_queries})')
+                self.stdout.write(self.style.SUCCESS(
+                    f'{label}: {len(counts)} pages, every full page runs {first_queries} queries'
+                ))
@@ -0,0 +1,39 @@
+import sys
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from api.export import batched, gzipped, ndjson_lines
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Write everything stored about a user as NDJSON (the same data as GET /api/export/)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('email')
+        parser.add_argument('--output', '-o', help='File to write (default: stdout)')
+        parser.add_argument('--gzip', action='store_true')
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(email=options['email']).first()
+        if user is None:
+            raise CommandError(f"No user with email {options['email']}")
+
+        parts = batched(ndjson_lines(user))
+        if options['gzip']:
+            parts = gzipped(parts)
+
+        output = open(options['output'], 'wb') if options['output'] else sys.stdout.buffer
+        written = 0
+        try:
+            for part in parts:
+                output.write(part)
+                written += len(part)
+        finally:
+            if options['output']:
+                output.close()
+
+        if options['output']:
+            self.stderr.write(f"Wrote {written} bytes to {options['output']}")
@@ -0,0 +1,15 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.pass_buffer import recover_spools
+
+
+class Command(BaseCommand):
+    help = 'Write the passes left in spool files by processes that stopped before flushing them'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--spool-dir', default=settings.PASS_SPOOL_DIR)
+
+    def handle(self, *args, **options):
+        files, passes = recover_spools(options['spool_dir'])
+        self.stdout.write(self.style.SUCCESS(f'Replayed {files} spool files, {passes} passes written'))
@@ -0,0 +1,94 @@
+import re
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# What a fresh worker does before it can answer its first request
+TARGETS = {
+    'wsgi': (
+        'from tinderpet_backend.wsgi import application\n'
+        'from django.conf import settings\n'
+        'from django.urls import get_resolver\n'
+        'get_resolver().url_patterns\n'
+    ),
+    'setup': 'import django\ndjango.setup()\n',
+}
+
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+
+def run_target(target, importtime=False):
+    """Run a target in a fresh interpreter; returns (wall seconds, stderr)"""
+    command = [sys.executable]
+    if importtime:
+        command += ['-X', 'importtime']
+    command += ['-c', TARGETS[target]]
+
+    started = time.perf_counter()
+    result = subprocess.run(command, cwd=settings.BASE_DIR, capture_output=True, text=True)
+    elapsed = time.perf_counter() - started
+    if result.returncode:
+        raise CommandError(f'{target} startup failed:\n{result.stderr[-2000:]}')
+    return elapsed, result.stderr
+
+
+def parse_importtime(output):
+    """(module, self us, cumulative us, depth) for every -X importtime line"""
+    rows = []
+    for line in output.splitlines():
+        found = IMPORTTIME_LINE.match(line)
+        if found:
+            self_us, cumulative_us, indent, module = found.groups()
+            rows.append((module, int(self_us), int(cumulative_us), len(indent) // 2))
+    return rows
+
+
+class Command(BaseCommand):
+    help = 'Report which modules make process startup slow, and optionally fail when cold start exceeds a budget'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target', choices=sorted(TARGETS), default='wsgi')
+        parser.add_argument('--top', type=int, default=25, help='Modules to list by cumulative import time')
+        parser.add_argument('--repeat', type=int, default=5, help='Cold starts timed for --budget-ms')
+        parser.add_argument(
+            '--budget-ms', type=float, nargs='?', const=settings.STARTUP_BUDGET_MS, default=None,
+            help=f'Exit with an error when the median cold start is slower (default {settings.STARTUP_BUDGET_MS} ms)',
+        )
+
+    def handle(self, *args, **options):
+        target = options['target']
+        _, output = run_target(target, importtime=True)
+        rows = parse_importtime(output)
+        if not rows:
+            raise CommandError('No -X importtime output')
+
+        total_us = sum(self_us for _, self_us, _, _ in rows)
+        self.stdout.write(f'{len(rows)} modules imported by {target}, {total_us / 1000:.1f} ms in total')
+
+        self.stdout.write('\nSlowest by cumulative time (includes what they import):')
+        for module, self_us, cumulative_us, depth in sorted(rows, key=lambda row: -row[2])[:options['top']]:
+            self.stdout.write(f'  {cumulative_us / 1000:8.1f} ms  {self_us / 1000:7.1f} ms self  {module}')
+
+        packages = defaultdict(int)
+        for module, self_us, _, _ in rows:
+            packages[module.split('.')[0]] += self_us
+        self.stdout.write('\nBy top-level package (self time):')
+        for package, self_us in sorted(packages.items(), key=lambda item: -item[1])[:options['top']]:
+            self.stdout.write(f'  {self_us / 1000:8.1f} ms  {package}')
+
+        budget_ms = options['budget_ms']
+        if budget_ms is None:
+            return
+
+        # -X importtime adds its own overhead, so the budget is checked on plain runs
+        timings = [run_target(target)[0] * 1000 for _ in range(options['repeat'])]
+        median_ms = statistics.median(timings)
+        summary = f'cold start median {median_ms:.0f} ms over {len(timings)} runs (min {min(timings):.0f} ms), budget {budget_ms:.0f} ms'
+        if median_ms > budget_ms:
+            raise CommandError(summary)
+        self.stdout.write(self.style.SUCCESS(summary))
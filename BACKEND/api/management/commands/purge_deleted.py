@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from api.deletion import run_job
+from api.models import DeletionJob
+
+
+class Command(BaseCommand):
+    help = 'Show progress of pet/account deletion jobs, or run the pending ones here instead of in run_tasks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--run', action='store_true', help='Process unfinished jobs until they are done')
+        parser.add_argument('--batch-size', type=int)
+        parser.add_argument('--all', action='store_true', help='Also list finished jobs')
+
+    def handle(self, *args, **options):
+        jobs = DeletionJob.objects.order_by('created_at')
+        if not options['all']:
+            jobs = jobs.exclude(status=DeletionJob.STATUS_DONE)
+
+        for job in jobs:
+            if options['run'] and job.status != DeletionJob.STATUS_DONE:
+                # Same batches as the background task, just without re-queuing
+                while not run_job(job.id, batch_size=options['batch_size']):
+                    pass
+                job.refresh_from_db()
+            self.stdout.write(
+                f'#{job.id} {job.kind} {job.target_id}: {job.status}, step {job.step or "-"}, '
+                f'{job.rows_deleted} rows in {job.batches} batches'
+            )
@@ -0,0 +1,63 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from api.models import Pass
+from api.pass_archive import write_archive
+
+
+class Command(BaseCommand):
+    help = 'Archive and delete expired passes in small batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--sleep', type=float, default=0.05,
+            help='Seconds to pause between batches so writers can take the lock',
+        )
+        parser.add_argument('--max-batches', type=int, help='Stop after this many batches')
+        parser.add_argument('--archive-dir', default=settings.PASS_ARCHIVE_DIR)
+        parser.add_argument('--no-archive', action='store_true', help='Delete without archiving')
+
+    def handle(self, *args, **options):
+        if not settings.PASS_EXPIRY_DAYS:
+            raise CommandError('PASS_EXPIRY_DAYS is 0, passes never expire')
+
+        batch_size = options['batch_size']
+        batches = deleted = 0
+
+        # Every batch is independent: interrupting the command and running it
+        # again simply continues with the oldest expired rows that are left.
+        while options['max_batches'] is None or batches < options['max_batches']:
+            with transaction.atomic():
+                rows = list(
+                    Pass.objects.expired()
+                    .select_for_update()
+                    .order_by('id')
+                    .values_list('id', 'from_pet_id', 'to_pet_id', 'created_at')[:batch_size]
+                )
+                if not rows:
+                    break
+
+                # Re-check expiry: a pass re-stamped since the read (create_pass,
+                # pass_buffer) is fresh again and must survive
+                ids = [row[0] for row in rows]
+                count, _ = Pass.objects.expired().filter(id__in=ids).delete()
+                kept = set(Pass.objects.filter(id__in=ids).values_list('id', flat=True))
+                removed = [row for row in rows if row[0] not in kept]
+
+                # Inside the transaction: if the archive cannot be written nothing is deleted
+                if removed and not options['no_archive']:
+                    write_archive(options['archive_dir'], removed)
+
+            batches += 1
+            deleted += count
+            self.stdout.write(f'Batch {batches}: deleted {count} passes (up to id {rows[-1][0]})')
+
+            if len(rows) < batch_size:
+                break
+            time.sleep(options['sleep'])
+
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} expired passes in {batches} batches'))
@@ -0,0 +1,91 @@
+import io
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from api import image_dedup
+from api.models import ImageFingerprint, Pet, PetImage
+from api.tasks import cloudinary_public_id
+
+FIELDS = ['public_id', 'dhash', 'band0', 'band1', 'band2', 'band3']
+
+
+def download(url, timeout):
+    with urllib.request.urlopen(url, timeout=timeout) as response:
+        return io.BytesIO(response.read())
+
+
+class Command(BaseCommand):
+    help = (
+        'Download the stored pet photos, recompute their perceptual hashes and replace the '
+        'ImageFingerprint rows, e.g. for images uploaded before deduplication existed'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--owner', type=int, help='Only the images of this user id')
+        parser.add_argument('--workers', type=int, default=8, help='Parallel downloads')
+        parser.add_argument('--batch-size', type=int, default=500, help='Images hashed per write')
+        parser.add_argument('--timeout', type=float, default=20)
+        parser.add_argument(
+            '--count-duplicates', action='store_true',
+            help='Also count stored images that are near-duplicates of an earlier one (one query per image)',
+        )
+
+    def stored_images(self, owner_id):
+        """{(owner id, url)} of every image of a pet that is not deleted"""
+        pets = Pet.objects.alive()
+        images = PetImage.objects.filter(pet__deleted_at__isnull=True)
+        if owner_id:
+            pets, images = pets.filter(owner_id=owner_id), images.filter(pet__owner_id=owner_id)
+        stored = set(images.values_list('pet__owner_id', 'image'))
+        stored |= set(pets.exclude(main_image__isnull=True).exclude(main_image='').values_list('owner_id', 'main_image'))
+        return sorted(stored)
+
+    def fingerprint(self, item, timeout):
+        owner_id, url = item
+        try:
+            value = image_dedup.dhash(download(url, timeout))
+        except (OSError, ValueError) as error:
+            self.stderr.write(f'{url}: {error}')
+            return None
+        if value is None:
+            self.stderr.write(f'{url}: not an image')
+            return None
+        return image_dedup.fingerprint(owner_id, value, url, cloudinary_public_id(url))
+
+    def handle(self, *args, **options):
+        stored = self.stored_images(options['owner'])
+        self.stdout.write(f'{len(stored)} stored images')
+
+        hashed = failed = 0
+        with ThreadPoolExecutor(options['workers']) as pool:
+            for start in range(0, len(stored), options['batch_size']):
+                batch = stored[start:start + options['batch_size']]
+                rows = [row for row in pool.map(lambda item: self.fingerprint(item, options['timeout']), batch) if row]
+                ImageFingerprint.objects.bulk_create(
+                    rows, update_conflicts=True, unique_fields=['owner', 'url'], update_fields=FIELDS,
+                )
+                hashed += len(rows)
+                failed += len(batch) - len(rows)
+                self.stdout.write(f'  {start + len(batch)}/{len(stored)}')
+
+        # Fingerprints of images no pet uses any more
+        existing = ImageFingerprint.objects.all()
+        if options['owner']:
+            existing = existing.filter(owner_id=options['owner'])
+        keep = set(stored)
+        stale = [row_id for row_id, owner_id, url in existing.values_list('id', 'owner_id', 'url') if (owner_id, url) not in keep]
+        for start in range(0, len(stale), options['batch_size']):
+            ImageFingerprint.objects.filter(id__in=stale[start:start + options['batch_size']]).delete()
+        self.stdout.write(self.style.SUCCESS(
+            f'{hashed} images hashed, {failed} unreadable, {len(stale)} stale fingerprints removed'
+        ))
+
+        if options['count_duplicates']:
+            # Stored before deduplication existed: what re-uploads have cost so far
+            duplicates = sum(
+                any(match.id < row.id for match in image_dedup.near(row.owner_id, row.dhash & image_dedup.MASK))
+                for row in existing.iterator(chunk_size=2000)
+            )
+            self.stdout.write(f'{duplicates} stored images are near-duplicates of an earlier one')
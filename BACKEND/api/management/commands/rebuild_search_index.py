@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from api import search
+from api.models import Pet
+
+
+class Command(BaseCommand):
+    help = 'Recreate the full-text pet search index from the Pet table'
+
+    def handle(self, *args, **options):
+        backend = search.get_backend()
+        if backend is None:
+            raise CommandError(f'Full-text search is not supported on {connection.vendor}')
+
+        count = 0
+        with transaction.atomic(), connection.cursor() as cursor:
+            backend.uninstall(cursor)
+            backend.install(cursor)
+            for pet_id, name, breed, bio in Pet.objects.values_list('id', 'name', 'breed', 'bio').iterator(chunk_size=1000):
+                backend.index(cursor, pet_id, name, breed, bio)
+                count += 1
+
+        self.stdout.write(self.style.SUCCESS(f'Indexed {count} pets'))
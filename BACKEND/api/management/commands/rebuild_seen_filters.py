@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from api import seen_filter
+from api.models import Pet
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the per-pet seen Bloom filters from likes, passes and matches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('pet_ids', nargs='*', type=int, help='Only rebuild these pets')
+
+    def handle(self, *args, **options):
+        pets = Pet.objects.order_by('id')
+        if options['pet_ids']:
+            pets = pets.filter(id__in=options['pet_ids'])
+
+        count = 0
+        for pet_id in pets.values_list('id', flat=True).iterator(chunk_size=500):
+            seen_filter.rebuild(pet_id)
+            count += 1
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {count} seen filters'))
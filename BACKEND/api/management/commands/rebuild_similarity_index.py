@@ -0,0 +1,17 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api import similarity
+
+
+class Command(BaseCommand):
+    help = 'Recreate the similar-pets TF-IDF index from the Pet table (needed after changing SIMILARITY_DIMENSIONS)'
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        count = similarity.rebuild_index()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Indexed {count} pets in {elapsed:.1f} s ({similarity.index.path})'
+        ))
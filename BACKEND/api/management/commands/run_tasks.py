@@ -0,0 +1,70 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from api import taskqueue
+
+
+class Command(BaseCommand):
+    help = 'Run the background task worker'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency', type=int, default=settings.TASK_WORKER_CONCURRENCY,
+            help='Number of batches executed in parallel',
+        )
+        parser.add_argument(
+            '--pool', choices=['thread', 'process'], default='thread',
+            help='Execute batches in a thread pool or a process pool',
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=settings.TASK_POLL_INTERVAL_SECONDS,
+            help='Seconds to sleep when the queue is empty',
+        )
+        parser.add_argument('--name', action='append', dest='names', help='Only run tasks with this name')
+        parser.add_argument('--once', action='store_true', help='Exit as soon as the queue is drained')
+
+    def handle(self, *args, **options):
+        taskqueue.autodiscover()
+        worker_id = taskqueue.new_worker_id()
+        concurrency = max(options['concurrency'], 1)
+
+        if options['pool'] == 'process':
+            # Children must not inherit open database connections
+            connections.close_all()
+            executor = ProcessPoolExecutor(concurrency, initializer=taskqueue.init_worker_process)
+        else:
+            executor = ThreadPoolExecutor(concurrency, thread_name_prefix='task-worker')
+
+        self.stdout.write(f'Worker {worker_id} started ({options["pool"]} pool, concurrency={concurrency})')
+        processed = 0
+        in_flight = set()
+
+        try:
+            with executor:
+                while True:
+                    released = taskqueue.release_stale_locks()
+                    if released:
+                        self.stdout.write(f'Released {released} stale task(s)')
+
+                    while len(in_flight) < concurrency:
+                        task_ids = taskqueue.claim_batch(worker_id, options['names'])
+                        if not task_ids:
+                            break
+                        in_flight.add(executor.submit(taskqueue.execute_batch, task_ids))
+
+                    if not in_flight:
+                        if options['once']:
+                            break
+                        time.sleep(options['poll_interval'])
+                        continue
+
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    processed += sum(future.result() for future in done)
+        except KeyboardInterrupt:
+            self.stdout.write('Interrupted, waiting for running batches...')
+
+        self.stdout.write(self.style.SUCCESS(f'Processed {processed} task(s)'))
@@ -0,0 +1,59 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Avg, Count, Max, Sum
+from django.utils import timezone
+
+from api.models import SlowQueryLog
+
+
+class Command(BaseCommand):
+    help = 'Print the slowest queries from the slow query log, grouped by fingerprint'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=10, help='Number of fingerprints to show')
+        parser.add_argument('--since-hours', type=float, help='Only consider entries from the last N hours')
+        parser.add_argument('--clear', action='store_true', help='Delete the log after printing it')
+
+    def handle(self, *args, **options):
+        entries = SlowQueryLog.objects.all()
+        if options['since_hours']:
+            since = timezone.now() - timedelta(hours=options['since_hours'])
+            entries = entries.filter(created_at__gte=since)
+
+        report = (
+            entries.values('fingerprint')
+            .annotate(
+                calls=Count('id'),
+                total_ms=Sum('duration_ms'),
+                avg_ms=Avg('duration_ms'),
+                max_ms=Max('duration_ms'),
+            )
+            .order_by('-total_ms')[:options['top']]
+        )
+
+        if not report:
+            self.stdout.write('No slow queries recorded.')
+
+        for rank, row in enumerate(report, start=1):
+            fingerprint = row['fingerprint']
+            sample = entries.filter(fingerprint=fingerprint).order_by('-duration_ms').first()
+            views = sorted(set(
+                entries.filter(fingerprint=fingerprint).values_list('view', flat=True)
+            ))
+
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f"#{rank} {fingerprint}  calls={row['calls']}  total={row['total_ms']:.1f} ms  "
+                f"avg={row['avg_ms']:.1f} ms  max={row['max_ms']:.1f} ms"
+            ))
+            self.stdout.write(f"  views: {', '.join(v or '-' for v in views)}")
+            self.stdout.write(f'  sql:   {sample.normalized_sql}')
+            if sample.explain:
+                self.stdout.write('  plan:')
+                for line in sample.explain.splitlines():
+                    self.stdout.write(f'    {line}')
+            self.stdout.write('')
+
+        if options['clear']:
+            deleted, _ = entries.delete()
+            self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} log entries'))
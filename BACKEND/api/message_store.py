@@ -0,0 +1,187 @@
+"""
+Message history split between the hot Message table and cold MessageChunk rows.
+
+archive_messages packs old messages that their recipient has already read
+into zlib-compressed chunks per match, so unread counts never need the cold
+side. Each chunk carries an offset index (message id -> byte offset in the
+decompressed payload), which lets a page decode only the records it returns.
+Readers below merge both sides by message id.
+"""
+import bisect
+import struct
+import zlib
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db import transaction
+from django.db.models import Max, OuterRef, Q, Subquery
+
+from .models import Message, MessageChunk
+
+RECORD = struct.Struct('<QQqI')  # id, sender_pet_id, created_at (us since epoch), content length
+INDEX_ENTRY = struct.Struct('<QI')  # message id, payload offset
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def pack(messages):
+    """(compressed payload, offset index, raw size) for message dicts sorted by id"""
+    payload = bytearray()
+    offsets = bytearray()
+    for message in messages:
+        content = message['content'].encode('utf-8')
+        created_us = (message['created_at'] - EPOCH) // timedelta(microseconds=1)
+        offsets += INDEX_ENTRY.pack(message['id'], len(payload))
+        payload += RECORD.pack(message['id'], message['sender_pet_id'], created_us, len(content))
+        payload += content
+    return zlib.compress(bytes(payload), 6), bytes(offsets), len(payload)
+
+
+def unpack(chunk, before=None, limit=None, after=None):
+    """Records of a chunk with after < id < before (the newest `limit` of them), oldest first"""
+    index = [INDEX_ENTRY.unpack_from(chunk.offsets, i) for i in range(0, len(chunk.offsets), INDEX_ENTRY.size)]
+    ids = [message_id for message_id, _ in index]
+    end = bisect.bisect_left(ids, before) if before is not None else len(ids)
+    first = bisect.bisect_right(ids, after) if after is not None else 0
+    start = max(first, end - limit) if limit else first
+    if start >= end:
+        return []
+
+    payload = zlib.decompress(bytes(chunk.data))
+    records = []
+    for _, offset in index[start:end]:
+        message_id, sender_pet_id, created_us, length = RECORD.unpack_from(payload, offset)
+        body = offset + RECORD.size
+        records.append({
+            'id': message_id,
+            'sender_pet_id': sender_pet_id,
+            'created_at': EPOCH + timedelta(microseconds=created_us),
+            'content': payload[body:body + length].decode('utf-8'),
+        })
+    return records
+
+
+def _to_message(match, record):
+    """Unsaved Message for a cold record, wired to the already loaded match and pets"""
+    message = Message(match=match, **record)
+    message.sender_pet = match.pet1 if record['sender_pet_id'] == match.pet1_id else match.pet2
+    return message
+
+
+def page(match, before=None, limit=None, after=None):
+    """
+    Messages of `match` with after < id < before, oldest first. With a limit
+    only the newest `limit` of them are returned; without one, all of them.
+    """
+    hot = match.messages.select_related('sender_pet').order_by('-id')
+    if before is not None:
+        hot = hot.filter(id__lt=before)
+    if after is not None:
+        hot = hot.filter(id__gt=after)
+    messages = list(hot[:limit] if limit else hot)
+
+    chunks = MessageChunk.objects.filter(match=match).order_by('-last_message_id')
+    if before is not None:
+        chunks = chunks.filter(first_message_id__lt=before)
+    if after is not None:
+        # Polling for new messages: only ever archived ones are older, so this is usually empty
+        chunks = chunks.filter(last_message_id__gt=after)
+
+    for chunk_id, last_message_id in chunks.values_list('id', 'last_message_id'):
+        if limit and len(messages) >= limit:
+            # Every remaining chunk is older than the current page
+            messages.sort(key=lambda message: message.id, reverse=True)
+            if messages[limit - 1].id > last_message_id:
+                break
+        chunk = MessageChunk.objects.only('data', 'offsets').get(id=chunk_id)
+        messages += [_to_message(match, record) for record in unpack(chunk, before, limit, after)]
+
+    messages.sort(key=lambda message: message.id, reverse=True)
+    if limit:
+        messages = messages[:limit]
+    messages.reverse()
+    return messages
+
+
+def last_message(match):
+    """Newest message of the match, hot or cold"""
+    message = match.messages.select_related('sender_pet').order_by('-id').first()
+    if message is not None:
+        return message
+
+    chunk = MessageChunk.objects.filter(match=match).order_by('-last_message_id').first()
+    if chunk is None:
+        return None
+    return _to_message(match, unpack(chunk, limit=1)[-1])
+
+
+def last_messages(matches):
+    """
+    {match id: newest message} for a page of matches in two queries (hot,
+    then cold for the rest) instead of last_message() once per match
+    """
+    by_id = {match.id: match for match in matches}
+    if not by_id:
+        return {}
+
+    newest_hot = (
+        Message.objects.filter(match_id__in=by_id)
+        .values('match_id').annotate(newest=Max('id')).values('newest')
+    )
+    result = {}
+    for message in Message.objects.filter(id__in=newest_hot):
+        message.match = by_id[message.match_id]
+        result[message.match_id] = message
+
+    newest_chunk = (
+        MessageChunk.objects.filter(match_id=OuterRef('match_id'))
+        .order_by('-last_message_id').values('id')[:1]
+    )
+    chunks = (
+        MessageChunk.objects.filter(match_id__in=by_id, id=Subquery(newest_chunk))
+        .exclude(match_id__in=list(result))
+        .only('match_id', 'data', 'offsets')
+    )
+    for chunk in chunks:
+        result[chunk.match_id] = _to_message(by_id[chunk.match_id], unpack(chunk, limit=1)[-1])
+    return result
+
+
+def archivable(match, cutoff):
+    """Messages older than cutoff that the receiving pet has already read (flagged ones stay for review)"""
+    read_by_recipient = (
+        Q(sender_pet_id=match.pet1_id, id__lte=match.pet2_last_read_id)
+        | Q(sender_pet_id=match.pet2_id, id__lte=match.pet1_last_read_id)
+    )
+    return Message.objects.filter(read_by_recipient, match=match, created_at__lt=cutoff, flagged=False).order_by('id')
+
+
+def compact_match(match, cutoff, chunk_size):
+    """
+    Move the archivable messages of `match` into chunks of up to chunk_size.
+    Each chunk is written and its rows deleted in one transaction, so an
+    interrupted run simply continues where it stopped.
+    """
+    archived = chunks = 0
+    while True:
+        with transaction.atomic():
+            batch = list(
+                archivable(match, cutoff)
+                .values('id', 'sender_pet_id', 'content', 'created_at')[:chunk_size]
+            )
+            if not batch:
+                break
+
+            data, offsets, raw_size = pack(batch)
+            MessageChunk.objects.create(
+                match=match,
+                first_message_id=batch[0]['id'],
+                last_message_id=batch[-1]['id'],
+                message_count=len(batch),
+                data=data,
+                offsets=offsets,
+                raw_size=raw_size,
+            )
+            Message.objects.filter(id__in=[message['id'] for message in batch]).delete()
+
+        archived += len(batch)
+        chunks += 1
+    return archived, chunks
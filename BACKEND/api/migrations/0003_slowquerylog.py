@@ -0,0 +1,29 @@
+# Generated by Django 5.0.1 on 2026-10-19 03:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlowQueryLog',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fingerprint', models.CharField(db_index=True, max_length=40)),
+                ('normalized_sql', models.TextField()),
+                ('sql', models.TextField()),
+                ('view', models.CharField(blank=True, max_length=255)),
+                ('duration_ms', models.FloatField()),
+                ('explain', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.0.1 on 2026-10-19 03:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_task'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='pass',
+            index=models.Index(fields=['from_pet', 'created_at'], name='api_pass_from_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pass',
+            index=models.Index(fields=['created_at', 'id'], name='api_pass_created_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.0.1 on 2026-10-19 03:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_pass_retention'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SeenFilter',
+            fields=[
+                ('pet', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='seen_filter', serialize=False, to='api.pet')),
+                ('bits', models.BinaryField()),
+                ('num_hashes', models.PositiveSmallIntegerField()),
+                ('capacity', models.PositiveIntegerField()),
+                ('item_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
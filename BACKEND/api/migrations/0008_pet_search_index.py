@@ -0,0 +1,36 @@
+# Generated by Django 5.0.1 on 2026-10-19 03:51
+
+from django.db import migrations
+
+from api import search
+
+
+def create_search_index(apps, schema_editor):
+    backend = search.get_backend(schema_editor.connection)
+    if backend is None:
+        return
+
+    Pet = apps.get_model('api', 'Pet')
+    with schema_editor.connection.cursor() as cursor:
+        backend.install(cursor)
+        rows = Pet.objects.values_list('id', 'name', 'breed', 'bio').iterator(chunk_size=1000)
+        for pet_id, name, breed, bio in rows:
+            backend.index(cursor, pet_id, name, breed, bio)
+
+
+def drop_search_index(apps, schema_editor):
+    backend = search.get_backend(schema_editor.connection)
+    if backend is not None:
+        with schema_editor.connection.cursor() as cursor:
+            backend.uninstall(cursor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_pet_location'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
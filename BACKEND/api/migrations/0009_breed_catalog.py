@@ -0,0 +1,84 @@
+# Generated by Django 5.0.1 on 2026-10-19 03:52
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_pet_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Breed',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pet_type', models.CharField(max_length=20)),
+                ('name', models.CharField(max_length=100)),
+                ('key', models.CharField(max_length=100)),
+                ('trigram_count', models.PositiveSmallIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['pet_type', 'name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='BreedAlias',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pet_type', models.CharField(max_length=20)),
+                ('key', models.CharField(max_length=100)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='BreedTrigram',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('trigram', models.CharField(max_length=3)),
+            ],
+        ),
+        migrations.RemoveIndex(
+            model_name='pet',
+            name='api_pet_geo_cell_idx',
+        ),
+        migrations.AlterUniqueTogether(
+            name='breed',
+            unique_together={('pet_type', 'key')},
+        ),
+        migrations.AddField(
+            model_name='pet',
+            name='canonical_breed',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='pets', to='api.breed'),
+        ),
+        migrations.AddIndex(
+            model_name='pet',
+            index=models.Index(fields=['geo_cell', 'canonical_breed'], name='api_pet_geo_cell_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pet',
+            index=models.Index(fields=['canonical_breed', 'pet_type', 'is_active'], name='api_pet_breed_idx'),
+        ),
+        migrations.AddField(
+            model_name='breedalias',
+            name='breed',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='aliases', to='api.breed'),
+        ),
+        migrations.AddField(
+            model_name='breedtrigram',
+            name='breed',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trigrams', to='api.breed'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='breedalias',
+            unique_together={('pet_type', 'key')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='breedtrigram',
+            unique_together={('trigram', 'breed')},
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.0.1 on 2026-10-19 03:53
+
+from django.db import migrations
+from django.db.models import Count
+
+from api.breeds import BreedResolver, breed_key
+
+
+def backfill_breeds(apps, schema_editor):
+    Pet = apps.get_model('api', 'Pet')
+    resolver = BreedResolver(
+        apps.get_model('api', 'Breed'),
+        apps.get_model('api', 'BreedAlias'),
+        apps.get_model('api', 'BreedTrigram'),
+    )
+
+    # Pool the spellings that normalize alike ("Golden Retriever", "golden retriever")
+    groups = {}
+    combos = Pet.objects.values('pet_type', 'breed').annotate(total=Count('id')).order_by('pet_type', 'breed')
+    for combo in combos:
+        key = breed_key(combo['breed'])
+        if key:
+            groups.setdefault((combo['pet_type'], key), {})[combo['breed']] = combo['total']
+
+    # Most common breeds first, so they become canonical and rarer typos resolve
+    # to them; on a tie, the breed more users spelled in different ways wins
+    ordered = sorted(
+        groups.items(),
+        key=lambda item: (-sum(item[1].values()), -len(item[1]), item[0]),
+    )
+    for (pet_type, _), spellings in ordered:
+        name = max(spellings, key=lambda spelling: (spellings[spelling], spelling))
+        breed = resolver.resolve(pet_type, name)
+        Pet.objects.filter(pet_type=pet_type, breed__in=list(spellings)).update(canonical_breed=breed)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_breed_catalog'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_breeds, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.0.1 on 2026-10-19 03:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_backfill_breeds'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='match',
+            name='pet1_last_read_id',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='match',
+            name='pet2_last_read_id',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['match', 'id'], name='api_message_match_id_idx'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.0.1 on 2026-10-19 03:59
+
+from django.db import migrations
+from django.db.models import Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_watermarks(apps, schema_editor):
+    Match = apps.get_model('api', 'Match')
+    Message = apps.get_model('api', 'Message')
+
+    # A pet has read up to the newest message it received that is marked read
+    def newest_read(sender):
+        newest = (
+            Message.objects.filter(match=OuterRef('pk'), sender_pet=OuterRef(sender), is_read=True)
+            .order_by().values('match').annotate(newest=Max('id')).values('newest')
+        )
+        return Coalesce(Subquery(newest), 0)
+
+    Match.objects.filter(messages__is_read=True).distinct().update(
+        pet1_last_read_id=newest_read('pet2'),
+        pet2_last_read_id=newest_read('pet1'),
+    )
+
+
+def restore_is_read(apps, schema_editor):
+    Match = apps.get_model('api', 'Match')
+    Message = apps.get_model('api', 'Message')
+
+    for match in Match.objects.exclude(pet1_last_read_id=0, pet2_last_read_id=0).iterator():
+        Message.objects.filter(match=match, sender_pet_id=match.pet2_id, id__lte=match.pet1_last_read_id).update(is_read=True)
+        Message.objects.filter(match=match, sender_pet_id=match.pet1_id, id__lte=match.pet2_last_read_id).update(is_read=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_match_read_watermarks'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_watermarks, restore_is_read),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.0.1 on 2026-10-19 03:59
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_backfill_read_watermarks'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='message',
+            name='is_read',
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.0.1 on 2026-10-19 04:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_remove_message_is_read'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MessageChunk',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('first_message_id', models.BigIntegerField()),
+                ('last_message_id', models.BigIntegerField()),
+                ('message_count', models.PositiveIntegerField()),
+                ('data', models.BinaryField()),
+                ('offsets', models.BinaryField()),
+                ('raw_size', models.PositiveIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('match', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='message_chunks', to='api.match')),
+            ],
+            options={
+                'ordering': ['match', 'first_message_id'],
+                'indexes': [models.Index(fields=['match', 'last_message_id'], name='api_msgchunk_match_last_idx')],
+                'unique_together': {('match', 'first_message_id')},
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.0.1 on 2026-10-19 04:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_message_chunks'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pet',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.CreateModel(
+            name='DeletionJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('pet', 'Mascota'), ('user', 'Usuario')], max_length=10)),
+                ('target_id', models.BigIntegerField()),
+                ('status', models.CharField(choices=[('pending', 'Pendiente'), ('running', 'En ejecución'), ('done', 'Completada')], default='pending', max_length=10)),
+                ('pet_id', models.BigIntegerField(blank=True, null=True)),
+                ('step', models.CharField(blank=True, max_length=20)),
+                ('rows_deleted', models.BigIntegerField(default=0)),
+                ('batches', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'created_at'], name='api_deletionjob_status_idx')],
+            },
+        ),
+    ]
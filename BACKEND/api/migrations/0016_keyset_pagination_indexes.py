@@ -0,0 +1,27 @@
+# Generated by Django 5.0.1 on 2026-10-19 04:09
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_deferred_deletion'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='match',
+            index=models.Index(fields=['pet1', 'created_at', 'id'], name='api_match_pet1_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='match',
+            index=models.Index(fields=['pet2', 'created_at', 'id'], name='api_match_pet2_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pet',
+            index=models.Index(fields=['owner', 'created_at', 'id'], name='api_pet_owner_created_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.0.1 on 2026-10-19 04:11
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0016_keyset_pagination_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MatchParticipant',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('match', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='participants', to='api.match')),
+                ('other_pet', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='api.pet')),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='match_memberships', to=settings.AUTH_USER_MODEL)),
+                ('pet', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='match_memberships', to='api.pet')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['owner', 'match'], name='api_participant_owner_idx'), models.Index(fields=['pet', 'other_pet'], name='api_participant_pet_idx')],
+                'unique_together': {('match', 'pet')},
+            },
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.0.1 on 2026-10-19 04:11
+
+from django.db import migrations
+
+BATCH_SIZE = 2000
+
+
+def backfill_participants(apps, schema_editor):
+    Match = apps.get_model('api', 'Match')
+    MatchParticipant = apps.get_model('api', 'MatchParticipant')
+
+    # Historical models have no custom managers, so rows are built here
+    matches = Match.objects.order_by('id').values_list('id', 'pet1_id', 'pet1__owner_id', 'pet2_id', 'pet2__owner_id')
+    last_id = 0
+    while True:
+        batch = list(matches.filter(id__gt=last_id)[:BATCH_SIZE])
+        if not batch:
+            break
+        MatchParticipant.objects.bulk_create(
+            [
+                row
+                for match_id, pet1_id, owner1_id, pet2_id, owner2_id in batch
+                for row in (
+                    MatchParticipant(match_id=match_id, pet_id=pet1_id, other_pet_id=pet2_id, owner_id=owner1_id),
+                    MatchParticipant(match_id=match_id, pet_id=pet2_id, other_pet_id=pet1_id, owner_id=owner2_id),
+                )
+            ],
+            ignore_conflicts=True,
+        )
+        last_id = batch[-1][0]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0017_match_participants'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_participants, migrations.RunPython.noop),
+    ]
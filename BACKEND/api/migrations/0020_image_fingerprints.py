@@ -0,0 +1,35 @@
+# Generated by Django 5.0.1 on 2026-10-19 04:31
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0019_delta_sync'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageFingerprint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url', models.URLField(max_length=500)),
+                ('public_id', models.CharField(blank=True, max_length=255)),
+                ('dhash', models.BigIntegerField()),
+                ('band0', models.IntegerField()),
+                ('band1', models.IntegerField()),
+                ('band2', models.IntegerField()),
+                ('band3', models.IntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='image_fingerprints', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['owner', 'band0'], name='api_fingerprint_band0_idx'), models.Index(fields=['owner', 'band1'], name='api_fingerprint_band1_idx'), models.Index(fields=['owner', 'band2'], name='api_fingerprint_band2_idx'), models.Index(fields=['owner', 'band3'], name='api_fingerprint_band3_idx')],
+                'unique_together': {('owner', 'url')},
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.0.1 on 2026-10-19 04:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0020_image_fingerprints'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BlockedTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=100, unique=True)),
+                ('action', models.CharField(choices=[('flag', 'Flag for review'), ('reject', 'Reject message')], default='flag', max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='message',
+            name='flagged',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(condition=models.Q(('flagged', True)), fields=['id'], name='api_message_flagged_idx'),
+        ),
+    ]
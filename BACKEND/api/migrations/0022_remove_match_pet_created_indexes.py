@@ -0,0 +1,21 @@
+# Generated by Django 5.0.1 on 2026-10-19 04:45
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0021_message_moderation'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='match',
+            name='api_match_pet1_created_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='match',
+            name='api_match_pet2_created_idx',
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.0.1 on 2026-10-19 04:46
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0022_remove_match_pet_created_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='pass',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+    ]
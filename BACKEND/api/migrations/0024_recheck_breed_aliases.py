@@ -0,0 +1,47 @@
+# Generated by Django 5.0.1 on 2026-10-19 05:02
+
+from django.conf import settings
+from django.db import migrations
+from django.utils import timezone
+
+from api.breeds import BreedResolver, breed_key, similarity
+
+
+def recheck_breed_aliases(apps, schema_editor):
+    Pet = apps.get_model('api', 'Pet')
+    Breed = apps.get_model('api', 'Breed')
+    BreedAlias = apps.get_model('api', 'BreedAlias')
+    resolver = BreedResolver(Breed, BreedAlias, apps.get_model('api', 'BreedTrigram'))
+
+    # Fuzzy matches used to be saved as aliases; drop the ones the stricter
+    # matching rejects ("labradoodle" -> Labrador) so they stop pinning spellings
+    rejected = [
+        alias_id
+        for alias_id, key, target_key in BreedAlias.objects.values_list('id', 'key', 'breed__key')
+        if similarity(key, target_key) < settings.BREED_MATCH_THRESHOLD or not resolver.close_spelling(key, target_key)
+    ]
+    BreedAlias.objects.filter(id__in=rejected).delete()
+
+    # Pets resolved through any fuzzy match: resolve them again
+    combos = (
+        Pet.objects.exclude(canonical_breed=None)
+        .values_list('pet_type', 'breed', 'canonical_breed__key')
+        .distinct()
+    )
+    for pet_type, breed, canonical_key in combos:
+        if breed_key(breed) == canonical_key:
+            continue
+        resolved = resolver.resolve(pet_type, breed)
+        # canonical_breed is part of the synced pet: bump updated_at (api/sync.py)
+        Pet.objects.filter(pet_type=pet_type, breed=breed).update(canonical_breed=resolved, updated_at=timezone.now())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0023_pass_created_at_default'),
+    ]
+
+    operations = [
+        migrations.RunPython(recheck_breed_aliases, migrations.RunPython.noop),
+    ]
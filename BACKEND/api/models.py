@@ -1,8 +1,53 @@
+from datetime import timedelta
+from django.conf import settings
+from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
+from django.db.models.functions import Coalesce, Greatest
 from django.contrib.auth import get_user_model
+from django.utils import timezone
+from . import geo
 
 User = get_user_model()
 
+class Breed(models.Model):
+    """Canonical breed; Pet.breed free text is resolved to one of these (see api/breeds.py)"""
+    pet_type = models.CharField(max_length=20)
+    name = models.CharField(max_length=100)
+    key = models.CharField(max_length=100)
+    trigram_count = models.PositiveSmallIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        unique_together = ('pet_type', 'key')
+        ordering = ['pet_type', 'name']
+    
+    def __str__(self):
+        return f"{self.name} ({self.pet_type})"
+
+class BreedAlias(models.Model):
+    breed = models.ForeignKey(Breed, on_delete=models.CASCADE, related_name='aliases')
+    pet_type = models.CharField(max_length=20)
+    key = models.CharField(max_length=100)
+    
+    class Meta:
+        unique_together = ('pet_type', 'key')
+    
+    def __str__(self):
+        return f"{self.key} -> {self.breed.name}"
+
+class BreedTrigram(models.Model):
+    breed = models.ForeignKey(Breed, on_delete=models.CASCADE, related_name='trigrams')
+    trigram = models.CharField(max_length=3)
+    
+    class Meta:
+        # Leading with trigram makes this the lookup index for fuzzy matching
+        unique_together = ('trigram', 'breed')
+
+class PetQuerySet(models.QuerySet):
+    def alive(self):
+        """Pets that have not been deleted (deleted pets wait for the purge job)"""
+        return self.filter(deleted_at__isnull=True)
+
 class Pet(models.Model):
     PET_TYPES = [
         ('dog', 'Perro'),
@@ -21,19 +66,74 @@ class Pet(models.Model):
     name = models.CharField(max_length=100)
     pet_type = models.CharField(max_length=20, choices=PET_TYPES)
     breed = models.CharField(max_length=100)
+    canonical_breed = models.ForeignKey(
+        Breed, on_delete=models.SET_NULL, null=True, blank=True, editable=False, related_name='pets'
+    )
     age = models.IntegerField()
     gender = models.CharField(max_length=10, choices=GENDER_CHOICES)
     bio = models.TextField(max_length=500)
     main_image = models.URLField(max_length=500, blank=True, null=True)
+    latitude = models.FloatField(
+        blank=True, null=True, validators=[MinValueValidator(-90), MaxValueValidator(90)]
+    )
+    longitude = models.FloatField(
+        blank=True, null=True, validators=[MinValueValidator(-180), MaxValueValidator(180)]
+    )
+    geo_cell = models.CharField(max_length=12, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     is_active = models.BooleanField(default=True)
+    # Set on delete; the rows are removed later by a DeletionJob (see api/deletion.py)
+    deleted_at = models.DateTimeField(null=True, blank=True, editable=False)
+    
+    objects = PetQuerySet.as_manager()
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['geo_cell', 'canonical_breed'], name='api_pet_geo_cell_idx'),
+            models.Index(fields=['canonical_breed', 'pet_type', 'is_active'], name='api_pet_breed_idx'),
+            # Keyset pagination of a user's pets (api/pagination.py)
+            models.Index(fields=['owner', 'created_at', 'id'], name='api_pet_owner_created_idx'),
+            # Delta sync: pets changed after an (updated_at, id) cursor (api/sync.py)
+            models.Index(fields=['updated_at', 'id'], name='api_pet_updated_idx'),
+        ]
     
     def __str__(self):
         return f"{self.name} ({self.pet_type})"
+    
+    def soft_delete(self):
+        """Hide the pet everywhere right away, without touching related rows"""
+        self.deleted_at = self.updated_at = timezone.now()
+        self.is_active = False
+        Pet.objects.filter(pk=self.pk).update(deleted_at=self.deleted_at, is_active=False, updated_at=self.updated_at)
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_breed = (instance.__dict__.get('pet_type'), instance.__dict__.get('breed'))
+        instance._loaded_owner_id = instance.__dict__.get('owner_id')
+        return instance
+    
+    def save(self, *args, **kwargs):
+        derived_fields = ['geo_cell']
+        
+        # Keep the indexed grid cell in sync with the coordinates
+        if self.latitude is not None and self.longitude is not None:
+            self.geo_cell = geo.encode(self.latitude, self.longitude)
+        else:
+            self.geo_cell = ''
+        
+        # Resolve the free-text breed only when it is new or has changed
+        if self.canonical_breed_id is None or (self.pet_type, self.breed) != getattr(self, '_loaded_breed', None):
+            from .breeds import resolve_breed
+            self.canonical_breed = resolve_breed(self.pet_type, self.breed)
+            self._loaded_breed = (self.pet_type, self.breed)
+            derived_fields.append('canonical_breed')
+        
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = {*kwargs['update_fields'], *derived_fields}
+        super().save(*args, **kwargs)
 
 class PetImage(models.Model):
     pet = models.ForeignKey(Pet, on_delete=models.CASCADE, related_name='images')
@@ -46,6 +146,34 @@ class PetImage(models.Model):
     def __str__(self):
         return f"Image for {self.pet.name}"
 
+class ImageFingerprint(models.Model):
+    """
+    Perceptual hash of an image a user uploaded, so near-identical uploads
+    reuse the stored asset (see api/image_dedup.py)
+    """
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='image_fingerprints')
+    url = models.URLField(max_length=500)
+    public_id = models.CharField(max_length=255, blank=True)
+    dhash = models.BigIntegerField()  # 64-bit difference hash, stored signed
+    # The hash split in four 16-bit bands: a hash within 3 bits shares at least one band
+    band0 = models.IntegerField()
+    band1 = models.IntegerField()
+    band2 = models.IntegerField()
+    band3 = models.IntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        unique_together = ('owner', 'url')
+        indexes = [
+            models.Index(fields=['owner', 'band0'], name='api_fingerprint_band0_idx'),
+            models.Index(fields=['owner', 'band1'], name='api_fingerprint_band1_idx'),
+            models.Index(fields=['owner', 'band2'], name='api_fingerprint_band2_idx'),
+            models.Index(fields=['owner', 'band3'], name='api_fingerprint_band3_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.url} ({self.dhash & 0xFFFFFFFFFFFFFFFF:016x})"
+
 class Like(models.Model):
     from_pet = models.ForeignKey(Pet, on_delete=models.CASCADE, related_name='likes_given')
     to_pet = models.ForeignKey(Pet, on_delete=models.CASCADE, related_name='likes_received')
@@ -65,10 +193,42 @@ class Like(models.Model):
             to_pet=self.from_pet
         ).exists()
 
+class MatchQuerySet(models.QuerySet):
+    def alive(self):
+        """Matches where neither pet has been deleted"""
+        return self.filter(pet1__deleted_at__isnull=True, pet2__deleted_at__isnull=True)
+    
+    def for_owner(self, user):
+        """Matches of any of the user's pets: one indexed lookup on MatchParticipant"""
+        return self.filter(id__in=MatchParticipant.objects.filter(owner=user).values('match_id'))
+    
+    def with_unread_counts(self):
+        """Annotate pet1_unread_count / pet2_unread_count (messages past each pet's watermark)"""
+        def unread(reader, sender):
+            messages = (
+                Message.objects.filter(
+                    match=models.OuterRef('pk'),
+                    sender_pet=models.OuterRef(sender),
+                    id__gt=models.OuterRef(f'{reader}_last_read_id'),
+                )
+                .order_by().values('match').annotate(total=models.Count('id')).values('total')
+            )
+            return Coalesce(models.Subquery(messages, output_field=models.IntegerField()), 0)
+        
+        return self.annotate(
+            pet1_unread_count=unread('pet1', 'pet2'),
+            pet2_unread_count=unread('pet2', 'pet1'),
+        )
+
 class Match(models.Model):
     pet1 = models.ForeignKey(Pet, on_delete=models.CASCADE, related_name='matches_as_pet1')
     pet2 = models.ForeignKey(Pet, on_delete=models.CASCADE, related_name='matches_as_pet2')
     created_at = models.DateTimeField(auto_now_add=True)
+    # Read watermarks: every message up to this id has been read by that pet
+    pet1_last_read_id = models.BigIntegerField(default=0)
+    pet2_last_read_id = models.BigIntegerField(default=0)
+    
+    objects = MatchQuerySet.as_manager()
     
     class Meta:
         unique_together = ('pet1', 'pet2')
@@ -76,28 +236,290 @@ class Match(models.Model):
     
     def __str__(self):
         return f"Match: {self.pet1.name} & {self.pet2.name}"
+    
+    def watermark_field(self, pet_id):
+        return 'pet1_last_read_id' if pet_id == self.pet1_id else 'pet2_last_read_id'
+    
+    def last_read_id(self, pet_id):
+        return getattr(self, self.watermark_field(pet_id))
+    
+    def is_read(self, message):
+        """Whether the pet receiving `message` has read it"""
+        reader_id = self.pet2_id if message.sender_pet_id == self.pet1_id else self.pet1_id
+        return message.id <= self.last_read_id(reader_id)
+    
+    def unread_count(self, pet_id):
+        """Messages from the other pet that pet_id has not read yet"""
+        annotated = getattr(self, f'pet{1 if pet_id == self.pet1_id else 2}_unread_count', None)
+        if annotated is not None:
+            return annotated
+        return self.messages.filter(id__gt=self.last_read_id(pet_id)).exclude(sender_pet_id=pet_id).count()
+    
+    def mark_read(self, pet_id):
+        """Move pet_id's watermark to the newest message: a single-row UPDATE"""
+        field = self.watermark_field(pet_id)
+        newest = Message.objects.filter(match=models.OuterRef('pk')).order_by('-id').values('id')[:1]
+        Match.objects.filter(pk=self.pk).update(
+            **{field: Greatest(models.F(field), Coalesce(models.Subquery(newest), 0))}
+        )
+        self.refresh_from_db(fields=[field])
+
+class MatchParticipantQuerySet(models.QuerySet):
+    def add_for(self, matches):
+        """Create the two membership rows of each match, keeping rows that already exist"""
+        matches = list(matches)
+        pet_ids = {match.pet1_id for match in matches} | {match.pet2_id for match in matches}
+        owners = dict(Pet.objects.filter(id__in=pet_ids).values_list('id', 'owner_id'))
+        rows = [
+            self.model(match_id=match.id, pet_id=pet_id, other_pet_id=other_pet_id, owner_id=owners[pet_id])
+            for match in matches
+            for pet_id, other_pet_id in ((match.pet1_id, match.pet2_id), (match.pet2_id, match.pet1_id))
+        ]
+        self.bulk_create(rows, ignore_conflicts=True)
+    
+    def matched_pet_ids(self, pet_id):
+        return self.filter(pet_id=pet_id).values_list('other_pet_id', flat=True)
+
+class MatchParticipant(models.Model):
+    """
+    One row per side of a Match, so "matches of user X" and "pets matched with
+    pet Y" are single index lookups instead of an OR over pet1/pet2. Created
+    by a post_save signal on Match and removed with it by CASCADE.
+    """
+    match = models.ForeignKey(Match, on_delete=models.CASCADE, related_name='participants')
+    pet = models.ForeignKey(Pet, on_delete=models.CASCADE, related_name='match_memberships')
+    other_pet = models.ForeignKey(Pet, on_delete=models.CASCADE, related_name='+')
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='match_memberships')
+    
+    objects = MatchParticipantQuerySet.as_manager()
+    
+    class Meta:
+        unique_together = ('match', 'pet')
+        indexes = [
+            models.Index(fields=['owner', 'match'], name='api_participant_owner_idx'),
+            models.Index(fields=['pet', 'other_pet'], name='api_participant_pet_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.pet_id} in match {self.match_id}"
+
+class SyncTombstone(models.Model):
+    """
+    A deleted pet, recorded for every user who could see it (its owner and the
+    owners of the pets it matched) so their next delta sync drops it
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='sync_tombstones')
+    pet_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'id'], name='api_tombstone_user_idx'),
+        ]
+    
+    def __str__(self):
+        return f"Pet {self.pet_id} deleted for user {self.user_id}"
 
 class Message(models.Model):
     match = models.ForeignKey(Match, on_delete=models.CASCADE, related_name='messages')
     sender_pet = models.ForeignKey(Pet, on_delete=models.CASCADE, related_name='sent_messages')
     content = models.TextField(max_length=1000)
+    # Matched a "flag" BlockedTerm: delivered, but waiting for review in the admin
+    flagged = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
-    is_read = models.BooleanField(default=False)
     
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['match', 'id'], name='api_message_match_id_idx'),
+            # Only the few flagged rows: the moderation queue
+            models.Index(fields=['id'], condition=models.Q(flagged=True), name='api_message_flagged_idx'),
+        ]
     
     def __str__(self):
         return f"Message from {self.sender_pet.name} at {self.created_at}"
+    
+    @property
+    def is_read(self):
+        """Derived from the recipient's read watermark on the match"""
+        return self.match.is_read(self)
+
+class BlockedTerm(models.Model):
+    """Word or phrase moderated in chat messages (see api/moderation.py)"""
+    ACTION_FLAG = 'flag'
+    ACTION_REJECT = 'reject'
+    ACTIONS = [
+        (ACTION_FLAG, 'Flag for review'),
+        (ACTION_REJECT, 'Reject message'),
+    ]
+    
+    term = models.CharField(max_length=100, unique=True)
+    action = models.CharField(max_length=10, choices=ACTIONS, default=ACTION_FLAG)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.term} ({self.action})"
+
+class MessageChunk(models.Model):
+    """Compressed block of archived messages of one match (see api/message_store.py)"""
+    match = models.ForeignKey(Match, on_delete=models.CASCADE, related_name='message_chunks')
+    first_message_id = models.BigIntegerField()
+    last_message_id = models.BigIntegerField()
+    message_count = models.PositiveIntegerField()
+    data = models.BinaryField()
+    offsets = models.BinaryField()  # (message id, payload offset) pairs
+    raw_size = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        unique_together = ('match', 'first_message_id')
+        ordering = ['match', 'first_message_id']
+        indexes = [
+            models.Index(fields=['match', 'last_message_id'], name='api_msgchunk_match_last_idx'),
+        ]
+    
+    def __str__(self):
+        return f"Messages {self.first_message_id}-{self.last_message_id} of match {self.match_id}"
+
+class PassQuerySet(models.QuerySet):
+    def expiry_cutoff(self):
+        """Passes older than this are expired, None if passes never expire"""
+        days = settings.PASS_EXPIRY_DAYS
+        return timezone.now() - timedelta(days=days) if days else None
+    
+    def active(self):
+        cutoff = self.expiry_cutoff()
+        return self.filter(created_at__gte=cutoff) if cutoff else self.all()
+    
+    def expired(self):
+        cutoff = self.expiry_cutoff()
+        return self.filter(created_at__lt=cutoff) if cutoff else self.none()
 
 class Pass(models.Model):
     from_pet = models.ForeignKey(Pet, on_delete=models.CASCADE, related_name='passes_given')
     to_pet = models.ForeignKey(Pet, on_delete=models.CASCADE, related_name='passes_received')
-    created_at = models.DateTimeField(auto_now_add=True)
+    # Not auto_now_add: buffered passes keep the time they were made (api/pass_buffer.py)
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
+    
+    objects = PassQuerySet.as_manager()
     
     class Meta:
         unique_together = ('from_pet', 'to_pet')
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['from_pet', 'created_at'], name='api_pass_from_created_idx'),
+            models.Index(fields=['created_at', 'id'], name='api_pass_created_idx'),
+        ]
+    
+    def is_expired(self):
+        cutoff = Pass.objects.expiry_cutoff()
+        return cutoff is not None and self.created_at < cutoff
+    
+    def __str__(self):
+        return f"{self.from_pet.name} passed {self.to_pet.name}"
+
+class SeenFilter(models.Model):
+    """Bloom filter of the pets a pet has liked, passed or matched (see api/seen_filter.py)"""
+    pet = models.OneToOneField(Pet, on_delete=models.CASCADE, primary_key=True, related_name='seen_filter')
+    bits = models.BinaryField()
+    num_hashes = models.PositiveSmallIntegerField()
+    capacity = models.PositiveIntegerField()
+    item_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"Seen filter for pet {self.pet_id} ({self.item_count}/{self.capacity})"
+
+class SlowQueryLog(models.Model):
+    """A query that exceeded SLOW_QUERY_THRESHOLD_MS during a request"""
+    fingerprint = models.CharField(max_length=40, db_index=True)
+    normalized_sql = models.TextField()
+    sql = models.TextField()
+    view = models.CharField(max_length=255, blank=True)
+    duration_ms = models.FloatField()
+    explain = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"{self.fingerprint} ({self.duration_ms:.1f} ms) in {self.view}"
+
+class Task(models.Model):
+    """Deferred unit of work executed by the `run_tasks` worker"""
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pendiente'),
+        (STATUS_RUNNING, 'En ejecución'),
+        (STATUS_DONE, 'Completada'),
+        (STATUS_FAILED, 'Fallida'),
+    ]
+    
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict)
+    priority = models.IntegerField(default=0)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=64, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['-priority', 'run_at', 'id']
+        indexes = [
+            models.Index(fields=['status', '-priority', 'run_at'], name='api_task_claim_idx'),
+            models.Index(fields=['status', 'name', '-priority', 'run_at'], name='api_task_batch_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.name} #{self.id} ({self.status})"
+
+class DeletionJob(models.Model):
+    """Background, batched removal of a soft-deleted pet or user and everything that points to it"""
+    KIND_PET = 'pet'
+    KIND_USER = 'user'
+    KIND_CHOICES = [
+        (KIND_PET, 'Mascota'),
+        (KIND_USER, 'Usuario'),
+    ]
+    
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pendiente'),
+        (STATUS_RUNNING, 'En ejecución'),
+        (STATUS_DONE, 'Completada'),
+    ]
+    
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    target_id = models.BigIntegerField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    # Resume point: pet being purged and step within it (see api/deletion.py)
+    pet_id = models.BigIntegerField(null=True, blank=True)
+    step = models.CharField(max_length=20, blank=True)
+    rows_deleted = models.BigIntegerField(default=0)
+    batches = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='api_deletionjob_status_idx'),
+        ]
     
     def __str__(self):
-        return f"{self.from_pet.name} passed {self.to_pet.name}"
\ No newline at end of file
+        return f"Delete {self.kind} {self.target_id} ({self.status})"
@@ -0,0 +1,124 @@
+"""
+Blocklist moderation of chat messages.
+
+The BlockedTerm rows are compiled into one Aho-Corasick automaton per
+process, so a message is scanned once, in time linear in its length,
+whatever the number of terms. Text and terms are normalized like search
+(case, accents and punctuation, see api/search.normalize) and the automaton
+steps over words rather than characters: terms only match whole words or
+phrases, and a message costs one dictionary lookup per word.
+
+Every process checks at most once per MODERATION_RELOAD_SECONDS whether the
+table changed and recompiles if it did: terms edited in the admin apply to
+every worker without a restart.
+"""
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+from django.db.models import Count, Max
+
+from .models import BlockedTerm
+from .search import normalize
+
+SEVERITY = {None: 0, BlockedTerm.ACTION_FLAG: 1, BlockedTerm.ACTION_REJECT: 2}
+
+
+class Automaton:
+    def __init__(self, terms):
+        """terms: {term: action}"""
+        self.goto = [{}]
+        self.fail = [0]
+        self.outputs = [()]
+
+        for term, action in terms.items():
+            words = normalize(term).split()
+            if not words:
+                continue
+            state = 0
+            for word in words:
+                if word not in self.goto[state]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.outputs.append(())
+                    self.goto[state][word] = len(self.goto) - 1
+                state = self.goto[state][word]
+            # Terms that normalize alike keep the stronger action
+            if not self.outputs[state] or SEVERITY[action] > SEVERITY[self.outputs[state][0][1]]:
+                self.outputs[state] = ((term, action),)
+
+        # Breadth first: a state's failure link is the longest proper suffix that is also a prefix
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for word, child in self.goto[state].items():
+                queue.append(child)
+                fallback = self.fail[state]
+                while fallback and word not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(word, 0)
+                self.outputs[child] += self.outputs[self.fail[child]]
+
+    def __len__(self):
+        return len(self.goto)
+
+    def scan(self, words):
+        """(strongest action, matched terms) for normalized words; stops at a reject"""
+        goto, fail, outputs = self.goto, self.fail, self.outputs
+        action, matched = None, []
+        state = 0
+        for word in words:
+            while state and word not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(word, 0)
+            for term, term_action in outputs[state]:
+                matched.append(term)
+                if SEVERITY[term_action] > SEVERITY[action]:
+                    action = term_action
+                    if action == BlockedTerm.ACTION_REJECT:
+                        return action, matched
+        return action, matched
+
+
+class Blocklist:
+    def __init__(self):
+        self._automaton = Automaton({})
+        self._version = None
+        self._checked_at = None
+        self._lock = threading.Lock()
+
+    def automaton(self):
+        """The compiled automaton, recompiled when the table changed since the last check"""
+        now = time.monotonic()
+        if self._checked_at is None or now - self._checked_at >= settings.MODERATION_RELOAD_SECONDS:
+            with self._lock:
+                if self._checked_at is None or now - self._checked_at >= settings.MODERATION_RELOAD_SECONDS:
+                    self._reload()
+                    self._checked_at = now
+        return self._automaton
+
+    def _reload(self):
+        # Count catches deletions, the newest updated_at catches additions and edits
+        version = BlockedTerm.objects.aggregate(count=Count('id'), changed=Max('updated_at'))
+        version = (version['count'], version['changed'])
+        if version != self._version:
+            self._automaton = Automaton(dict(BlockedTerm.objects.values_list('term', 'action')))
+            self._version = version
+
+    def invalidate(self):
+        """Check the table on the next message (this process only; others follow within the reload interval)"""
+        self._checked_at = None
+
+
+blocklist = Blocklist()
+
+
+def check(content):
+    """(action, matched terms) for a message; action is None, 'flag' or 'reject'"""
+    if not settings.MODERATION_ENABLED:
+        return None, []
+    automaton = blocklist.automaton()
+    if len(automaton) == 1:
+        return None, []
+    return automaton.scan(normalize(content).split())
@@ -0,0 +1,124 @@
+"""
+Keyset ("seek") cursor pagination.
+
+Rows are ordered by a unique key such as (created_at, id) and each page
+starts right after the last row of the previous one: WHERE (created_at, id) <
+(cursor) ORDER BY created_at DESC, id DESC LIMIT n. With an index on the key
+page 100 costs the same as page 1, there is no COUNT(*), and rows inserted
+while paging never shift or repeat results the way OFFSET does.
+
+Lists are always paginated: without ?page_size a page holds PAGE_SIZE rows
+(REST_FRAMEWORK settings) and clients follow `next` / `next_cursor`.
+"""
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetCursorPagination(BasePagination):
+    ordering = ('-created_at', '-id')  # Must end in a unique field
+    page_size = api_settings.PAGE_SIZE
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """One page as a list"""
+        params = request.query_params
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        queryset = queryset.order_by(*self.ordering)
+
+        cursor = params.get(self.cursor_query_param)
+        if cursor:
+            queryset = queryset.filter(self.after(self.decode_cursor(cursor, queryset.model)))
+
+        # One extra row tells whether there is a next page without a COUNT(*)
+        rows = list(queryset[:self.page_size + 1])
+        self.has_next = len(rows) > self.page_size
+        page = rows[:self.page_size]
+        self.next_cursor = self.encode_cursor(page[-1]) if self.has_next else None
+        return page
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def after(self, values):
+        """Q for rows strictly after `values` in self.ordering"""
+        condition = Q(pk__in=[])
+        equal = Q()
+        for field, value in zip(self.ordering, values):
+            name = field.lstrip('-')
+            lookup = f'{name}__lt' if field.startswith('-') else f'{name}__gt'
+            condition |= equal & Q(**{lookup: value})
+            equal &= Q(**{name: value})
+        return condition
+
+    def encode_cursor(self, row):
+        values = [getattr(row, field.lstrip('-')) for field in self.ordering]
+        data = json.dumps([value.isoformat() if hasattr(value, 'isoformat') else value for value in values])
+        return base64.urlsafe_b64encode(data.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor, model):
+        try:
+            raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            values = json.loads(raw)
+        except (binascii.Error, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+
+        try:
+            return [
+                model._meta.get_field(field.lstrip('-')).to_python(value)
+                for field, value in zip(self.ordering, values)
+            ]
+        except ValidationError:
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.page_size_query_param, self.page_size)
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'next_cursor': self.next_cursor,
+            'has_next': self.has_next,
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'next_cursor': {'type': 'string', 'nullable': True},
+                'has_next': {'type': 'boolean'},
+                'results': schema,
+            },
+        }
+
+
+class PetCursorPagination(KeysetCursorPagination):
+    """A user's pets, newest first (index api_pet_owner_created_idx)"""
+
+
+class MatchCursorPagination(KeysetCursorPagination):
+    """Matches, newest first (a user's matches come from MatchParticipant, see Match.objects.for_owner)"""
@@ -0,0 +1,77 @@
+"""
+Compact archive format for expired passes.
+
+Each file is a gzip stream made of a small header followed by fixed-size
+little-endian records (id, from_pet_id, to_pet_id, created_at as epoch
+microseconds), 32 bytes per pass before compression. Files are named after the
+id range they contain, so re-archiving the same batch simply overwrites it.
+"""
+import gzip
+import os
+import struct
+from collections import namedtuple
+from datetime import datetime, timezone as dt_timezone
+from pathlib import Path
+
+MAGIC = b'TPPASS'
+VERSION = 1
+HEADER = struct.Struct('<6sBI')
+RECORD = struct.Struct('<QQQq')
+
+PassRecord = namedtuple('PassRecord', ['id', 'from_pet_id', 'to_pet_id', 'created_at'])
+
+
+def _to_micros(dt):
+    return int(dt.timestamp() * 1_000_000)
+
+
+def _from_micros(value):
+    return datetime.fromtimestamp(value / 1_000_000, tz=dt_timezone.utc)
+
+
+def archive_path(directory, first_id, last_id):
+    return Path(directory) / f'passes-{first_id:012d}-{last_id:012d}.bin.gz'
+
+
+def write_archive(directory, rows):
+    """
+    Write (id, from_pet_id, to_pet_id, created_at) rows to a new archive file.
+    The file is written under a temporary name and renamed into place, so a
+    crash never leaves a truncated archive behind.
+    """
+    rows = sorted(rows)
+    if not rows:
+        return None
+
+    os.makedirs(directory, exist_ok=True)
+    path = archive_path(directory, rows[0][0], rows[-1][0])
+    tmp_path = path.with_suffix('.tmp')
+
+    with open(tmp_path, 'wb') as raw:
+        with gzip.GzipFile(fileobj=raw, mode='wb') as out:
+            out.write(HEADER.pack(MAGIC, VERSION, len(rows)))
+            for pass_id, from_pet_id, to_pet_id, created_at in rows:
+                out.write(RECORD.pack(pass_id, from_pet_id, to_pet_id, _to_micros(created_at)))
+        raw.flush()
+        os.fsync(raw.fileno())
+
+    os.replace(tmp_path, path)
+    return path
+
+
+def read_archive(path):
+    """Yield the PassRecords stored in one archive file"""
+    with gzip.open(path, 'rb') as src:
+        magic, version, count = HEADER.unpack(src.read(HEADER.size))
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f'{path} is not a pass archive')
+
+        for _ in range(count):
+            pass_id, from_pet_id, to_pet_id, created_at = RECORD.unpack(src.read(RECORD.size))
+            yield PassRecord(pass_id, from_pet_id, to_pet_id, _from_micros(created_at))
+
+
+def iter_archives(directory):
+    """Yield every archived pass in id order"""
+    for path in sorted(Path(directory).glob('passes-*.bin.gz')):
+        yield from read_archive(path)
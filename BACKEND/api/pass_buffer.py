@@ -0,0 +1,283 @@
+"""
+Write-behind buffer for passes, the most frequent write.
+
+create_pass validates the pets, appends the pass here and answers right away.
+Each process keeps its pending passes in memory and in a local spool file
+(PASS_SPOOL_DIR/passes-<pid>-<token>.jsonl, a new token every start), and a
+background thread writes them in one bulk insert once PASS_BUFFER_MAX_SIZE
+passes are waiting or the oldest is PASS_BUFFER_MAX_AGE_SECONDS old. If a
+process dies before flushing, the next process to start (or "manage.py
+flush_passes") replays its spool, even when it got the same pid back.
+
+Until they are flushed, pending passes are also kept in the PASS_PENDING_CACHE
+cache, one key per pass, so discover in every worker sharing that cache never
+shows a pet that was just passed. The default file-based cache is shared by
+the workers of one host; several hosts need a network cache such as Redis.
+"""
+import atexit
+import json
+import logging
+import os
+import threading
+import uuid
+from datetime import datetime
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections, transaction
+from django.utils import timezone
+
+from . import seen_filter
+from .models import Pass, Pet
+
+logger = logging.getLogger(__name__)
+
+
+def _cache_key(from_pet_id, to_pet_id):
+    # One key per pass: workers never overwrite each other's entries
+    return f'pass-pending:{from_pet_id}:{to_pet_id}'
+
+
+def pending_cache():
+    return caches[settings.PASS_PENDING_CACHE]
+
+
+def write_passes(entries):
+    """
+    Store (from_pet_id, to_pet_id, created_at) entries: new pairs are bulk
+    inserted and expired passes passed again restart their expiry, as
+    create_pass does one by one. Rows get the time the pass was made, not the
+    time of the flush (or of a spool replay). Pairs whose pet row is gone are
+    dropped.
+    """
+    # Latest entry per pair
+    pairs = {}
+    for from_pet_id, to_pet_id, created_at in entries:
+        pair = (from_pet_id, to_pet_id)
+        if pair not in pairs or created_at > pairs[pair]:
+            pairs[pair] = created_at
+    pet_ids = {pet_id for pair in pairs for pet_id in pair}
+    existing = set(Pet.objects.filter(id__in=pet_ids).values_list('id', flat=True))
+    pairs = {pair: created_at for pair, created_at in pairs.items() if pair[0] in existing and pair[1] in existing}
+    if not pairs:
+        return 0
+
+    from_ids = {from_pet_id for from_pet_id, _ in pairs}
+    to_ids = {to_pet_id for _, to_pet_id in pairs}
+    with transaction.atomic():
+        Pass.objects.bulk_create(
+            [
+                Pass(from_pet_id=from_pet_id, to_pet_id=to_pet_id, created_at=created_at)
+                for (from_pet_id, to_pet_id), created_at in pairs.items()
+            ],
+            ignore_conflicts=True,
+            batch_size=500,
+        )
+        expired = Pass.objects.expired().filter(from_pet_id__in=from_ids, to_pet_id__in=to_ids)
+        restamp = {}
+        for pass_id, from_pet_id, to_pet_id, created_at in expired.values_list('id', 'from_pet_id', 'to_pet_id', 'created_at'):
+            passed_at = pairs.get((from_pet_id, to_pet_id))
+            if passed_at is not None and passed_at > created_at:
+                restamp.setdefault(passed_at, []).append(pass_id)
+        for passed_at, pass_ids in restamp.items():
+            Pass.objects.filter(id__in=pass_ids).update(created_at=passed_at)
+
+    # bulk_create skips the post_save signal that feeds the seen filters
+    seen = {}
+    for from_pet_id, to_pet_id in pairs:
+        seen.setdefault(from_pet_id, []).append(to_pet_id)
+    for from_pet_id, to_pet_ids in seen.items():
+        seen_filter.record_seen(from_pet_id, to_pet_ids)
+
+    # Stored and in the seen filters: no longer pending
+    pending_cache().delete_many([_cache_key(*pair) for pair in pairs])
+    return len(pairs)
+
+
+def read_spool(path):
+    entries = []
+    with open(path, encoding='utf-8') as spool:
+        for line in spool:
+            try:
+                from_pet_id, to_pet_id, created_at = json.loads(line)
+            except ValueError:
+                # A line cut short by a crash mid-write
+                continue
+            entries.append((from_pet_id, to_pet_id, datetime.fromisoformat(created_at)))
+    return entries
+
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def spool_pid(name):
+    """Pid in a spool file name: passes-<pid>-<token>.jsonl (or passes-<pid>.jsonl)"""
+    return int(name[len('passes-'):-len('.jsonl')].split('-')[0])
+
+
+def recover_spools(spool_dir=None, own_spool=None):
+    """
+    Write the passes left in spool files of processes that are gone. Files are
+    renamed before replaying, so two processes never replay the same one.
+    A file with this process's pid but not its own spool name was left by an
+    earlier process that had the same pid (e.g. pid 1 in a restarted
+    container). Returns (files, passes).
+    """
+    spool_dir = spool_dir or settings.PASS_SPOOL_DIR
+    if not os.path.isdir(spool_dir):
+        return 0, 0
+    if own_spool is None and buffer.started():
+        own_spool = os.path.basename(buffer.spool_path)
+
+    files = passes = 0
+    for name in sorted(os.listdir(spool_dir)):
+        if not (name.startswith('passes-') and name.endswith('.jsonl')) or name == own_spool:
+            continue
+        pid = spool_pid(name)
+        if pid != os.getpid() and _process_alive(pid):
+            continue
+
+        path = os.path.join(spool_dir, name)
+        claimed = f'{path}.recovering-{os.getpid()}'
+        try:
+            os.rename(path, claimed)
+        except FileNotFoundError:
+            continue
+        try:
+            passes += write_passes(read_spool(claimed))
+        except Exception:
+            # Leave it under its original name for the next attempt
+            os.rename(claimed, path)
+            raise
+        os.remove(claimed)
+        files += 1
+    return files, passes
+
+
+class PassBuffer:
+    def __init__(self):
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+    def started(self):
+        return self._pid == os.getpid()
+
+    @property
+    def spool_path(self):
+        return self._spool_path
+
+    def _ensure_started(self):
+        """Per-process state, set up on first use (and again after a fork)"""
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid != os.getpid():
+                self._start()
+
+    def _start(self):
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._pending = []
+        self._flushing = []
+        os.makedirs(settings.PASS_SPOOL_DIR, exist_ok=True)
+        spool_name = f'passes-{os.getpid()}-{uuid.uuid4().hex[:12]}.jsonl'
+        self._spool_path = os.path.join(settings.PASS_SPOOL_DIR, spool_name)
+        self._spool = open(self._spool_path, 'a', encoding='utf-8')
+        self._pid = os.getpid()
+
+        try:
+            recover_spools(own_spool=spool_name)
+        except Exception:
+            logger.exception('Could not replay pass spools')
+
+        threading.Thread(target=self._run, name='pass-buffer', daemon=True).start()
+        atexit.register(self.flush)
+
+    def add(self, from_pet_id, to_pet_id):
+        """Queue a pass and return its timestamp; it is written by the next flush"""
+        self._ensure_started()
+
+        created_at = timezone.now()
+        line = json.dumps([from_pet_id, to_pet_id, created_at.isoformat()]) + '\n'
+        with self._lock:
+            self._spool.write(line)
+            self._spool.flush()
+            if settings.PASS_SPOOL_FSYNC:
+                os.fsync(self._spool.fileno())
+            self._pending.append((from_pet_id, to_pet_id, created_at))
+            full = len(self._pending) >= settings.PASS_BUFFER_MAX_SIZE
+
+        pending_cache().set(_cache_key(from_pet_id, to_pet_id), 1, settings.PASS_PENDING_CACHE_SECONDS)
+        if full:
+            self._wake.set()
+        return created_at
+
+    def pending_for(self, pet_id, candidate_ids):
+        """The candidate ids that pet_id passed and that may not be in the database yet"""
+        candidate_ids = set(candidate_ids)
+        if not candidate_ids:
+            return set()
+        keys = {_cache_key(pet_id, candidate_id): candidate_id for candidate_id in candidate_ids}
+        pending = {keys[key] for key in pending_cache().get_many(list(keys))}
+        if self._pid == os.getpid():
+            with self._lock:
+                pending.update(
+                    to_pet_id for from_pet_id, to_pet_id, _ in self._pending + self._flushing
+                    if from_pet_id == pet_id and to_pet_id in candidate_ids
+                )
+        return pending
+
+    def flush(self):
+        """Write every pending pass; returns how many were flushed"""
+        if self._pid != os.getpid():
+            return 0
+
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, []
+                self._flushing = batch
+            if not batch:
+                return 0
+
+            try:
+                write_passes(batch)
+            except Exception:
+                with self._lock:
+                    self._pending = batch + self._pending
+                    self._flushing = []
+                raise
+
+            with self._lock:
+                self._flushing = []
+                # The spool now only needs what arrived during the flush
+                self._spool.close()
+                with open(self._spool_path, 'w', encoding='utf-8') as spool:
+                    spool.writelines(
+                        json.dumps([from_pet_id, to_pet_id, created_at.isoformat()]) + '\n'
+                        for from_pet_id, to_pet_id, created_at in self._pending
+                    )
+                self._spool = open(self._spool_path, 'a', encoding='utf-8')
+            return len(batch)
+
+    def _run(self):
+        while True:
+            self._wake.wait(settings.PASS_BUFFER_MAX_AGE_SECONDS)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Pass flush failed, retrying on the next tick')
+            finally:
+                # This thread's own connection, not the request threads'
+                connections.close_all()
+
+
+buffer = PassBuffer()
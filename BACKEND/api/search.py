@@ -0,0 +1,182 @@
+"""
+Full-text pet search over name, breed and bio.
+
+SQLite keeps an FTS5 virtual table and PostgreSQL a tsvector column with a
+GIN index, both called api_pet_fts and kept in sync with Pet writes by
+api/signals.py. Text is normalized in Python (case, accents, punctuation)
+before it reaches either engine, and queries are always "every term as a
+prefix", so both backends match exactly the same pets. The engines only find
+the matches; relevance is scored here in Python (score_pet) so SQLite and
+PostgreSQL return them in the same order. Ties are broken by pet id.
+"""
+import re
+import unicodedata
+
+from django.conf import settings
+from django.db import connection as default_connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+TABLE = 'api_pet_fts'
+_TOKEN_RE = re.compile(r'\w+')
+MAX_TERMS = 8
+
+# Relevance: name counts more than breed, breed more than bio
+FIELD_WEIGHTS = {'name': 10.0, 'breed': 5.0, 'bio': 1.0}
+# Typical length in tokens of each field, for length normalization
+FIELD_LENGTHS = {'name': 1.0, 'breed': 2.0, 'bio': 30.0}
+K1 = 1.2
+B = 0.75
+
+
+def normalize(text):
+    """Lowercase, accent-free, space separated tokens"""
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return ' '.join(_TOKEN_RE.findall(text.casefold()))
+
+
+def query_terms(query):
+    return normalize(query).split()[:MAX_TERMS]
+
+
+class SQLiteSearchBackend:
+    def install(self, cursor):
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} "
+            f"USING fts5(name, breed, bio, tokenize='unicode61')"
+        )
+
+    def uninstall(self, cursor):
+        cursor.execute(f'DROP TABLE IF EXISTS {TABLE}')
+
+    def index(self, cursor, pet_id, name, breed, bio):
+        cursor.execute(f'DELETE FROM {TABLE} WHERE rowid = %s', [pet_id])
+        cursor.execute(
+            f'INSERT INTO {TABLE} (rowid, name, breed, bio) VALUES (%s, %s, %s, %s)',
+            [pet_id, normalize(name), normalize(breed), normalize(bio)],
+        )
+
+    def remove(self, cursor, pet_id):
+        cursor.execute(f'DELETE FROM {TABLE} WHERE rowid = %s', [pet_id])
+
+    def match_expression(self, terms):
+        return ' AND '.join(f'"{term}"*' for term in terms)
+
+    def matching_ids_sql(self, terms):
+        return f'SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s', [self.match_expression(terms)]
+
+
+class PostgresSearchBackend:
+    document_sql = (
+        "setweight(to_tsvector('simple', %s), 'A') || "
+        "setweight(to_tsvector('simple', %s), 'B') || "
+        "setweight(to_tsvector('simple', %s), 'C')"
+    )
+
+    def install(self, cursor):
+        cursor.execute(
+            f'CREATE TABLE IF NOT EXISTS {TABLE} ('
+            f'pet_id bigint PRIMARY KEY REFERENCES api_pet (id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, '
+            f'document tsvector NOT NULL)'
+        )
+        cursor.execute(f'CREATE INDEX IF NOT EXISTS {TABLE}_document_gin ON {TABLE} USING GIN (document)')
+
+    def uninstall(self, cursor):
+        cursor.execute(f'DROP TABLE IF EXISTS {TABLE}')
+
+    def index(self, cursor, pet_id, name, breed, bio):
+        cursor.execute(
+            f'INSERT INTO {TABLE} (pet_id, document) VALUES (%s, {self.document_sql}) '
+            f'ON CONFLICT (pet_id) DO UPDATE SET document = EXCLUDED.document',
+            [pet_id, normalize(name), normalize(breed), normalize(bio)],
+        )
+
+    def remove(self, cursor, pet_id):
+        cursor.execute(f'DELETE FROM {TABLE} WHERE pet_id = %s', [pet_id])
+
+    def match_expression(self, terms):
+        return ' & '.join(f'{term}:*' for term in terms)
+
+    def matching_ids_sql(self, terms):
+        return (
+            f"SELECT pet_id FROM {TABLE} WHERE document @@ to_tsquery('simple', %s)",
+            [self.match_expression(terms)],
+        )
+
+
+BACKENDS = {
+    'sqlite': SQLiteSearchBackend,
+    'postgresql': PostgresSearchBackend,
+}
+
+
+def get_backend(connection=None):
+    backend_class = BACKENDS.get((connection or default_connection).vendor)
+    return backend_class() if backend_class else None
+
+
+def index_pet(pet, connection=None):
+    connection = connection or default_connection
+    backend = get_backend(connection)
+    if backend:
+        with connection.cursor() as cursor:
+            backend.index(cursor, pet.id, pet.name, pet.breed, pet.bio)
+
+
+def remove_pet(pet_id, connection=None):
+    connection = connection or default_connection
+    backend = get_backend(connection)
+    if backend:
+        with connection.cursor() as cursor:
+            backend.remove(cursor, pet_id)
+
+
+def filter_queryset(queryset, query):
+    """Restrict a Pet queryset to the pets matching `query` (used by the admin)"""
+    terms = query_terms(query)
+    backend = get_backend()
+    if not terms:
+        return queryset
+    if backend is None:
+        # Other databases: slow but equivalent substring match
+        for term in terms:
+            queryset = queryset.filter(
+                Q(name__icontains=term) | Q(breed__icontains=term) | Q(bio__icontains=term)
+            )
+        return queryset
+
+    sql, params = backend.matching_ids_sql(terms)
+    return queryset.filter(id__in=RawSQL(sql, params))
+
+
+def score_pet(terms, name, breed, bio):
+    """BM25-style relevance of one pet; every term is a prefix, as in the index"""
+    score = 0.0
+    for field, text in (('name', name), ('breed', breed), ('bio', bio)):
+        tokens = normalize(text).split()
+        if not tokens:
+            continue
+        norm = K1 * (1 - B + B * len(tokens) / FIELD_LENGTHS[field])
+        for term in terms:
+            tf = sum(1 for token in tokens if token.startswith(term))
+            score += FIELD_WEIGHTS[field] * tf / (tf + norm)
+    return score
+
+
+def search_ids(query, limit, offset=0):
+    """Ids of active pets matching `query`, best first"""
+    from .models import Pet
+
+    terms = query_terms(query)
+    if not terms:
+        return []
+
+    # Ranked over the newest SEARCH_MAX_MATCHES matches, the same set on every engine
+    matches = (
+        filter_queryset(Pet.objects.filter(is_active=True), query)
+        .order_by('-id')
+        .values_list('id', 'name', 'breed', 'bio')[:settings.SEARCH_MAX_MATCHES]
+    )
+    ranked = sorted(matches, key=lambda row: (-score_pet(terms, *row[1:]), row[0]))
+    return [row[0] for row in ranked[offset:offset + limit]]
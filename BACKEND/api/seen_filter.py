@@ -0,0 +1,158 @@
+"""
+Per-pet "already seen" Bloom filters.
+
+Every Like, Pass and Match write adds the other pet to the filter of the pet
+that acted (see api/signals.py). Discover uses the filter to split candidates
+into "definitely unseen" and "maybe seen"; only the second, small group is
+checked exactly against the database, so the exclusion query never grows with
+the number of swipes.
+"""
+import hashlib
+import math
+
+from django.conf import settings
+from django.db import transaction
+
+
+class BloomFilter:
+    def __init__(self, num_bits, num_hashes, bits=None):
+        self.num_bits = num_bits
+        self.num_hashes = num_hashes
+        self.bits = bytearray(bits) if bits is not None else bytearray((num_bits + 7) // 8)
+
+    @classmethod
+    def for_capacity(cls, capacity, error_rate):
+        num_bits = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        num_bits = (num_bits + 7) // 8 * 8
+        num_hashes = max(1, round(num_bits / capacity * math.log(2)))
+        return cls(num_bits, num_hashes)
+
+    def _positions(self, item):
+        # Kirsch-Mitzenmacher double hashing: k positions from two 64-bit hashes
+        digest = hashlib.blake2b(str(item).encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.num_bits for i in range(self.num_hashes))
+
+    def add(self, item):
+        for pos in self._positions(item):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, item):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+    def to_bytes(self):
+        return bytes(self.bits)
+
+
+def exact_seen_ids(pet_id, candidate_ids=None):
+    """
+    Pet ids this pet has liked, passed (and the pass is still active) or
+    matched, optionally restricted to candidate_ids.
+    """
+    from .models import Like, MatchParticipant, Pass
+
+    likes = Like.objects.filter(from_pet_id=pet_id)
+    passes = Pass.objects.active().filter(from_pet_id=pet_id)
+    matched = MatchParticipant.objects.matched_pet_ids(pet_id)
+
+    if candidate_ids is not None:
+        likes = likes.filter(to_pet_id__in=candidate_ids)
+        passes = passes.filter(to_pet_id__in=candidate_ids)
+        matched = matched.filter(other_pet_id__in=candidate_ids)
+
+    seen = likes.values_list('to_pet_id', flat=True).order_by().union(
+        passes.values_list('to_pet_id', flat=True).order_by(),
+        matched.order_by(),
+    )
+    return set(seen)
+
+
+def _all_interacted_ids(pet_id):
+    """Like exact_seen_ids, but counting expired passes too"""
+    from .models import Like, MatchParticipant, Pass
+
+    return set(
+        Like.objects.filter(from_pet_id=pet_id).values_list('to_pet_id', flat=True).order_by().union(
+            Pass.objects.filter(from_pet_id=pet_id).values_list('to_pet_id', flat=True).order_by(),
+            MatchParticipant.objects.matched_pet_ids(pet_id).order_by(),
+        )
+    )
+
+
+def _build(pet_id):
+    ids = _all_interacted_ids(pet_id)
+    capacity = settings.SEEN_FILTER_INITIAL_CAPACITY
+    while capacity < len(ids) * 2:
+        capacity *= 2
+
+    bloom = BloomFilter.for_capacity(capacity, settings.SEEN_FILTER_ERROR_RATE)
+    for item in ids:
+        bloom.add(item)
+    return bloom, capacity, len(ids)
+
+
+def rebuild(pet_id):
+    """Recreate a pet's filter from the database"""
+    from .models import SeenFilter
+
+    bloom, capacity, count = _build(pet_id)
+    SeenFilter.objects.update_or_create(
+        pet_id=pet_id,
+        defaults={
+            'bits': bloom.to_bytes(),
+            'num_hashes': bloom.num_hashes,
+            'capacity': capacity,
+            'item_count': count,
+        },
+    )
+    return bloom
+
+
+def load(pet_id):
+    """Return the pet's BloomFilter, building it on first use"""
+    from .models import SeenFilter
+
+    row = SeenFilter.objects.filter(pet_id=pet_id).first()
+    if row is None:
+        return rebuild(pet_id)
+    return BloomFilter(len(row.bits) * 8, row.num_hashes, row.bits)
+
+
+def record_seen(pet_id, seen_pet_ids):
+    """
+    Add pets to a pet's filter. The row is locked for the read-modify-write so
+    concurrent swipes by the same pet never drop each other's bits.
+    """
+    from .models import SeenFilter
+
+    with transaction.atomic():
+        row = SeenFilter.objects.select_for_update().filter(pet_id=pet_id).first()
+        if row is None:
+            # Nothing to update: load() builds the filter from the database
+            return
+
+        if row.item_count + len(seen_pet_ids) > row.capacity:
+            rebuild(pet_id)
+            return
+
+        bloom = BloomFilter(len(row.bits) * 8, row.num_hashes, row.bits)
+        for seen_pet_id in seen_pet_ids:
+            bloom.add(seen_pet_id)
+        row.bits = bloom.to_bytes()
+        row.item_count += len(seen_pet_ids)
+        row.save(update_fields=['bits', 'item_count', 'updated_at'])
+
+
+def filter_unseen(pet_id, candidate_ids, bloom=None):
+    """
+    Drop the candidates this pet has already seen, keeping the input order.
+    Candidates missing from the filter are definitely unseen; the rest are
+    verified with one exact query.
+    """
+    if bloom is None:
+        bloom = load(pet_id)
+
+    maybe_seen = [c for c in candidate_ids if c in bloom]
+    seen = exact_seen_ids(pet_id, maybe_seen) if maybe_seen else set()
+    return [c for c in candidate_ids if c not in seen]
@@ -1,7 +1,7 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
+from . import image_dedup, message_store
 from .models import Pet, PetImage, Like, Match, Message, Pass
-import cloudinary.uploader
 
 User = get_user_model()
 
@@ -19,11 +19,16 @@ class PetSerializer(serializers.ModelSerializer):
     class Meta:
         model = Pet
         fields = [
-            'id', 'owner', 'owner_email', 'name', 'pet_type', 'breed', 
-            'age', 'gender', 'bio', 'main_image', 
+            'id', 'owner', 'owner_email', 'name', 'pet_type', 'breed', 'canonical_breed',
+            'age', 'gender', 'bio', 'main_image', 'latitude', 'longitude',
             'images', 'is_active', 'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'owner', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'owner', 'canonical_breed', 'created_at', 'updated_at']
+        # Exact coordinates are never shown to other users
+        extra_kwargs = {
+            'latitude': {'write_only': True},
+            'longitude': {'write_only': True},
+        }
 
 class PetCreateSerializer(serializers.ModelSerializer):
     main_image = serializers.URLField(required=False, allow_blank=True)
@@ -37,11 +42,17 @@ class PetCreateSerializer(serializers.ModelSerializer):
         model = Pet
         fields = [
             'name', 'pet_type', 'breed', 'age', 'gender', 
-            'bio', 'main_image', 'additional_images'
+            'bio', 'main_image', 'latitude', 'longitude', 'additional_images'
         ]
+        extra_kwargs = {
+            'latitude': {'write_only': True},
+            'longitude': {'write_only': True},
+        }
     
     def create(self, validated_data):
         additional_images = validated_data.pop('additional_images', [])
+        # Repeated and near-identical photos are stored once
+        additional_images = image_dedup.unique_urls(validated_data['owner'], additional_images)
         
         pet = Pet.objects.create(**validated_data)
         
@@ -67,22 +78,35 @@ class MatchSerializer(serializers.ModelSerializer):
     pet1_details = PetSerializer(source='pet1', read_only=True)
     pet2_details = PetSerializer(source='pet2', read_only=True)
     last_message = serializers.SerializerMethodField()
+    unread_count = serializers.SerializerMethodField()
     
     class Meta:
         model = Match
-        fields = ['id', 'pet1', 'pet2', 'pet1_details', 'pet2_details', 'last_message', 'created_at']
+        fields = ['id', 'pet1', 'pet2', 'pet1_details', 'pet2_details', 'last_message', 'unread_count', 'created_at']
         read_only_fields = ['id', 'created_at']
     
     def get_last_message(self, obj):
-        last_msg = obj.messages.last()
+        # Views listing many matches load them all at once (message_store.last_messages)
+        if 'last_messages' in self.context:
+            last_msg = self.context['last_messages'].get(obj.id)
+        else:
+            last_msg = message_store.last_message(obj)
         if last_msg:
             return {
                 'content': last_msg.content,
-                'sender_pet_id': last_msg.sender_pet.id,
+                'sender_pet_id': last_msg.sender_pet_id,
                 'created_at': last_msg.created_at,
                 'is_read': last_msg.is_read
             }
         return None
+    
+    def get_unread_count(self, obj):
+        """Unread messages for the requesting user's pet in this match"""
+        request = self.context.get('request')
+        if request is None:
+            return None
+        pet_id = obj.pet1_id if obj.pet1.owner_id == request.user.id else obj.pet2_id
+        return obj.unread_count(pet_id)
 
 class MessageSerializer(serializers.ModelSerializer):
     sender_pet_name = serializers.CharField(source='sender_pet.name', read_only=True)
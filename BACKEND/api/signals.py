@@ -0,0 +1,74 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import moderation, search, seen_filter
+from .models import BlockedTerm, Like, Match, MatchParticipant, Pass, Pet, PetImage
+from .taskqueue import enqueue
+
+
+@receiver(post_save, sender=Like)
+@receiver(post_save, sender=Pass)
+def add_swipe_to_seen_filter(sender, instance, created, **kwargs):
+    if created:
+        seen_filter.record_seen(instance.from_pet_id, [instance.to_pet_id])
+
+
+@receiver(post_save, sender=Match)
+def add_match_to_seen_filters(sender, instance, created, **kwargs):
+    if created:
+        seen_filter.record_seen(instance.pet1_id, [instance.pet2_id])
+        seen_filter.record_seen(instance.pet2_id, [instance.pet1_id])
+
+
+@receiver(post_save, sender=Match)
+def add_match_participants(sender, instance, created, **kwargs):
+    if created:
+        MatchParticipant.objects.add_for([instance])
+
+
+@receiver(post_save, sender=Pet)
+def index_pet_for_search(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or {'name', 'breed', 'bio'} & set(update_fields):
+        search.index_pet(instance)
+
+
+@receiver(post_save, sender=Pet)
+def index_pet_for_similarity(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or {'bio', 'breed', 'pet_type', 'deleted_at'} & set(update_fields):
+        # The index is a file shared by every process: the worker rewrites it,
+        # so a save never waits on its lock or on growing it
+        enqueue('api.update_similarity_index', {'pet_id': instance.id})
+
+
+@receiver(post_save, sender=Pet)
+def move_match_participants(sender, instance, created, **kwargs):
+    # Only the admin can hand a pet to another owner
+    loaded_owner_id = getattr(instance, '_loaded_owner_id', None)
+    if not created and loaded_owner_id is not None and loaded_owner_id != instance.owner_id:
+        MatchParticipant.objects.filter(pet=instance).update(owner_id=instance.owner_id)
+        instance._loaded_owner_id = instance.owner_id
+
+
+@receiver(post_save, sender=PetImage)
+@receiver(post_delete, sender=PetImage)
+def touch_pet_for_sync(sender, instance, **kwargs):
+    # Delta sync sends whole pets: an image change is a change of its pet
+    Pet.objects.filter(id=instance.pet_id).update(updated_at=timezone.now())
+
+
+@receiver(post_delete, sender=Pet)
+def remove_pet_from_search(sender, instance, **kwargs):
+    search.remove_pet(instance.id)
+
+
+@receiver(post_delete, sender=Pet)
+def remove_pet_from_similarity(sender, instance, **kwargs):
+    enqueue('api.update_similarity_index', {'pet_id': instance.id})
+
+
+@receiver(post_save, sender=BlockedTerm)
+@receiver(post_delete, sender=BlockedTerm)
+def reload_blocklist(sender, **kwargs):
+    # This process at once; other workers within MODERATION_RELOAD_SECONDS
+    moderation.blocklist.invalidate()
@@ -0,0 +1,231 @@
+"""
+"More like this" over pet bios, breeds and types.
+
+Every pet that is not deleted is a hashed TF-IDF vector: the tokens of its
+bio, its breed and its type are hashed into SIMILARITY_DIMENSIONS buckets,
+weighted by inverse document frequency and L2-normalized. The vectors are
+stored as the columns of a float16 buckets x pets matrix in
+SIMILARITY_INDEX_DIR, indexed by pet id and memory-mapped by every process.
+A top-k cosine query only reads the contiguous rows of the buckets its own
+terms hash to, whatever the number of pets.
+
+Pet saves rewrite their row in place once committed (api/signals.py) and
+keep the document frequencies current; rows keep the IDF they were written
+with until "manage.py rebuild_similarity_index" recomputes them all.
+Soft-deleted pets keep their row until the purge job deletes them, so
+callers filter results against the database (see discover.similar).
+"""
+import fcntl
+import math
+import os
+import zlib
+from collections import Counter
+from contextlib import contextmanager
+
+import numpy as np
+from django.conf import settings
+
+from .models import Pet
+from .search import normalize
+
+# Term frequency multipliers per field: a shared breed says more than a shared word
+FIELD_WEIGHTS = {'bio': 1.0, 'breed': 2.0, 'type': 1.0}
+VECTORS = 'vectors.npy'
+DOC_FREQ = 'doc_freq.npy'  # Pets per bucket, then the number of pets in the last slot
+SCORE_CHUNK_ROWS = 65536
+
+
+def terms(bio, breed, pet_type):
+    """{token: weighted, sublinear term frequency} for a pet's text"""
+    weights = {}
+    for field, tokens in (
+        ('bio', normalize(bio).split()),
+        ('breed', [f'breed:{token}' for token in normalize(breed).split()] + [f'breed={normalize(breed)}']),
+        ('type', [f'type:{pet_type}']),
+    ):
+        for token, count in Counter(tokens).items():
+            weights[token] = FIELD_WEIGHTS[field] * (1 + math.log(count))
+    return weights
+
+
+def hashed(weights, dims):
+    """{bucket: weight} for the tokens of terms()"""
+    buckets = {}
+    for token, weight in weights.items():
+        bucket = zlib.crc32(token.encode('utf-8')) % dims
+        buckets[bucket] = buckets.get(bucket, 0.0) + weight
+    return buckets
+
+
+def vectorize(buckets, doc_freq):
+    """L2-normalized TF-IDF vector for hashed terms, with smoothed IDF"""
+    dims = len(doc_freq) - 1
+    vector = np.zeros(dims, dtype=np.float32)
+    if not buckets:
+        return vector
+    columns = np.fromiter(buckets, dtype=np.int64, count=len(buckets))
+    vector[columns] = np.fromiter(buckets.values(), dtype=np.float32, count=len(buckets))
+    vector[columns] *= np.log((1 + doc_freq[-1]) / (1 + doc_freq[columns])) + 1
+    vector /= np.linalg.norm(vector)
+    return vector
+
+
+class SimilarityIndex:
+    def __init__(self, path=None):
+        self.path = path or settings.SIMILARITY_INDEX_DIR
+        self._opened = None
+        self._vectors = None
+        self._doc_freq = None
+
+    def _file(self, name):
+        return os.path.join(self.path, name)
+
+    def exists(self):
+        return os.path.exists(self._file(VECTORS))
+
+    @contextmanager
+    def _locked(self):
+        """Serialize writers across processes"""
+        os.makedirs(self.path, exist_ok=True)
+        with open(self._file('.lock'), 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _open(self):
+        """The mapped files, mapped again when another process grew or rebuilt them"""
+        stat = os.stat(self._file(VECTORS))
+        if self._opened != (stat.st_ino, stat.st_size):
+            self._vectors = np.load(self._file(VECTORS), mmap_mode='r+')
+            self._doc_freq = np.load(self._file(DOC_FREQ), mmap_mode='r+')
+            self._opened = (stat.st_ino, stat.st_size)
+        return self._vectors, self._doc_freq
+
+    def _write(self, vectors_source, doc_freq, pets):
+        """Replace both files: doc_freq, then a dims x pets matrix filled by vectors_source(matrix)"""
+        np.save(self._file(DOC_FREQ) + '.tmp.npy', doc_freq)
+        os.replace(self._file(DOC_FREQ) + '.tmp.npy', self._file(DOC_FREQ))
+
+        tmp = self._file(VECTORS) + '.tmp.npy'
+        matrix = np.lib.format.open_memmap(tmp, mode='w+', dtype=np.float16, shape=(len(doc_freq) - 1, pets))
+        vectors_source(matrix)
+        matrix.flush()
+        del matrix
+        os.replace(tmp, self._file(VECTORS))
+        self._opened = None
+
+    def _grow(self, pets):
+        vectors, doc_freq = self._open()
+        size = vectors.shape[1]
+
+        def copy(matrix):
+            for start in range(0, size, SCORE_CHUNK_ROWS):
+                end = min(start + SCORE_CHUNK_ROWS, size)
+                matrix[:, start:end] = vectors[:, start:end]
+
+        self._write(copy, np.array(doc_freq), max(pets, 2 * size))
+
+    def update(self, pets):
+        """
+        Rewrite the rows of `pets`; deleted pets get an empty row. Without an
+        index nothing is written: the first query builds it from the database.
+        """
+        pets = list(pets)
+        if not pets or not self.exists():
+            return
+        with self._locked():
+            needed = max(pet.id for pet in pets) + 1
+            if needed > self._open()[0].shape[1]:
+                self._grow(needed)
+            vectors, doc_freq = self._open()
+
+            for pet in pets:
+                self._clear(vectors, doc_freq, pet.id)
+                if pet.deleted_at is None:
+                    buckets = hashed(terms(pet.bio, pet.breed, pet.pet_type), vectors.shape[0])
+                    doc_freq[list(buckets)] += 1
+                    doc_freq[-1] += 1
+                    vectors[:, pet.id] = vectorize(buckets, doc_freq)
+            # No msync: the shared mapping is already what other processes read,
+            # and the kernel writes it back even if this process dies
+
+    def remove(self, pet_ids):
+        if not self.exists():
+            return
+        with self._locked():
+            vectors, doc_freq = self._open()
+            for pet_id in pet_ids:
+                if pet_id < vectors.shape[1]:
+                    self._clear(vectors, doc_freq, pet_id)
+
+    def _clear(self, vectors, doc_freq, pet_id):
+        old = np.flatnonzero(vectors[:, pet_id])
+        if len(old):
+            doc_freq[old] -= 1
+            doc_freq[-1] -= 1
+            vectors[:, pet_id] = 0
+
+    def rebuild(self, rows, dims=None):
+        """
+        Recreate the index from (pet id, bio, breed, pet type) rows with the IDF
+        of the whole catalog. Returns the number of pets indexed.
+        """
+        dims = dims or settings.SIMILARITY_DIMENSIONS
+        doc_freq = np.zeros(dims + 1, dtype=np.int64)
+        documents = []
+        for pet_id, bio, breed, pet_type in rows:
+            buckets = hashed(terms(bio, breed, pet_type), dims)
+            doc_freq[list(buckets)] += 1
+            documents.append((pet_id, buckets))
+        doc_freq[-1] = len(documents)
+
+        def fill(matrix):
+            # A block of pets at a time in memory, then one contiguous write per bucket row
+            documents.sort(key=lambda document: document[0])
+            position = 0
+            for start in range(0, matrix.shape[1], SCORE_CHUNK_ROWS):
+                end = min(start + SCORE_CHUNK_ROWS, matrix.shape[1])
+                block = np.zeros((dims, end - start), dtype=np.float16)
+                while position < len(documents) and documents[position][0] < end:
+                    pet_id, buckets = documents[position]
+                    block[:, pet_id - start] = vectorize(buckets, doc_freq)
+                    position += 1
+                matrix[:, start:end] = block
+
+        size = max((pet_id for pet_id, _ in documents), default=0) + 1
+        with self._locked():
+            self._write(fill, doc_freq, max(size, 1024))
+        return len(documents)
+
+    def nearest(self, bio, breed, pet_type, count, exclude_id=None):
+        """Ids of the `count` pets most similar to this text, best first"""
+        vectors, doc_freq = self._open()
+        query = vectorize(hashed(terms(bio, breed, pet_type), vectors.shape[0]), doc_freq)
+        buckets = np.flatnonzero(query)
+        weights = query[buckets]
+
+        size = vectors.shape[1]
+        scores = np.empty(size, dtype=np.float32)
+        for start in range(0, size, SCORE_CHUNK_ROWS):
+            end = min(start + SCORE_CHUNK_ROWS, size)
+            scores[start:end] = weights @ vectors[buckets, start:end].astype(np.float32)
+        if exclude_id is not None and exclude_id < len(scores):
+            scores[exclude_id] = 0
+
+        count = min(count, int(np.count_nonzero(scores > 0)))
+        if count == 0:
+            return []
+        top = np.argpartition(-scores, count - 1)[:count]
+        # Best score first, ties by pet id
+        return top[np.lexsort((top, -scores[top]))].tolist()
+
+
+index = SimilarityIndex()
+
+
+def rebuild_index():
+    """Index every pet that is not deleted; returns how many"""
+    rows = Pet.objects.alive().values_list('id', 'bio', 'breed', 'pet_type').iterator(chunk_size=2000)
+    return index.rebuild(rows)
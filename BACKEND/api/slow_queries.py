@@ -0,0 +1,166 @@
+"""
+Slow query log: an execute wrapper that records every query slower than
+SLOW_QUERY_THRESHOLD_MS together with its SQL fingerprint, the calling view
+and an EXPLAIN plan captured on the spot.
+"""
+import hashlib
+import logging
+import re
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections, transaction
+
+logger = logging.getLogger(__name__)
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST_RE = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_sql(sql):
+    """Strip literals and collapse IN lists so equivalent queries compare equal"""
+    sql = sql.replace('%s', '?')
+    sql = _STRING_RE.sub('?', sql)
+    sql = _NUMBER_RE.sub('?', sql)
+    sql = _IN_LIST_RE.sub('IN (...)', sql)
+    return _WHITESPACE_RE.sub(' ', sql).strip()
+
+
+def fingerprint_sql(normalized_sql):
+    return hashlib.sha1(normalized_sql.encode('utf-8')).hexdigest()[:16]
+
+
+class SlowQueryRecorder:
+    """
+    Execute wrapper (see connection.execute_wrapper) collecting slow queries.
+    Entries are kept in memory and written by flush() once the request is done,
+    so logging never runs inside the view's own transaction.
+    """
+    def __init__(self, threshold_ms, view=''):
+        self.threshold_ms = threshold_ms
+        self.view = view
+        self.entries = []
+        self._explaining = False
+
+    def __call__(self, execute, sql, params, many, context):
+        if self._explaining:
+            return execute(sql, params, many, context)
+
+        start = time.perf_counter()
+        result = execute(sql, params, many, context)
+        duration_ms = (time.perf_counter() - start) * 1000
+
+        if duration_ms >= self.threshold_ms:
+            self._record(sql, params, many, context['connection'], duration_ms)
+        return result
+
+    def _record(self, sql, params, many, connection, duration_ms):
+        normalized = normalize_sql(sql)
+        explain = '' if many else self._explain(connection, sql, params)
+        self.entries.append({
+            'fingerprint': fingerprint_sql(normalized),
+            'normalized_sql': normalized,
+            'sql': sql,
+            'view': self.view,
+            'duration_ms': duration_ms,
+            'explain': explain,
+        })
+        logger.warning(
+            'Slow query (%.1f ms) in %s: %s', duration_ms, self.view or '-', normalized
+        )
+
+    def _explain(self, connection, sql, params):
+        if not sql.lstrip().upper().startswith('SELECT'):
+            return ''
+
+        self._explaining = True
+        try:
+            # The savepoint keeps a failing EXPLAIN from poisoning the
+            # surrounding transaction on PostgreSQL.
+            with transaction.atomic(using=connection.alias):
+                with connection.cursor() as cursor:
+                    cursor.execute(f'{connection.ops.explain_query_prefix()} {sql}', params)
+                    rows = cursor.fetchall()
+        except Exception as e:
+            return f'EXPLAIN failed: {e}'
+        finally:
+            self._explaining = False
+
+        return '\n'.join(str(row[-1]) for row in rows)
+
+    def flush(self):
+        if not self.entries:
+            return
+
+        from .models import SlowQueryLog
+        SlowQueryLog.objects.bulk_create(SlowQueryLog(**entry) for entry in self.entries)
+        self.entries = []
+
+
+class SlowQueryMiddleware:
+    """
+    Wrap every database connection with a SlowQueryRecorder per request.
+
+    Under ASGI the ORM runs in the request's sync_to_async thread, so the
+    wrappers are installed and removed from that same thread.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = settings.SLOW_QUERY_LOG_ENABLED
+        self.threshold_ms = settings.SLOW_QUERY_THRESHOLD_MS
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.enabled:
+            return self.get_response(request)
+
+        recorder, stack = self._install(request)
+        with stack:
+            response = self.get_response(request)
+        self._flush(recorder)
+        return response
+
+    async def __acall__(self, request):
+        if not self.enabled:
+            return await self.get_response(request)
+
+        recorder, stack = await sync_to_async(self._install)(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+        await sync_to_async(self._flush)(recorder)
+        return response
+
+    def _install(self, request):
+        recorder = SlowQueryRecorder(self.threshold_ms)
+        request.slow_query_recorder = recorder
+
+        stack = ExitStack()
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(recorder))
+        return recorder, stack
+
+    def _flush(self, recorder):
+        try:
+            recorder.flush()
+        except Exception:
+            logger.exception('Could not store slow query log entries')
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        recorder = getattr(request, 'slow_query_recorder', None)
+        if recorder is not None:
+            view_class = getattr(view_func, 'cls', None)
+            name = view_class.__name__ if view_class else view_func.__name__
+            recorder.view = f'{view_func.__module__}.{name}'
+        return None
@@ -0,0 +1,84 @@
+"""
+Delta sync of the pets a user can see: their own and the pets they matched.
+
+The client keeps an opaque cursor made of the last (Pet.updated_at, id) it
+received and the last SyncTombstone id. Each call returns the visible pets
+changed after it (with their images: PetImage changes bump the parent pet's
+updated_at) and the ids of visible pets deleted since, instead of the whole
+/pets/ and /matches/ payloads. New matches still arrive through /matches/.
+"""
+import base64
+import binascii
+import json
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+from .models import MatchParticipant, Pet, SyncTombstone
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def visible_pets(user):
+    matched = MatchParticipant.objects.filter(owner=user).values('other_pet_id')
+    return Pet.objects.alive().filter(Q(owner=user) | Q(id__in=matched))
+
+
+def record_tombstones(pet_ids):
+    """Tell the owner and every matched owner of these pets that they are gone"""
+    pet_ids = list(pet_ids)
+    audience = set(Pet.objects.filter(id__in=pet_ids).values_list('id', 'owner_id'))
+    audience |= set(MatchParticipant.objects.filter(other_pet_id__in=pet_ids).values_list('other_pet_id', 'owner_id'))
+    SyncTombstone.objects.bulk_create(SyncTombstone(pet_id=pet_id, user_id=user_id) for pet_id, user_id in audience)
+
+
+def encode_cursor(updated_at, pet_id, tombstone_id):
+    data = json.dumps([updated_at.isoformat() if updated_at else None, pet_id, tombstone_id])
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """(updated_at, pet id, tombstone id) from a cursor, all None for a full sync"""
+    if not cursor:
+        return None, None, None
+    try:
+        updated_at, pet_id, tombstone_id = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        updated_at = parse_datetime(updated_at) if updated_at else None
+        pet_id = int(pet_id) if pet_id is not None else None
+        tombstone_id = int(tombstone_id)
+    except (binascii.Error, ValueError, TypeError):
+        raise InvalidCursor(cursor)
+    return updated_at, pet_id, tombstone_id
+
+
+def changes(user, cursor=None, limit=100):
+    """
+    (changed pets, deleted pet ids, next cursor, has_more). Without a cursor
+    every visible pet is returned and earlier tombstones are skipped.
+    """
+    updated_at, pet_id, tombstone_id = decode_cursor(cursor)
+
+    pets = visible_pets(user).select_related('owner').prefetch_related('images').order_by('updated_at', 'id')
+    if updated_at is not None:
+        pets = pets.filter(Q(updated_at__gt=updated_at) | Q(updated_at=updated_at, id__gt=pet_id))
+    pets = list(pets[:limit + 1])
+
+    tombstones = SyncTombstone.objects.filter(user=user).order_by('id')
+    if tombstone_id is None:
+        # A full sync already reflects every deletion so far
+        newest = tombstones.values_list('id', flat=True).last()
+        deleted, tombstone_id = [], newest or 0
+    else:
+        deleted = list(tombstones.filter(id__gt=tombstone_id).values_list('id', 'pet_id')[:limit + 1])
+
+    has_more = len(pets) > limit or len(deleted) > limit
+    pets, deleted = pets[:limit], deleted[:limit]
+    if pets:
+        updated_at, pet_id = pets[-1].updated_at, pets[-1].id
+    if deleted:
+        tombstone_id = deleted[-1][0]
+
+    next_cursor = encode_cursor(updated_at, pet_id, tombstone_id)
+    return pets, sorted({deleted_pet_id for _, deleted_pet_id in deleted}), next_cursor, has_more
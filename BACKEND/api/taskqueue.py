@@ -0,0 +1,207 @@
+"""
+Database-backed task queue.
+
+Handlers are registered with the @task decorator (see api/tasks.py) and always
+receive a list of payloads: tasks with the same name are claimed together in
+batches of up to `batch_size`. Views enqueue work with enqueue() and the
+`run_tasks` management command executes it in a thread or process pool.
+"""
+import logging
+import os
+import socket
+import traceback
+import uuid
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class TaskDefinition:
+    name: str
+    func: callable
+    batch_size: int = 1
+    max_attempts: int = 5
+    backoff_seconds: float = 30
+
+
+_registry = {}
+
+
+def task(name, batch_size=1, max_attempts=5, backoff_seconds=30):
+    """Register a handler that receives a list of payloads"""
+    def decorator(func):
+        _registry[name] = TaskDefinition(name, func, batch_size, max_attempts, backoff_seconds)
+        return func
+    return decorator
+
+
+def get_task(name):
+    return _registry.get(name)
+
+
+def autodiscover():
+    """Import the `tasks` module of every installed app so handlers register"""
+    autodiscover_modules('tasks')
+
+
+def enqueue(name, payload=None, priority=0, delay=None, max_attempts=None):
+    """
+    Queue a task. The row is written in the caller's transaction, so the task
+    only becomes visible to workers if the surrounding work commits.
+    """
+    from .models import Task
+
+    definition = get_task(name)
+    if max_attempts is None:
+        max_attempts = definition.max_attempts if definition else 5
+
+    run_at = timezone.now()
+    if delay:
+        run_at += timedelta(seconds=delay)
+
+    return Task.objects.create(
+        name=name,
+        payload=payload or {},
+        priority=priority,
+        run_at=run_at,
+        max_attempts=max_attempts,
+    )
+
+
+def backoff_delay(definition, attempts):
+    """Exponential backoff: base, 2x base, 4x base..."""
+    base = definition.backoff_seconds if definition else 30
+    return base * (2 ** max(attempts - 1, 0))
+
+
+def new_worker_id():
+    return f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+
+
+def release_stale_locks():
+    """Return tasks whose worker died mid-run to the pending state"""
+    from .models import Task
+
+    cutoff = timezone.now() - timedelta(seconds=settings.TASK_LOCK_TIMEOUT_SECONDS)
+    return Task.objects.filter(
+        status=Task.STATUS_RUNNING,
+        locked_at__lt=cutoff,
+    ).update(status=Task.STATUS_PENDING, locked_by='', locked_at=None)
+
+
+def claim_batch(worker_id, names=None):
+    """
+    Claim the highest priority runnable task plus up to batch_size - 1 other
+    pending tasks with the same name. Claiming is a conditional UPDATE, so two
+    workers racing for the same rows never both win them.
+    """
+    from .models import Task
+
+    now = timezone.now()
+    runnable = Task.objects.filter(status=Task.STATUS_PENDING, run_at__lte=now)
+    if names:
+        runnable = runnable.filter(name__in=names)
+
+    head = runnable.order_by('-priority', 'run_at', 'id').values('name').first()
+    if head is None:
+        return []
+
+    definition = get_task(head['name'])
+    batch_size = definition.batch_size if definition else 1
+
+    with transaction.atomic():
+        candidate_ids = list(
+            runnable.filter(name=head['name'])
+            .order_by('-priority', 'run_at', 'id')
+            .select_for_update(skip_locked=True)
+            .values_list('id', flat=True)[:batch_size]
+        )
+        Task.objects.filter(
+            id__in=candidate_ids,
+            status=Task.STATUS_PENDING,
+        ).update(status=Task.STATUS_RUNNING, locked_by=worker_id, locked_at=now)
+
+    return list(
+        Task.objects.filter(
+            id__in=candidate_ids,
+            status=Task.STATUS_RUNNING,
+            locked_by=worker_id,
+        ).values_list('id', flat=True)
+    )
+
+
+def execute_batch(task_ids):
+    """
+    Run a claimed batch and record the outcome. Module level so it can be
+    shipped to a process pool.
+    """
+    from .models import Task
+
+    close_old_connections()
+    try:
+        tasks = list(Task.objects.filter(id__in=task_ids).order_by('id'))
+        if not tasks:
+            return 0
+
+        name = tasks[0].name
+        definition = get_task(name)
+        try:
+            if definition is None:
+                raise LookupError(f'No handler registered for task {name!r}')
+            definition.func([t.payload for t in tasks])
+        except Exception:
+            error = traceback.format_exc()
+            logger.exception('Task batch %s failed', name)
+            _record_failure(tasks, definition, error)
+            return 0
+
+        Task.objects.filter(id__in=[t.id for t in tasks]).update(
+            status=Task.STATUS_DONE,
+            attempts=F('attempts') + 1,
+            locked_by='',
+            locked_at=None,
+            last_error='',
+            updated_at=timezone.now(),
+        )
+        return len(tasks)
+    finally:
+        close_old_connections()
+
+
+def _record_failure(tasks, definition, error):
+    now = timezone.now()
+    for t in tasks:
+        t.attempts += 1
+        t.last_error = error
+        t.locked_by = ''
+        t.locked_at = None
+        t.updated_at = now
+        if t.attempts >= t.max_attempts:
+            t.status = t.STATUS_FAILED
+        else:
+            t.status = t.STATUS_PENDING
+            t.run_at = now + timedelta(seconds=backoff_delay(definition, t.attempts))
+    type(tasks[0]).objects.bulk_update(
+        tasks, ['attempts', 'last_error', 'locked_by', 'locked_at', 'status', 'run_at', 'updated_at']
+    )
+
+
+def init_worker_process():
+    """Process pool initializer: every child needs its own Django setup"""
+    import django
+    from django.apps import apps
+    from django.db import connections
+
+    if not apps.ready:
+        django.setup()
+    # Never reuse connections inherited from the parent on fork
+    connections.close_all()
+    autodiscover()
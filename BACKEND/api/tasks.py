@@ -0,0 +1,48 @@
+"""
+Background task handlers. Every handler receives a list of payloads.
+"""
+import re
+
+from .taskqueue import task
+
+CLOUDINARY_URL_RE = re.compile(
+    r'^https?://res\.cloudinary\.com/[^/]+/image/upload/(?:v\d+/)?(?P<public_id>.+?)(?:\.\w+)?$'
+)
+
+
+def cloudinary_public_id(url):
+    """Extract the public_id from a Cloudinary delivery URL, None for other hosts"""
+    match = CLOUDINARY_URL_RE.match(url or '')
+    return match.group('public_id') if match else None
+
+
+@task('api.delete_cloudinary_images', batch_size=100)
+def delete_cloudinary_images(payloads):
+    """Remove images of deleted pets from Cloudinary (max 100 ids per API call)"""
+    from .cloudinary_client import admin_api
+
+    public_ids = sorted({p['public_id'] for p in payloads})
+    if public_ids:
+        admin_api().delete_resources(public_ids, resource_type='image')
+
+
+@task('api.update_similarity_index', batch_size=200)
+def update_similarity_index(payloads):
+    """Rewrite the similarity columns of saved pets and empty those of deleted ones"""
+    from .models import Pet
+    from .similarity import index
+
+    pet_ids = {p['pet_id'] for p in payloads}
+    pets = list(Pet.objects.filter(id__in=pet_ids).only('id', 'bio', 'breed', 'pet_type', 'deleted_at'))
+    index.update(pets)
+    index.remove(sorted(pet_ids - {pet.id for pet in pets}))
+
+
+@task('api.purge_deleted', max_attempts=10)
+def purge_deleted(payloads):
+    """Advance DeletionJobs a bounded number of batches; unfinished ones are queued again"""
+    from .deletion import queue_job, run_job
+
+    for payload in payloads:
+        if not run_job(payload['job_id']):
+            queue_job(payload['job_id'])
@@ -1,10 +1,15 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
-    PetViewSet, discover_pets, create_like, create_pass,
-    list_matches, list_messages, create_message, mark_messages_read
+    PetViewSet, discover_pets, similar_pets, search_pets, create_like, create_pass,
+    list_matches, match_detail, list_messages, create_message, mark_messages_read, export_data, sync_pets
 )
 
+if settings.ASYNC_VIEWS:
+    # Read-heavy endpoints served by async views under ASGI
+    from .async_views import discover_pets, list_matches, list_messages  # noqa: F811
+
 router = DefaultRouter()
 router.register(r'pets', PetViewSet, basename='pet')
 
@@ -12,21 +17,33 @@ app_name = 'api'
 
 urlpatterns = [
     
+    # Similar pets (before the router, which owns pets/<pk>/)
+    path('pets/<int:pet_id>/similar/', similar_pets, name='similar-pets'),
+    
     # Router URLs (pets)
     path('', include(router.urls)),
     
     # Discover
     path('discover/', discover_pets, name='discover'),
     
+    # Search
+    path('search/', search_pets, name='search'),
+    
     # Likes and Passes
     path('likes/', create_like, name='create-like'),
     path('passes/', create_pass, name='create-pass'),
     
     # Matches
     path('matches/', list_matches, name='list-matches'),
+    path('matches/<int:match_id>/', match_detail, name='match-detail'),
     
     # Messages
     path('matches/<int:match_id>/messages/', list_messages, name='list-messages'),
     path('matches/<int:match_id>/messages/create/', create_message, name='create-message'),
     path('matches/<int:match_id>/messages/read/', mark_messages_read, name='mark-messages-read'),
+    
+    # Delta sync of own and matched pets
+    path('sync/', sync_pets, name='sync-pets'),
+    # Data export
+    path('export/', export_data, name='export-data'),
 ]
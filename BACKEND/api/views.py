@@ -2,18 +2,25 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db.models import Q
+from django.http import StreamingHttpResponse
+from django.utils import timezone
 from django_ratelimit.decorators import ratelimit
 from django.utils.decorators import method_decorator
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
-import cloudinary.uploader
-from .models import Pet, PetImage, Like, Match, Message, Pass
+from .models import BlockedTerm, Pet, PetImage, Like, Match, Message, Pass
 from .serializers import (
     PetSerializer, PetCreateSerializer, LikeSerializer, 
     MatchSerializer, MessageSerializer, PassSerializer
 )
+from .pagination import MatchCursorPagination, PetCursorPagination
 from .permissions import IsOwnerOrReadOnly, IsPetOwner
+from . import cloudinary_client, image_dedup, message_store, moderation, pass_buffer, sync
+from .discover import discover, load_pets, similar
+from .export import aiterate, batched, gzipped, ndjson_lines
+from .search import search_ids
+from .deletion import schedule_pet_deletion
 
 User = get_user_model()
 
@@ -21,6 +28,7 @@ User = get_user_model()
 class PetViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated, IsPetOwner]
     parser_classes = (JSONParser, MultiPartParser, FormParser)
+    pagination_class = PetCursorPagination
     
     def get_serializer_class(self):
         if self.action == 'create':
@@ -29,7 +37,7 @@ class PetViewSet(viewsets.ModelViewSet):
     
     def get_queryset(self):
         # Users can only see their own pets
-        return Pet.objects.filter(owner=self.request.user)
+        return Pet.objects.alive().filter(owner=self.request.user).select_related('owner').prefetch_related('images')
     
     @method_decorator(ratelimit(key='user', rate='50/h', method='POST'))
     def create(self, request, *args, **kwargs):
@@ -40,20 +48,26 @@ class PetViewSet(viewsets.ModelViewSet):
         # Return full pet details
         pet = serializer.instance
         response_serializer = PetCreateSerializer(pet)
-        print("Created pet:", response_serializer.data)  # Debugging line
         return Response(response_serializer.data, status=status.HTTP_201_CREATED)
     
     @method_decorator(ratelimit(key='user', rate='100/h', method='PUT'))
     def update(self, request, *args, **kwargs):
         return super().update(request, *args, **kwargs)
     
+    def perform_destroy(self, instance):
+        # Hidden at once; likes, matches, messages and images (Cloudinary too) are purged in the background
+        schedule_pet_deletion(instance)
+    
     @action(detail=True, methods=['post'])
     def set_active(self, request, pk=None):
         """Set this pet as the active profile"""
         pet = self.get_object()
         
-        # Deactivate all other pets for this user
-        Pet.objects.filter(owner=request.user).update(is_active=False)
+        # Deactivate all other pets for this user (bulk updates skip auto_now:
+        # updated_at is what delta sync reads)
+        Pet.objects.filter(owner=request.user, is_active=True).exclude(pk=pet.pk).update(
+            is_active=False, updated_at=timezone.now()
+        )
         
         # Activate this pet
         pet.is_active = True
@@ -83,17 +97,30 @@ class PetViewSet(viewsets.ModelViewSet):
         
         image_file = request.FILES['image']
         
+        # The same photo (or a resized / recompressed copy) reuses the stored asset
+        fingerprint = image_dedup.dhash(image_file)
+        if fingerprint is not None:
+            duplicate = image_dedup.find_duplicate(request.user, fingerprint)
+            if duplicate is not None:
+                return Response({
+                    'url': duplicate.url,
+                    'public_id': duplicate.public_id,
+                    'duplicate': True
+                }, status=status.HTTP_200_OK)
+        
         try:
             # Upload to Cloudinary
-            upload_result = cloudinary.uploader.upload(
+            upload_result = cloudinary_client.uploader().upload(
                 image_file,
                 folder='tinderpet',
                 resource_type='image'
             )
-            print("Upload result:", upload_result['url'])  # Debugging line
+            if fingerprint is not None:
+                image_dedup.remember(request.user, fingerprint, upload_result['secure_url'], upload_result['public_id'])
             return Response({
                 'url': upload_result['secure_url'],
-                'public_id': upload_result['public_id']
+                'public_id': upload_result['public_id'],
+                'duplicate': False
             }, status=status.HTTP_200_OK)
         except Exception as e:
             return Response(
@@ -119,39 +146,88 @@ def discover_pets(request):
         )
     
     try:
-        current_pet = Pet.objects.get(id=pet_id, owner=request.user)
+        current_pet = Pet.objects.alive().get(id=pet_id, owner=request.user)
     except Pet.DoesNotExist:
         return Response(
             {'error': 'Pet not found or you do not own this pet'}, 
             status=status.HTTP_404_NOT_FOUND
         )
     
-    # Get IDs of pets already interacted with
-    liked_ids = Like.objects.filter(from_pet=current_pet).values_list('to_pet_id', flat=True)
-    passed_ids = Pass.objects.filter(from_pet=current_pet).values_list('to_pet_id', flat=True)
-    
-    # Get matched pet IDs
-    matched_ids = []
-    matches = Match.objects.filter(Q(pet1=current_pet) | Q(pet2=current_pet))
-    for match in matches:
-        matched_ids.append(match.pet1.id if match.pet2 == current_pet else match.pet2.id)
-    
-    # Exclude own pets, same breed only, and already interacted pets
-    excluded_ids = list(liked_ids) + list(passed_ids) + matched_ids + [current_pet.id]
-    
-    pets = Pet.objects.filter(
-        breed=current_pet.breed,  # Same breed only
-        pet_type=current_pet.pet_type,  # Same pet type
-        is_active=True
-    ).exclude(
-        id__in=excluded_ids
-    ).exclude(
-        owner=request.user  # Exclude own pets
-    ).order_by('?')[:20]  # Random order, limit 20
+    # Liked, passed and matched pets are dropped using the pet's seen filter
+    pets = discover(current_pet, request.user)
+    
+    serializer = PetSerializer(pets, many=True)
+    return Response(serializer.data)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@ratelimit(key='user', rate='300/h', method='GET')
+def similar_pets(request, pet_id):
+    """
+    Pets most like pet_id by bio, breed and type ("more like this")
+    ?pet_id=<your pet> drops what discover would drop for it: own, liked, passed and matched pets
+    """
+    current_pet_id = request.query_params.get('pet_id')
+    
+    if not current_pet_id:
+        return Response(
+            {'error': 'pet_id is required'}, 
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    try:
+        current_pet = Pet.objects.alive().get(id=current_pet_id, owner=request.user)
+    except (Pet.DoesNotExist, ValueError):
+        return Response(
+            {'error': 'Pet not found or you do not own this pet'}, 
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    try:
+        pet = Pet.objects.alive().get(id=pet_id)
+    except Pet.DoesNotExist:
+        return Response(
+            {'error': 'Pet not found'}, 
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    pets = similar(current_pet, request.user, pet)
     
     serializer = PetSerializer(pets, many=True)
     return Response(serializer.data)
 
+# Search View
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@ratelimit(key='user', rate='300/h', method='GET')
+def search_pets(request):
+    """
+    Full-text search over pet name, breed and bio
+    Results are ranked by relevance and paginated with ?page=N
+    """
+    query = request.query_params.get('q', '').strip()
+    if not query:
+        return Response(
+            {'error': 'q is required'}, 
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    try:
+        page = max(int(request.query_params.get('page', 1)), 1)
+    except ValueError:
+        page = 1
+    page_size = settings.SEARCH_PAGE_SIZE
+    
+    # One extra id tells whether there is a next page without a COUNT(*)
+    pet_ids = search_ids(query, page_size + 1, (page - 1) * page_size)
+    pets = load_pets(pet_ids[:page_size])
+    
+    return Response({
+        'page': page,
+        'has_next': len(pet_ids) > page_size,
+        'results': PetSerializer(pets, many=True).data,
+    })
+
 # Like Views
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
@@ -170,8 +246,8 @@ def create_like(request):
         )
     
     try:
-        from_pet = Pet.objects.get(id=from_pet_id, owner=request.user)
-        to_pet = Pet.objects.get(id=to_pet_id)
+        from_pet = Pet.objects.alive().get(id=from_pet_id, owner=request.user)
+        to_pet = Pet.objects.alive().get(id=to_pet_id)
     except Pet.DoesNotExist:
         return Response(
             {'error': 'Pet not found'}, 
@@ -203,7 +279,7 @@ def create_like(request):
     response_data = serializer.data
     
     if match_obj:
-        response_data['match'] = MatchSerializer(match_obj).data
+        response_data['match'] = MatchSerializer(match_obj, context={'request': request}).data
     
     return Response(response_data, status=status.HTTP_201_CREATED)
 
@@ -224,9 +300,12 @@ def create_pass(request):
             status=status.HTTP_400_BAD_REQUEST
         )
     
+    if settings.PASS_WRITE_BEHIND:
+        return buffer_pass(request, from_pet_id, to_pet_id)
+    
     try:
-        from_pet = Pet.objects.get(id=from_pet_id, owner=request.user)
-        to_pet = Pet.objects.get(id=to_pet_id)
+        from_pet = Pet.objects.alive().get(id=from_pet_id, owner=request.user)
+        to_pet = Pet.objects.alive().get(id=to_pet_id)
     except Pet.DoesNotExist:
         return Response(
             {'error': 'Pet not found'}, 
@@ -236,34 +315,123 @@ def create_pass(request):
     # Create pass if it doesn't exist
     pass_obj, created = Pass.objects.get_or_create(from_pet=from_pet, to_pet=to_pet)
     
+    # Passing again on an expired (not yet purged) pass restarts its expiry
+    if not created and pass_obj.is_expired():
+        pass_obj.created_at = timezone.now()
+        pass_obj.save(update_fields=['created_at'])
+    
     serializer = PassSerializer(pass_obj)
     return Response(serializer.data, status=status.HTTP_201_CREATED)
 
+def buffer_pass(request, from_pet_id, to_pet_id):
+    """Validate both pets in one query and queue the pass (see api/pass_buffer.py)"""
+    try:
+        from_pet_id, to_pet_id = int(from_pet_id), int(to_pet_id)
+    except (TypeError, ValueError):
+        return Response(
+            {'error': 'Pet not found'}, 
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    owners = dict(Pet.objects.alive().filter(id__in=[from_pet_id, to_pet_id]).values_list('id', 'owner_id'))
+    if owners.get(from_pet_id) != request.user.id or to_pet_id not in owners:
+        return Response(
+            {'error': 'Pet not found'}, 
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    created_at = pass_buffer.buffer.add(from_pet_id, to_pet_id)
+    return Response(
+        {'from_pet': from_pet_id, 'to_pet': to_pet_id, 'created_at': created_at, 'status': 'queued'},
+        status=status.HTTP_202_ACCEPTED
+    )
+
 # Match Views
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def list_matches(request):
     """
-    List all matches for the user's pets
+    List the matches of the user's pets a page at a time, newest first
+    (?page_size=N, then ?cursor=<next_cursor>)
+    """
+    paginator = MatchCursorPagination()
+    page = paginator.paginate_queryset(user_matches(request.user), request)
+    return paginator.get_paginated_response(serialize_matches(page, request))
+
+def serialize_matches(matches, request):
+    """MatchSerializer data with every last message loaded in two queries"""
+    matches = list(matches)
+    context = {'request': request, 'last_messages': message_store.last_messages(matches)}
+    return MatchSerializer(matches, many=True, context=context).data
+
+def user_matches(user):
+    """Matches of the user's pets with the pets, owners and images MatchSerializer reads"""
+    return (
+        Match.objects.alive().for_owner(user)
+        .with_unread_counts()
+        .select_related('pet1__owner', 'pet2__owner')
+        .prefetch_related('pet1__images', 'pet2__images')
+    )
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def match_detail(request, match_id):
+    """
+    Everything the chat screen needs in one call: the match with both pets,
+    the caller's pet, its unread count and the newest page of messages
+    ?limit=N sets the page size; older messages come from list_messages with ?before=
     """
-    user_pets = Pet.objects.filter(owner=request.user)
+    try:
+        match = (
+            Match.objects.alive().with_unread_counts()
+            .select_related('pet1__owner', 'pet2__owner')
+            .prefetch_related('pet1__images', 'pet2__images')
+            .get(id=match_id)
+        )
+    except Match.DoesNotExist:
+        return Response(
+            {'error': 'Match not found'}, 
+            status=status.HTTP_404_NOT_FOUND
+        )
     
-    matches = Match.objects.filter(
-        Q(pet1__in=user_pets) | Q(pet2__in=user_pets)
-    ).distinct()
+    if request.user.id not in (match.pet1.owner_id, match.pet2.owner_id):
+        return Response(
+            {'error': 'You do not have permission to view this match'}, 
+            status=status.HTTP_403_FORBIDDEN
+        )
     
-    serializer = MatchSerializer(matches, many=True)
-    return Response(serializer.data)
+    try:
+        _, _, limit = message_page_params(request)
+    except ValueError:
+        return Response(
+            {'error': 'limit must be a positive integer'}, 
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    limit = limit or settings.CHAT_BOOTSTRAP_MESSAGES
+    
+    # One extra message tells whether older ones exist
+    messages = message_store.page(match, limit=limit + 1)
+    has_more = len(messages) > limit
+    messages = messages[-limit:]
+    
+    context = {'request': request, 'last_messages': {match.id: messages[-1]} if messages else {}}
+    data = MatchSerializer(match, context=context).data
+    data['my_pet_id'] = match.pet1_id if match.pet1.owner_id == request.user.id else match.pet2_id
+    data['messages'] = MessageSerializer(messages, many=True).data
+    data['has_more_messages'] = has_more
+    return Response(data)
 
 # Message Views
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def list_messages(request, match_id):
     """
-    List all messages for a match
+    List the messages of a match, oldest first
+    ?limit=N returns only the N newest; ?before=<message id> pages further back
+    and ?after=<message id> returns only newer messages (for polling)
     """
     try:
-        match = Match.objects.get(id=match_id)
+        match = Match.objects.alive().select_related('pet1', 'pet2').get(id=match_id)
     except Match.DoesNotExist:
         return Response(
             {'error': 'Match not found'}, 
@@ -277,10 +445,31 @@ def list_messages(request, match_id):
             status=status.HTTP_403_FORBIDDEN
         )
     
-    messages = match.messages.all()
+    try:
+        before, after, limit = message_page_params(request)
+    except ValueError:
+        return Response(
+            {'error': 'before, after and limit must be positive integers'}, 
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    # Hot rows and archived chunks, merged by message id
+    messages = message_store.page(match, before=before, limit=limit, after=after)
     serializer = MessageSerializer(messages, many=True)
     return Response(serializer.data)
 
+def message_page_params(request):
+    """(before, after, limit) from the query string, None when absent"""
+    before = request.query_params.get('before')
+    after = request.query_params.get('after')
+    limit = request.query_params.get('limit')
+    before = int(before) if before else None
+    after = int(after) if after else None
+    limit = min(int(limit), settings.MESSAGE_PAGE_MAX) if limit else None
+    if any(value is not None and value < 1 for value in (before, after, limit)):
+        raise ValueError('before, after and limit must be positive')
+    return before, after, limit
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 @ratelimit(key='user', rate='500/h', method='POST')
@@ -289,7 +478,7 @@ def create_message(request, match_id):
     Send a message in a match
     """
     try:
-        match = Match.objects.get(id=match_id)
+        match = Match.objects.alive().get(id=match_id)
     except Match.DoesNotExist:
         return Response(
             {'error': 'Match not found'}, 
@@ -306,7 +495,7 @@ def create_message(request, match_id):
         )
     
     try:
-        sender_pet = Pet.objects.get(id=sender_pet_id, owner=request.user)
+        sender_pet = Pet.objects.alive().get(id=sender_pet_id, owner=request.user)
     except Pet.DoesNotExist:
         return Response(
             {'error': 'Pet not found or you do not own this pet'}, 
@@ -320,10 +509,19 @@ def create_message(request, match_id):
             status=status.HTTP_403_FORBIDDEN
         )
     
+    # Blocklist moderation: one pass of a precompiled automaton over the text
+    action, _ = moderation.check(content)
+    if action == BlockedTerm.ACTION_REJECT:
+        return Response(
+            {'error': 'Message contains blocked content'}, 
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
     message = Message.objects.create(
         match=match,
         sender_pet=sender_pet,
-        content=content
+        content=content,
+        flagged=action == BlockedTerm.ACTION_FLAG
     )
     
     serializer = MessageSerializer(message)
@@ -336,7 +534,7 @@ def mark_messages_read(request, match_id):
     Mark all messages in a match as read for the current user
     """
     try:
-        match = Match.objects.get(id=match_id)
+        match = Match.objects.alive().get(id=match_id)
     except Match.DoesNotExist:
         return Response(
             {'error': 'Match not found'}, 
@@ -346,13 +544,60 @@ def mark_messages_read(request, match_id):
     # Get the user's pet in this match
     user_pet = match.pet1 if match.pet1.owner == request.user else match.pet2
     
-    # Mark all messages from the other pet as read
-    other_pet = match.pet2 if user_pet == match.pet1 else match.pet1
-    
-    Message.objects.filter(
-        match=match,
-        sender_pet=other_pet,
-        is_read=False
-    ).update(is_read=True)
+    # Everything up to the newest message is read: one UPDATE on the match row
+    match.mark_read(user_pet.id)
     
     return Response({'status': 'Messages marked as read'})
+
+# Sync View
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def sync_pets(request):
+    """
+    Own and matched pets changed or deleted since ?cursor=<cursor from the last call>
+    Without a cursor every visible pet is returned; repeat while has_more is true
+    """
+    try:
+        limit = min(int(request.query_params.get('limit', settings.SYNC_PAGE_SIZE)), settings.SYNC_PAGE_MAX)
+        if limit < 1:
+            raise ValueError(limit)
+        pets, deleted_pet_ids, cursor, has_more = sync.changes(
+            request.user, request.query_params.get('cursor'), limit
+        )
+    except ValueError:
+        # sync.InvalidCursor included
+        return Response(
+            {'error': 'Invalid cursor or limit'}, 
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    return Response({
+        'pets': PetSerializer(pets, many=True).data,
+        'deleted_pet_ids': deleted_pet_ids,
+        'cursor': cursor,
+        'has_more': has_more,
+    })
+
+# Export View
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@ratelimit(key='user', rate='5/h', method='GET')
+def export_data(request):
+    """
+    Stream everything stored about the current user as NDJSON
+    ?gzip=1 returns it gzip compressed
+    """
+    compress = request.query_params.get('gzip') in ('1', 'true')
+    parts = batched(ndjson_lines(request.user))
+    filename = f'tinderpet-export-{request.user.id}.ndjson'
+    if compress:
+        parts = gzipped(parts)
+        filename += '.gz'
+    
+    # Under ASGI a sync iterator would be read into memory before sending
+    response = StreamingHttpResponse(
+        aiterate(parts) if settings.ASYNC_VIEWS else parts,
+        content_type='application/gzip' if compress else 'application/x-ndjson'
+    )
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
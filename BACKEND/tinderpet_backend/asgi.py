@@ -2,4 +2,6 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'tinderpet_backend.settings')
+# Serve the read-heavy endpoints with their async views (see api/async_views.py)
+os.environ.setdefault('ASYNC_VIEWS', 'True')
 application = get_asgi_application()
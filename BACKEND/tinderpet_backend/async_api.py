@@ -0,0 +1,51 @@
+"""
+Async DRF views for the ASGI deployment (see asgi.py and ASYNC_VIEWS).
+
+DRF 3.14 only dispatches synchronously. AsyncAPIView keeps DRF's own
+authentication, permissions and throttling (APIView.initial) plus the
+django-ratelimit buckets, runs them in a single sync_to_async hop and then
+awaits an async handler, so a request waiting on the database no longer holds
+a worker thread.
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django_ratelimit.core import is_ratelimited
+from django_ratelimit.exceptions import Ratelimited
+from rest_framework.views import APIView
+
+
+class AsyncAPIView(APIView):
+    # Same arguments as django_ratelimit's @ratelimit. Use the sync view's
+    # dotted path as `group` so both deployments share the same buckets.
+    ratelimit = None
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+
+            if asyncio.iscoroutinefunction(handler):
+                response = await handler(request, *args, **kwargs)
+            else:
+                response = await sync_to_async(handler)(request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if self.ratelimit and is_ratelimited(request, increment=True, **self.ratelimit):
+            raise Ratelimited()
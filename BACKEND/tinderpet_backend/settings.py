@@ -1,15 +1,12 @@
-import os
 from pathlib import Path
 from datetime import timedelta
 from decouple import config
-from dotenv import load_dotenv
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
-load_dotenv(os.path.join(BASE_DIR, '.env'))
-
-SECRET_KEY = os.getenv('SECRET_KEY')
-DEBUG = os.getenv('DEBUG', 'False') == 'True'
+# decouple reads the environment first, then BACKEND/.env
+SECRET_KEY = config('SECRET_KEY', default=None)
+DEBUG = config('DEBUG', default=False, cast=bool)
 
 ALLOWED_HOSTS = ['localhost', '127.0.0.1', '*']
 
@@ -23,8 +20,7 @@ INSTALLED_APPS = [
     'rest_framework',
     'rest_framework_simplejwt',
     'corsheaders',
-    'cloudinary_storage',
-    'cloudinary',
+    # cloudinary / cloudinary_storage are not apps here: the SDK is loaded lazily (api/cloudinary_client.py)
     'users',
     'api',
 ]
@@ -32,12 +28,15 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'corsheaders.middleware.CorsMiddleware',
+    'api.coalescing.RequestCoalescingMiddleware',
+    'api.load_shedding.AdaptiveConcurrencyMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'api.slow_queries.SlowQueryMiddleware',
 ]
 
 ROOT_URLCONF = 'tinderpet_backend.urls'
@@ -67,6 +66,19 @@ DATABASES = {
     }
 }
 
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Must be shared by every worker: pending passes (api/pass_buffer.py). The
+    # file-based default covers the workers of one host; with several hosts use
+    # e.g. PASS_CACHE_BACKEND=django.core.cache.backends.redis.RedisCache
+    'passes': {
+        'BACKEND': config('PASS_CACHE_BACKEND', default='django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': config('PASS_CACHE_LOCATION', default=str(BASE_DIR / 'cache' / 'passes')),
+    },
+}
+
 AUTH_USER_MODEL = 'users.User'
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -91,6 +103,9 @@ CORS_ALLOWED_ORIGINS = [
 ]
 CORS_ALLOW_CREDENTIALS = True
 
+# Turns off both django-ratelimit and DRF throttling, for load tests only
+RATELIMIT_ENABLE = config('RATELIMIT_ENABLE', default=True, cast=bool)
+
 # REST Framework Settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
@@ -102,11 +117,14 @@ REST_FRAMEWORK = {
     'DEFAULT_THROTTLE_CLASSES': [
         'rest_framework.throttling.AnonRateThrottle',
         'rest_framework.throttling.UserRateThrottle'
-    ],
+    ] if RATELIMIT_ENABLE else [],
     'DEFAULT_THROTTLE_RATES': {
         'anon': '100/hour',
         'user': '1000/hour'
-    }
+    },
+    # List endpoints are keyset-paginated (api/pagination.py)
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.KeysetCursorPagination',
+    'PAGE_SIZE': 20,
 }
 
 # JWT Settings
@@ -126,5 +144,121 @@ CLOUDINARY_STORAGE = {
     'API_KEY': config('CLOUDINARY_API_KEY', default=''),
     'API_SECRET': config('CLOUDINARY_API_SECRET', default=''),
 }
+# No DEFAULT_FILE_STORAGE: no model has a FileField, and images go through
+# api/cloudinary_client.py so the SDK is only imported on first upload
+
+# Slow query log
+SLOW_QUERY_LOG_ENABLED = config('SLOW_QUERY_LOG_ENABLED', default=True, cast=bool)
+SLOW_QUERY_THRESHOLD_MS = config('SLOW_QUERY_THRESHOLD_MS', default=200, cast=float)
+
+# Background task queue
+TASK_WORKER_CONCURRENCY = config('TASK_WORKER_CONCURRENCY', default=4, cast=int)
+TASK_POLL_INTERVAL_SECONDS = config('TASK_POLL_INTERVAL_SECONDS', default=1.0, cast=float)
+TASK_LOCK_TIMEOUT_SECONDS = config('TASK_LOCK_TIMEOUT_SECONDS', default=600, cast=int)
+
+# Pass retention: passed pets show up in discover again after this many days (0 = never)
+PASS_EXPIRY_DAYS = config('PASS_EXPIRY_DAYS', default=90, cast=int)
+PASS_ARCHIVE_DIR = config('PASS_ARCHIVE_DIR', default=str(BASE_DIR / 'archive' / 'passes'))
+
+# Write-behind passes (api/pass_buffer.py): acknowledged at once, written in bulk.
+# Pending passes are shared through the PASS_PENDING_CACHE cache, see CACHES.
+PASS_WRITE_BEHIND = config('PASS_WRITE_BEHIND', default=True, cast=bool)
+PASS_BUFFER_MAX_SIZE = config('PASS_BUFFER_MAX_SIZE', default=500, cast=int)
+PASS_BUFFER_MAX_AGE_SECONDS = config('PASS_BUFFER_MAX_AGE_SECONDS', default=2.0, cast=float)
+PASS_SPOOL_DIR = config('PASS_SPOOL_DIR', default=str(BASE_DIR / 'spool' / 'passes'))
+PASS_SPOOL_FSYNC = config('PASS_SPOOL_FSYNC', default=False, cast=bool)  # Survive power loss, not just crashes
+PASS_PENDING_CACHE = 'passes'
+PASS_PENDING_CACHE_SECONDS = 300
+
+# Discover
+DISCOVER_PAGE_SIZE = 20
+DISCOVER_CHUNK_SIZE = 200  # Candidates checked per seen-filter round trip
+SEEN_FILTER_INITIAL_CAPACITY = 1024
+SEEN_FILTER_ERROR_RATE = 0.01
+DISCOVER_CANDIDATE_POOL = 200  # Unseen pets scored per request
+DISCOVER_RECENCY_HALF_LIFE_DAYS = 7
+DISCOVER_RANKERS = {
+    'weighted': 'api.ranking.WeightedRanker',
+    'random': 'api.ranking.RandomRanker',
+}
+DISCOVER_RANKER = 'weighted'
+# Geohash length of Pet.geo_cell (5 ~ 4.9 km cells) and how far discover expands
+GEO_CELL_PRECISION = 5
+DISCOVER_MAX_RINGS = 8
+DISCOVER_PROXIMITY_SCALE_KM = 10
+# A/B split between rankers, e.g. {'weighted': 90, 'random': 10}
+DISCOVER_RANKER_EXPERIMENT = {}
+
+# Search
+SEARCH_PAGE_SIZE = 20
+# Matches ranked per query (newest first); older ones beyond this are not returned
+SEARCH_MAX_MATCHES = 1000
+
+# "More like this" (api/similarity.py): hashed TF-IDF vectors memory-mapped from disk
+SIMILARITY_INDEX_DIR = config('SIMILARITY_INDEX_DIR', default=str(BASE_DIR / 'index' / 'similarity'))
+SIMILARITY_DIMENSIONS = 512  # Hash buckets per vector; changing it needs rebuild_similarity_index
+SIMILAR_PETS_PAGE_SIZE = 20
+SIMILAR_PETS_OVERFETCH = 5  # Nearest ids read per result, before discover's exclusions
+SIMILAR_PETS_MAX_SCAN = 5000  # Stop widening the search past this many ids
+
+# Upload deduplication (api/image_dedup.py): a new photo within this many bits
+# (of 64) of one the user already stored reuses it. At most 3: lookups find
+# candidates through four exact 16-bit bands
+IMAGE_DEDUP_MAX_DISTANCE = 3
+
+# Breed catalog: minimum trigram similarity to treat a spelling as a known breed
+BREED_MATCH_THRESHOLD = 0.6
+BREED_MATCH_MAX_EDITS = 2  # Fuzzy breed matches must also be this close in spelling (see api/breeds.py)
+
+# Admin: unfiltered changelists of tables at least this big show an estimated count
+ADMIN_ESTIMATED_COUNT_THRESHOLD = config('ADMIN_ESTIMATED_COUNT_THRESHOLD', default=100000, cast=int)
+
+# Async views for discover, matches, messages and /me (on by default under asgi.py)
+ASYNC_VIEWS = config('ASYNC_VIEWS', default=False, cast=bool)
+
+# Identical concurrent GETs of the same user share one response (api/coalescing.py)
+COALESCE_REQUESTS = config('COALESCE_REQUESTS', default=True, cast=bool)
+COALESCE_PATHS = [r'^/api/matches/$', r'^/api/pets/$', r'^/api/matches/\d+/$', r'^/api/matches/\d+/messages/$']
+COALESCE_WAIT_SECONDS = 10  # Followers run the view themselves if the first request takes longer
+
+# Adaptive concurrency limits per endpoint class (api/load_shedding.py). Critical
+# classes are never shed; when they get slow the other classes' limits shrink.
+LOAD_SHEDDING_ENABLED = config('LOAD_SHEDDING_ENABLED', default=True, cast=bool)
+LOAD_SHEDDING_CLASSES = [
+    {'name': 'auth', 'path': r'^/api/auth/(login|register|token)/', 'target_ms': 1000, 'critical': True},
+    {'name': 'chat', 'path': r'^/api/matches/\d+/', 'target_ms': 500, 'critical': True},
+    # A rejected like can lose a match: swipes are never shed
+    {'name': 'swipes', 'path': r'^/api/(likes|passes)/$', 'target_ms': 300, 'critical': True},
+    {'name': 'discover', 'path': r'^/api/(discover/|search/|pets/\d+/similar/)$', 'target_ms': 800},
+    {'name': 'uploads', 'path': r'^/api/pets/upload_image/$', 'target_ms': 5000},
+]
+LOAD_SHEDDING_INITIAL_LIMIT = 20  # Concurrent requests per class and process
+LOAD_SHEDDING_MIN_LIMIT = 1
+LOAD_SHEDDING_MAX_LIMIT = 200
+LOAD_SHEDDING_DECREASE = 0.7  # Multiplier applied to a limit on a slow response
+
+# Message history: read messages older than this move to compressed cold chunks (archive_messages)
+MESSAGE_ARCHIVE_AFTER_DAYS = config('MESSAGE_ARCHIVE_AFTER_DAYS', default=180, cast=int)
+MESSAGE_CHUNK_SIZE = 500
+MESSAGE_PAGE_MAX = 200  # Largest ?limit= accepted by list_messages
+CHAT_BOOTSTRAP_MESSAGES = 50  # Newest messages returned by GET /api/matches/<id>/
+
+# Chat moderation against BlockedTerm (api/moderation.py): seconds between each
+# worker's checks for blocklist changes
+MODERATION_ENABLED = config('MODERATION_ENABLED', default=True, cast=bool)
+MODERATION_RELOAD_SECONDS = 5
+
+# Delta sync (GET /api/sync/): pets and tombstones per page
+SYNC_PAGE_SIZE = 100
+SYNC_PAGE_MAX = 500
+
+# Data export: rows fetched per database round trip while streaming
+EXPORT_CHUNK_SIZE = 2000
+
+# Deferred deletion of pets and accounts (api/deletion.py)
+DELETION_BATCH_SIZE = config('DELETION_BATCH_SIZE', default=500, cast=int)
+DELETION_BATCHES_PER_TASK = 50
+DELETION_BATCH_PAUSE_SECONDS = 0.05
 
-DEFAULT_FILE_STORAGE = 'cloudinary_storage.storage.MediaCloudinaryStorage'
\ No newline at end of file
+# Cold start budget checked by "profile_imports --budget-ms" (WSGI app + URLconf import)
+STARTUP_BUDGET_MS = config('STARTUP_BUDGET_MS', default=1500, cast=int)
@@ -1,12 +1,14 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.contrib.auth import get_user_model
+from api.deletion import schedule_user_deletion
+from tinderpet_backend.admin_performance import DeferredDeleteMixin, PerformanceModelAdmin
 
 User = get_user_model()
 
 
 @admin.register(User)
-class UserAdmin(BaseUserAdmin):
+class UserAdmin(DeferredDeleteMixin, PerformanceModelAdmin, BaseUserAdmin):
     """Custom admin for User model"""
     list_display = ['email', 'username', 'is_staff', 'is_active', 'created_at']
     list_filter = ['is_staff', 'is_active', 'created_at']
@@ -21,6 +23,9 @@ class UserAdmin(BaseUserAdmin):
     
     readonly_fields = ['created_at', 'updated_at', 'last_login', 'date_joined']
     
+    def schedule_delete(self, obj):
+        schedule_user_deletion(obj)
+    
     add_fieldsets = (
         (None, {
             'classes': ('wide',),
@@ -0,0 +1,24 @@
+from asgiref.sync import sync_to_async
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from api.deletion import schedule_user_deletion
+from tinderpet_backend.async_api import AsyncAPIView
+from .serializers import UserSerializer
+
+
+class CurrentUserView(AsyncAPIView):
+    """Async current_user, used when ASYNC_VIEWS is on"""
+    permission_classes = [IsAuthenticated]
+
+    async def get(self, request):
+        # The user was loaded by JWT authentication, nothing else to query
+        return Response(UserSerializer(request.user).data)
+
+    async def delete(self, request):
+        job = await sync_to_async(schedule_user_deletion)(request.user)
+        return Response({'status': 'Account scheduled for deletion', 'job_id': job.id}, status=status.HTTP_202_ACCEPTED)
+
+
+current_user = CurrentUserView.as_view()
@@ -1,6 +1,10 @@
+from django.conf import settings
 from django.urls import path
 from .views import RegisterView, LoginView, RefreshTokenView, current_user
 
+if settings.ASYNC_VIEWS:
+    from .async_views import current_user  # noqa: F811
+
 app_name = 'users'
 
 urlpatterns = [
@@ -5,6 +5,7 @@ from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from django.utils.decorators import method_decorator
 from django_ratelimit.decorators import ratelimit
+from api.deletion import schedule_user_deletion
 from .serializers import UserSerializer, RegisterSerializer
 
 
@@ -38,9 +39,14 @@ class RefreshTokenView(TokenRefreshView):
     permission_classes = [AllowAny]
 
 
-@api_view(['GET'])
+@api_view(['GET', 'DELETE'])
 @permission_classes([IsAuthenticated])
 def current_user(request):
-    """Get current authenticated user details"""
+    """Get current authenticated user details, or delete the account"""
+    if request.method == 'DELETE':
+        # The account is disabled now; its data is removed by a background job
+        job = schedule_user_deletion(request.user)
+        return Response({'status': 'Account scheduled for deletion', 'job_id': job.id}, status=status.HTTP_202_ACCEPTED)
+    
     serializer = UserSerializer(request.user)
     return Response(serializer.data)
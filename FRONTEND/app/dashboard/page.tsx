@@ -3,7 +3,7 @@
 import { useEffect, useState } from "react"
 import { useAuth } from "@/lib/auth-context"
 import { useRouter } from "next/navigation"
-import { api } from "@/lib/api"
+import { api, fetchAllPages } from "@/lib/api"
 import { Button } from "@/components/ui/button"
 import { Card, CardContent, CardDescription, CardHeader, CardTitle } from "@/components/ui/card"
 import { Badge } from "@/components/ui/badge"
@@ -43,9 +43,7 @@ export default function DashboardPage() {
 
   const fetchPets = async () => {
     try {
-      const response = await api.get("/pets/")
-      console.log("Fetched pets:", response.data) // Debugging line
-      setPets(response.data)
+      setPets(await fetchAllPages<Pet>("/pets/"))
     } catch (error) {
       console.error("Error fetching pets:", error)
     } finally {
@@ -89,7 +89,6 @@ export default function NewPetPage() {
           },
         })
         mainImageUrl = uploadResponse.data.url
-        console.log("Image uploaded to:", mainImageUrl) // Debugging line
         setUploadingImage(false)
       }
       
@@ -3,7 +3,7 @@
 import { useEffect, useState } from "react"
 import { useAuth } from "@/lib/auth-context"
 import { useRouter } from "next/navigation"
-import { api } from "@/lib/api"
+import { api, fetchAllPages } from "@/lib/api"
 import { Button } from "@/components/ui/button"
 import { Card, CardContent } from "@/components/ui/card"
 import { Badge } from "@/components/ui/badge"
@@ -60,8 +60,7 @@ export default function DiscoverPage() {
 
   const fetchActivePet = async () => {
     try {
-      const response = await api.get("/pets/")
-      const userPets = response.data
+      const userPets = await fetchAllPages<Pet>("/pets/")
       const active = userPets.find((p: Pet) => p.is_active)
 
       if (!active) {
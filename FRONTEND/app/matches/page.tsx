@@ -3,7 +3,7 @@
 import { useEffect, useState } from "react"
 import { useAuth } from "@/lib/auth-context"
 import { useRouter } from "next/navigation"
-import { api } from "@/lib/api"
+import { fetchAllPages, fetchPage } from "@/lib/api"
 import { Button } from "@/components/ui/button"
 import { Card, CardContent, CardHeader, CardTitle } from "@/components/ui/card"
 import { Badge } from "@/components/ui/badge"
@@ -40,6 +40,8 @@ export default function MatchesPage() {
   const [matches, setMatches] = useState<Match[]>([])
   const [loading, setLoading] = useState(true)
   const [userPets, setUserPets] = useState<Pet[]>([])
+  const [nextCursor, setNextCursor] = useState<string | null>(null)
+  const [loadingMore, setLoadingMore] = useState(false)
 
   useEffect(() => {
     if (!authLoading && !user) {
@@ -55,10 +57,11 @@ export default function MatchesPage() {
 
   const fetchData = async () => {
     try {
-      const [matchesRes, petsRes] = await Promise.all([api.get("/matches/"), api.get("/pets/")])
+      const [matchesPage, pets] = await Promise.all([fetchPage<Match>("/matches/"), fetchAllPages<Pet>("/pets/")])
 
-      setMatches(matchesRes.data)
-      setUserPets(petsRes.data)
+      setMatches(matchesPage.results)
+      setNextCursor(matchesPage.next_cursor)
+      setUserPets(pets)
     } catch (error) {
       console.error("Error fetching data:", error)
     } finally {
@@ -66,6 +69,20 @@ export default function MatchesPage() {
     }
   }
 
+  const loadMore = async () => {
+    if (!nextCursor) return
+    setLoadingMore(true)
+    try {
+      const page = await fetchPage<Match>("/matches/", nextCursor)
+      setMatches((prev) => [...prev, ...page.results.filter((m) => !prev.some((p) => p.id === m.id))])
+      setNextCursor(page.next_cursor)
+    } catch (error) {
+      console.error("Error fetching matches:", error)
+    } finally {
+      setLoadingMore(false)
+    }
+  }
+
   const getOtherPet = (match: Match): Pet => {
     const userPetIds = userPets.map((p) => p.id)
     return userPetIds.includes(match.pet1.id) ? match.pet2 : match.pet1
@@ -166,6 +183,14 @@ export default function MatchesPage() {
             })}
           </div>
         )}
+
+        {nextCursor && (
+          <div className="mt-6 flex justify-center">
+            <Button variant="outline" onClick={loadMore} disabled={loadingMore}>
+              {loadingMore ? <Spinner className="h-4 w-4" /> : "Cargar más"}
+            </Button>
+          </div>
+        )}
       </main>
     </div>
   )
@@ -34,8 +34,12 @@ interface Pet {
 
 interface Match {
   id: number
-  pet1: Pet
-  pet2: Pet
+  pet1: number
+  pet2: number
+  pet1_details: Pet
+  pet2_details: Pet
+  my_pet_id: number
+  unread_count: number
   created_at: string
 }
 
@@ -58,10 +62,14 @@ export default function ChatPage() {
   const [loading, setLoading] = useState(true)
   const [sending, setSending] = useState(false)
   const [newMessage, setNewMessage] = useState("")
-  const [userPets, setUserPets] = useState<Pet[]>([])
   const [myPet, setMyPet] = useState<Pet | null>(null)
   const [otherPet, setOtherPet] = useState<Pet | null>(null)
+  const [hasMoreMessages, setHasMoreMessages] = useState(false)
+  const [loadingOlder, setLoadingOlder] = useState(false)
   const messagesEndRef = useRef<HTMLDivElement>(null)
+  // Read by the polling interval, which would otherwise see the messages of its first render
+  const messagesRef = useRef<Message[]>([])
+  const lastScrolledIdRef = useRef<number | null>(null)
 
   useEffect(() => {
     if (!authLoading && !user) {
@@ -76,7 +84,13 @@ export default function ChatPage() {
   }, [user, params.matchId])
 
   useEffect(() => {
-    scrollToBottom()
+    messagesRef.current = messages
+    // Only scroll when a newer message arrives, not when older ones are prepended
+    const lastId = messages.length ? messages[messages.length - 1].id : null
+    if (lastId !== lastScrolledIdRef.current) {
+      lastScrolledIdRef.current = lastId
+      scrollToBottom()
+    }
   }, [messages])
 
   // Poll for new messages every 3 seconds
@@ -96,11 +110,21 @@ export default function ChatPage() {
 
   const fetchData = async () => {
     try {
-      const [matchesRes, petsRes] = await Promise.all([api.get("/matches/"), api.get("/pets/")])
+      // Match, both pets and the newest messages in one request
+      const { data } = await api.get(`/matches/${params.matchId}/`)
+      const { messages: recentMessages, has_more_messages, ...currentMatch } = data
 
-      const currentMatch = matchesRes.data.find((m: Match) => m.id === Number(params.matchId))
+      setMatch(currentMatch)
+      setMyPet(currentMatch.my_pet_id === currentMatch.pet1 ? currentMatch.pet1_details : currentMatch.pet2_details)
+      setOtherPet(currentMatch.my_pet_id === currentMatch.pet1 ? currentMatch.pet2_details : currentMatch.pet1_details)
+      setMessages(recentMessages)
+      setHasMoreMessages(has_more_messages)
 
-      if (!currentMatch) {
+      if (currentMatch.unread_count > 0) {
+        await api.patch(`/matches/${params.matchId}/messages/read/`)
+      }
+    } catch (error: any) {
+      if (error.response?.status === 404 || error.response?.status === 403) {
         toast({
           title: "Match no encontrado",
           description: "No se pudo encontrar este match",
@@ -109,19 +133,6 @@ export default function ChatPage() {
         router.push("/matches")
         return
       }
-
-      setMatch(currentMatch)
-      setUserPets(petsRes.data)
-
-      const userPetIds = petsRes.data.map((p: Pet) => p.id)
-      const myPetInMatch = userPetIds.includes(currentMatch.pet1.id) ? currentMatch.pet1 : currentMatch.pet2
-      const otherPetInMatch = userPetIds.includes(currentMatch.pet1.id) ? currentMatch.pet2 : currentMatch.pet1
-
-      setMyPet(myPetInMatch)
-      setOtherPet(otherPetInMatch)
-
-      await fetchMessages()
-    } catch (error) {
       console.error("Error fetching data:", error)
       toast({
         title: "Error",
@@ -133,18 +144,59 @@ export default function ChatPage() {
     }
   }
 
+  // Append messages not shown yet (a poll and a send can return the same one)
+  const appendMessages = (incoming: Message[]) => {
+    setMessages((current) => {
+      const known = new Set(current.map((message) => message.id))
+      return [...current, ...incoming.filter((message) => !known.has(message.id))]
+    })
+  }
+
   const fetchMessages = async () => {
-    try {
-      const response = await api.get(`/matches/${params.matchId}/messages/`)
-      setMessages(response.data)
+    if (!match) return
 
-      // Mark messages as read
-      await api.patch(`/matches/${params.matchId}/messages/read/`)
+    try {
+      // Only messages newer than the last one shown: usually an empty list
+      const current = messagesRef.current
+      const query = current.length ? { after: current[current.length - 1].id } : { limit: 50 }
+      const response = await api.get(`/matches/${params.matchId}/messages/`, { params: query })
+      const incoming: Message[] = response.data
+      if (incoming.length === 0) return
+
+      appendMessages(incoming)
+
+      // Mark as read only when the other pet wrote something new
+      if (incoming.some((message) => message.sender_pet !== match.my_pet_id)) {
+        await api.patch(`/matches/${params.matchId}/messages/read/`)
+      }
     } catch (error) {
       console.error("Error fetching messages:", error)
     }
   }
 
+  const loadOlderMessages = async () => {
+    if (!messages.length || loadingOlder) return
+
+    setLoadingOlder(true)
+    try {
+      const pageSize = 50
+      const response = await api.get(`/matches/${params.matchId}/messages/`, {
+        params: { before: messages[0].id, limit: pageSize },
+      })
+      setMessages((current) => [...response.data, ...current])
+      setHasMoreMessages(response.data.length === pageSize)
+    } catch (error) {
+      console.error("Error fetching older messages:", error)
+      toast({
+        title: "Error",
+        description: "No se pudieron cargar los mensajes anteriores",
+        variant: "destructive",
+      })
+    } finally {
+      setLoadingOlder(false)
+    }
+  }
+
   const handleSendMessage = async (e: React.FormEvent) => {
     e.preventDefault()
 
@@ -158,7 +210,7 @@ export default function ChatPage() {
         content: newMessage.trim(),
       })
 
-      setMessages([...messages, response.data])
+      appendMessages([response.data])
       setNewMessage("")
     } catch (error: any) {
       toast({
@@ -214,6 +266,13 @@ export default function ChatPage() {
             </div>
           ) : (
             <div className="space-y-4">
+              {hasMoreMessages && (
+                <div className="flex justify-center">
+                  <Button variant="ghost" size="sm" onClick={loadOlderMessages} disabled={loadingOlder}>
+                    {loadingOlder ? <Spinner className="h-4 w-4" /> : "Cargar mensajes anteriores"}
+                  </Button>
+                </div>
+              )}
               {messages.map((message) => {
                 const isMyMessage = message.sender_pet === myPet?.id
 
@@ -58,3 +58,28 @@ api.interceptors.response.use(
     return Promise.reject(error)
   },
 )
+
+// Paginated list endpoints return { next_cursor, has_next, results }
+export interface Page<T> {
+  next: string | null
+  next_cursor: string | null
+  has_next: boolean
+  results: T[]
+}
+
+export const fetchPage = async <T,>(url: string, cursor?: string | null): Promise<Page<T>> => {
+  const response = await api.get(url, { params: cursor ? { cursor } : undefined })
+  return response.data
+}
+
+// Follow next_cursor until the whole list is loaded (small lists such as the user's pets)
+export const fetchAllPages = async <T,>(url: string): Promise<T[]> => {
+  const items: T[] = []
+  let cursor: string | null = null
+  do {
+    const page: Page<T> = await fetchPage<T>(url, cursor)
+    items.push(...page.results)
+    cursor = page.has_next ? page.next_cursor : null
+  } while (cursor)
+  return items
+}